@@ -0,0 +1,54 @@
+# Compares the vectorized to_pd_datetime with the previous per-row implementation.
+# Run from the deployment directory (where the package is importable as src), e.g.:
+#   python benchmarks/benchmark_to_pd_datetime.py --rows 1000000
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.logic.utilities import date_time_format, to_pd_datetime
+
+
+def to_pd_datetime_per_row(arg, dt_format=date_time_format, utc=True):
+    # The previous implementation, one Python call per row
+    pd_timestamp = pd.to_datetime(arg=arg, utc=utc, format=dt_format)
+    return pd_timestamp.apply(lambda x: x.tz_localize(None))
+
+
+def create_inputs(rows):
+    rng = np.random.default_rng(0)
+    timestamps = pd.Series(pd.Timestamp("2023-01-01") +
+                           pd.to_timedelta(rng.integers(0, 365 * 24 * 3600 * 10 ** 6, rows), unit="us"))
+    return {
+        "strings": timestamps.dt.strftime(date_time_format),
+        "datetime64": timestamps,
+        "datetime64 utc": timestamps.dt.tz_localize("UTC"),
+    }
+
+
+def measure(function, arg, repeats):
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function(arg)
+        durations.append(time.perf_counter() - start)
+    return min(durations), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="to_pd_datetime benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'input':<16}{'per row [s]':>14}{'vectorized [s]':>16}{'speedup':>10}")
+    for name, arg in create_inputs(args.rows).items():
+        per_row_time, per_row_result = measure(to_pd_datetime_per_row, arg, args.repeats)
+        vectorized_time, vectorized_result = measure(to_pd_datetime, arg, args.repeats)
+        pd.testing.assert_series_equal(per_row_result, vectorized_result, check_names=False, check_dtype=False)
+        print(f"{name:<16}{per_row_time:>14.3f}{vectorized_time:>16.3f}{per_row_time / vectorized_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,15 +13,21 @@ from src.logic.initialization import initialize_app
 
 load_figure_template("bootstrap")
 
-if __name__ == "__main__":
+
+def create_arguments_parser():
     parser = argparse.ArgumentParser(description="Sensorial Inspector Tool")
     parser.add_argument("--customer", type=str, default="Keter")
     parser.add_argument("--test_machine", type=str, default="2-10051164")
     parser.add_argument("--port", type=int, default=8080)
     parser.add_argument("--debug", action='store_true')
     parser.add_argument("--read_files_multi", action='store_true')
+    parser.add_argument("--eager_loading", action='store_true')
+    parser.add_argument("--prefetch_machines", action='store_true')
+    parser.add_argument("--prefetch_events_depth", type=int, default=1)
+    return parser
+
 
-    args = parser.parse_args()
+def create_app(args):
     test_machine = args.test_machine
     log.debug(f'Test machine: {test_machine}')
 
@@ -47,7 +53,7 @@ if __name__ == "__main__":
         pipeline_versions_options=pipeline_versions_options
     )
 
-    dash_app = initialize_app(
+    return initialize_app(
         customer_name=args.customer,
         machines=machine_names,
         selected_machine=test_machine,
@@ -55,4 +61,8 @@ if __name__ == "__main__":
         only_manual_mode=only_manual_mode
     )
 
+
+if __name__ == "__main__":
+    args = create_arguments_parser().parse_args()
+    dash_app = create_app(args)
     dash_app.run(debug=args.debug, port=args.port, use_reloader=False)
@@ -1,5 +1,4 @@
 import os
-import shutil
 from typing import Tuple
 
 from dash import Input, Output, State, no_update, callback_context, html
@@ -11,17 +10,25 @@ from src.widgets.configuration_widget_creation import (
 )
 
 from src.widgets.tabs_creation_utils import create_tabs_children
+from src.widgets.data_sources_widgets_creation import metadata_tables
+from src.widgets.machines_statistics_widget_creation import timeframes_aggregates, timeframes_figures
+from src.widgets.raw_data_widgets_creation import ingestion_figures
 
 from src.data_loaders.algo.keter_algorithmic_reconstruction_data import parse_manual_reconstruction_contents
 from src.data_loaders.keter_labeled_events import parse_manual_labeled_events_contents
-from src.data_loaders.keter_raw_data import get_machine_names
+from src.data_loaders.keter_algorithmic_cached_data import clear_algorithmic_caches
+from src.data_loaders.keter_raw_data import get_machine_names, invalidate_data_sources_catalog, raw_data_cache
+from src.logic.figure_store import figure_store
+from src.logic.session_state import sessions_state_store
 from src.data_loaders.keter_data_loader import (
     initialize_data_object,
+    publish_configurations,
     update_config
 )
 from src.data_loaders.keter_pipelines_versions_loader import (
     get_events_pipe_options,
-    get_training_pipe_options
+    get_training_pipe_options,
+    invalidate_versions_catalog
 )
 from src.data_loaders.algo.keter_algorithmic_events_data import (
     parse_manual_predicted_anomalies_contents,
@@ -29,6 +36,19 @@ from src.data_loaders.algo.keter_algorithmic_events_data import (
 )
 
 
+def clear_configuration_caches():
+    # Data loaded and derived under the previous configuration. Called by the worker process changing the
+    # configuration and by the others when they pick the change up
+    raw_data_cache.clear()
+    invalidate_data_sources_catalog()
+    invalidate_versions_catalog()
+    clear_algorithmic_caches()
+    metadata_tables.clear()
+    timeframes_figures.clear()
+    timeframes_aggregates.clear()
+    ingestion_figures.clear()
+
+
 def create_configurations_callbacks(app, data_object):
     @app.callback(
         [Output("pipelines-versions-modal", "is_open", allow_duplicate=True),
@@ -95,7 +115,9 @@ def create_configurations_callbacks(app, data_object):
     @app.callback(
         [
             Output('tabs', 'children'),
-            Output("pipelines-versions-modal", "is_open", allow_duplicate=True)
+            Output("pipelines-versions-modal", "is_open", allow_duplicate=True),
+            Output("loading-errors-alert", "children"),
+            Output("loading-errors-alert", "is_open")
         ],
         [Input("versions-modal-ok-button", "n_clicks"),
          Input("versions-modal-cancel-button", "n_clicks")],
@@ -120,7 +142,7 @@ def create_configurations_callbacks(app, data_object):
                         hours_before_event: str, hours_after_event: str, username: str,
                         manual_events_use_db: bool,
                         manual_events_show_deprecated: bool,
-                        manual_events_enable_untagging: bool) -> Tuple[list, bool]:
+                        manual_events_enable_untagging: bool) -> Tuple[list, bool, str, bool]:
         trigger = callback_context.triggered[0]
         pressed_button = trigger["prop_id"].split(".")[0]
         if pressed_button == "versions-modal-ok-button":
@@ -146,10 +168,14 @@ def create_configurations_callbacks(app, data_object):
             machines_list = get_machine_names(data_object["machines"])
 
             # TODO: verify validity of data
-            shutil.rmtree("file_system_backend")
-            os.mkdir("file_system_backend")
-            initialize_data_object(data_object, machines_list, only_manual_mode=False)
-            return create_tabs_children(), False
+            figure_store.clear()
+            sessions_state_store.clear()
+            clear_configuration_caches()
+            failed_sections = initialize_data_object(data_object, machines_list, only_manual_mode=False)
+            publish_configurations(data_object)
+            if failed_sections:
+                return create_tabs_children(), False, f"Loading {', '.join(failed_sections)} failed", True
+            return create_tabs_children(), False, None, False
         if pressed_button == "versions-modal-cancel-button":
             return no_update
 
@@ -344,6 +370,7 @@ def create_configurations_callbacks(app, data_object):
                 os.remove(manual_predicted_filename)
             except OSError:
                 pass
+            invalidate_versions_catalog()
             update_config(data_object)
             pipeline_versions = data_object["configurations"]["pipeline_versions"]
             return (pipeline_versions["stats_pipe_version"],
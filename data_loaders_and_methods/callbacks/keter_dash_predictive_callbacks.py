@@ -1,27 +1,31 @@
 import json
 import time
+from contextlib import contextmanager
+import uuid
 from datetime import timedelta
+from functools import partial
 
 import dash
 import numpy
 import pandas as pd
 import plotly.graph_objects as go
-from dash import Input, Output, State, no_update, callback_context
+from dash import Input, Output, Patch, State, no_update, callback_context
 from dash.exceptions import PreventUpdate
 from dash_extensions.enrich import Serverside
 
 from src.data_loaders.algo.keter_algorithmic_events_data import (
     filter_relevant_predicted_events,
     get_data_sources_contributions_to_events,
-    get_severity_events_from_db,
-    get_predicted_anomalies_from_db,
-    get_predicted_anomalies_from_csv
+    get_severity_events_from_db
 )
-from src.data_loaders.algo.keter_algorithmic_reconstruction_data import (
-    load_algorithmic_results_data,
-    load_algorithmic_results_data_multi
+from src.data_loaders.keter_algorithmic_cached_data import (
+    anomalies_cache,
+    reconstruction_cache,
+    get_predicted_anomalies_cached,
+    load_reconstruction_cached
 )
 from src.data_loaders.keter_data_loader import (
+    ensure_machine_loaded,
     get_event_metadata,
     get_event_type_str,
     get_event_id_str,
@@ -40,13 +44,22 @@ from src.data_loaders.keter_pipelines_versions_loader import (
     get_training_version_from_name
 )
 from src.data_loaders.keter_raw_data import (
-    load_data,
+    is_aggregated_window,
+    load_data_aggregated,
+    load_data_cached,
+    raw_data_cache,
     get_machine_id_by_name,
     get_data_source_id_by_name,
     get_data_sources_by_machine,
     get_data_sources_names,
 )
 from src.keter_globals import *
+from src.logic.concurrency import FetchCancelled, LatestRequests, run_fetches
+from src.logic.connection_pool import get_connection_pool
+from src.logic.event_index import EventIndex, EventIndexCache, KeyedEventIndex
+from src.logic.figure_store import figure_store
+from src.logic.prefetcher import BackgroundPrefetcher
+from src.logic.session_state import StagedSessionView, get_session_id
 from src.plotting_utils import (
     create_figure,
     plot_raw_data_sources,
@@ -59,71 +72,137 @@ from src.widgets.data_sources_widgets_creation import (
     create_sidebar_metadata,
     create_plot_element_children,
     create_static_plot_element_children,
+    get_data_sources_metadata_table,
+    get_machines_metadata_table,
     TRACEUPDATER_ID,
     STORE_ID,
     GRAPH_ID,
     OVERVIEW_GRAPH_ID,
 )
 
+from loguru import logger as log
+
+events_prefetcher = BackgroundPrefetcher()
+# The data loading of the view currently requested by every session
+view_requests = LatestRequests()
+
 
 def get_data_sources_connections_dict(data_object, machine_id, data_source_ids):
+    connections_lookup = data_object['preprocessed_raw_data']['data_sources_connections_lookup']
+    no_connections = (None, None)
     result_dict = {}
-    df = data_object['preprocessed_raw_data']['data_sources_connections_v']
-    if df.empty or not data_source_ids:
-        return result_dict
-
-    for actual_id in data_source_ids:
-        if actual_id in df['data_source_actual_value'].values:
-            filtered_df = df[(df['machine_id'] == int(machine_id)) & (df['data_source_actual_value'] == actual_id)]
-
-            if not filtered_df.empty:
-                matching_nominal_id = filtered_df.iloc[0]['data_source_nominal_value']
-                matching_standby_id = filtered_df.iloc[0]['data_source_standby_value']
-                result_dict[actual_id] = {'data_source_nominal_value': matching_nominal_id,
-                                          'data_source_standby_value': matching_standby_id}
-            else:
-                result_dict[actual_id] = {'data_source_nominal_value': None, 'data_source_standby_value': None}
-        else:
-            result_dict[actual_id] = {'data_source_nominal_value': None, 'data_source_standby_value': None}
-
+    for actual_id in data_source_ids or []:
+        nominal_id, standby_id = connections_lookup.get((int(machine_id), int(actual_id)), no_connections)
+        result_dict[actual_id] = {'data_source_nominal_value': nominal_id,
+                                  'data_source_standby_value': standby_id}
     return result_dict
 
 
-def load_data_sources_data(data_object, machine_id, start_timestamp, end_timestamp, data_source_ids=None):
-    # Load data sources data:
-    data_object["data_sources_values"][machine_id] = load_data(data_source_ids, start_timestamp, end_timestamp)
-
-    # Load data sources connections data:
-    data_object["data_sources_connections_values"] = dict()
+def get_nominal_data_source_ids(data_object, machine_id, data_source_ids):
     data_sources_connections_dict = get_data_sources_connections_dict(data_object, machine_id, data_source_ids)
-    data_source_nominal_ids = [int(source_connections['data_source_nominal_value'])
-                               for source_connections in data_sources_connections_dict.values() if
-                               source_connections['data_source_nominal_value'] is not None]
-    data_object["data_sources_connections_values"][machine_id] = load_data(data_source_nominal_ids, start_timestamp,
-                                                                           end_timestamp)
+    return [int(source_connections['data_source_nominal_value'])
+            for source_connections in data_sources_connections_dict.values() if
+            source_connections['data_source_nominal_value'] is not None]
 
-    data_object["selected_machine"] = machine_id
-    data_object["start_time"] = start_timestamp
-    data_object["end_time"] = end_timestamp
 
+def fetch_data_sources_data(data_object, machine_id, start_timestamp, end_timestamp, data_source_ids=None,
+                            aggregated=False):
+    load_data_func = load_data_aggregated if aggregated else load_data_cached
 
-def load_data_sources_predictions(data_object, machine_id, start_timestamp, end_timestamp, is_scaled=False,
-                                  data_source_ids=None):
+    # Data sources and their nominal connections are loaded together, in a single batch
+    data_source_nominal_ids = get_nominal_data_source_ids(data_object, machine_id, data_source_ids)
+    batch_ids = list(dict.fromkeys(list(data_source_ids) + data_source_nominal_ids))
+    batch_data = load_data_func(batch_ids, start_timestamp, end_timestamp)
+
+    # Frames of columnar results are views into the fetched arrays, nothing is copied on the way to the plots
+    data_sources_values = {int(data_source_id): batch_data[data_source_id] for data_source_id in data_source_ids
+                           if data_source_id in batch_data}
+    data_sources_connections_values = {int(data_source_id): batch_data[data_source_id]
+                                       for data_source_id in data_source_nominal_ids if data_source_id in batch_data}
+    return data_sources_values, data_sources_connections_values
+
+
+def fetch_data_sources_predictions(data_object, start_timestamp, end_timestamp, is_scaled=False,
+                                   data_source_ids=None):
     alg_name = ''
     meta_experiment_slug = \
         get_training_version_from_name(data_object["configurations"]["pipeline_versions"]["training_pipe_version"])
-    load_reconstruction_func = load_algorithmic_results_data_multi \
-        if data_object["configurations"]["reading_files_multi"] else load_algorithmic_results_data
-    data_object["algo"]["reconstruction"][machine_id] = load_reconstruction_func(
+    return load_reconstruction_cached(
         meta_experiment_slug=meta_experiment_slug,
+        reading_files_multi=data_object["configurations"]["reading_files_multi"],
         data_source_ids=data_source_ids,
         alg_name=alg_name,
         is_scaled=is_scaled,
         start_timestamp=start_timestamp,
         end_timestamp=end_timestamp,
-
     )
-    data_object["algorithms"] = reconstruction_algorithms
+
+
+def load_graph_data(data_object, machine_id, start_timestamp, end_timestamp, data_source_ids, aggregated=False,
+                    show_reconstruction_results=False, is_scaled=False, fetch_anomalies=False, cancellation=None):
+    # The fetches run in fetch threads, which have no request and so no session. They only read the shared
+    # part of the data object, the results are stored in the session here
+    fetches = {"raw data": partial(fetch_data_sources_data, data_object, machine_id, start_timestamp, end_timestamp,
+                                   data_source_ids, aggregated)}
+    pipeline_versions = data_object['configurations']['pipeline_versions']
+    load_reconstruction = show_reconstruction_results and pipeline_versions['training_pipe_version'] != 'manual'
+    if load_reconstruction:
+        fetches["reconstruction"] = partial(fetch_data_sources_predictions, data_object, start_timestamp,
+                                            end_timestamp, is_scaled, data_source_ids)
+    if fetch_anomalies:
+        fetches["predicted anomalies"] = partial(get_predicted_anomalies_cached, pipeline_versions['events_pipe_version'],
+                                                 machine_id, None, start_timestamp, end_timestamp)
+
+    if cancellation is not None:
+        results = run_fetches(fetches, cancellation=cancellation)
+    else:
+        # A newer view requested by the same session cancels this one
+        with view_request() as cancellation:
+            results = run_fetches(fetches, cancellation=cancellation)
+    # Stale results are not stored, what was fetched is already in the caches
+    cancellation.raise_if_cancelled("storing the fetched data")
+
+    data_sources_values, data_sources_connections_values = results.get("raw data", ({}, {}))
+    data_object["data_sources_values"][machine_id] = data_sources_values
+    data_object["data_sources_connections_values"] = dict()
+    data_object["data_sources_connections_values"][machine_id] = data_sources_connections_values
+    data_object["selected_machine"] = machine_id
+    data_object["start_time"] = start_timestamp
+    data_object["end_time"] = end_timestamp
+
+    if load_reconstruction:
+        # A failed reconstruction fetch is shown as no algorithm results
+        data_object["algo"]["reconstruction"][machine_id] = results.get(
+            "reconstruction", {data_source_id: {} for data_source_id in data_source_ids})
+        data_object["algorithms"] = reconstruction_algorithms
+    return results
+
+
+def has_same_values(values, trace_values):
+    try:
+        return numpy.array_equal(values, trace_values, equal_nan=True)
+    except TypeError:
+        # equal_nan is only supported by numeric values
+        return numpy.array_equal(values, trace_values)
+
+
+def tag_traces_data_sources(figure, data_sources_frames, first_hf_trace_index):
+    # Stores its data source in the high frequency data of every trace added from first_hf_trace_index, so the
+    # figure itself tells which data to fetch for a trace. A trace is of the data source whose fetched frame holds
+    # its values, the plotting helpers do not return which traces they added
+    for trace_data in figure.hf_data[first_hf_trace_index:]:
+        trace_values = numpy.asarray(trace_data["y"])
+        for data_source_id, data_source_df in data_sources_frames.items():
+            if len(data_source_df) == len(trace_values) and \
+                    has_same_values(data_source_df["value"].to_numpy(), trace_values):
+                trace_data["data_source_id"] = data_source_id
+                break
+
+
+def get_traces_data_sources(figure):
+    # The high frequency data of the traces tagged by tag_traces_data_sources, by their data source
+    return [(trace_data["data_source_id"], trace_data) for trace_data in figure.hf_data
+            if "data_source_id" in trace_data]
 
 
 def fill_figure_with_data(data_object, figure, selected_values_dict):
@@ -133,12 +212,18 @@ def fill_figure_with_data(data_object, figure, selected_values_dict):
     selected_algorithms = selected_values_dict["selected_algorithms"]
     curr_plot_num = 1
 
+    first_hf_trace_index = len(figure.hf_data)
     plot_raw_data_sources(figure,
                           curr_plot_num,
                           machine_id,
                           analyzed_data_sources,
                           data_object,
                           draw_reconstruction)
+    # The traces of aggregated data are refined with the full resolution data of their data source when zoomed in
+    if selected_values_dict["aggregated"]:
+        data_sources_frames = {**data_object["data_sources_connections_values"].get(machine_id, {}),
+                               **data_object["data_sources_values"][machine_id]}
+        tag_traces_data_sources(figure, data_sources_frames, first_hf_trace_index)
     if draw_reconstruction:
         curr_plot_num = 1
         curr_plot_num = plot_algo_data_sources(figure,
@@ -179,7 +264,8 @@ def plot_anomalies_and_events(figure, data_object, selected_values_dict, subplot
         hours=data_object["configurations"]["time_configurations"]["show_after_event"])
 
     if draw_predicted_events:
-        predicted_events = data_object["algo"]['predicted_events'][machine_id]['events']
+        predicted_events = get_machine_events_index(data_object, 2, machine_id, False) \
+            .get_events_in_range(start_date, end_date)
         print("  Adding predicted events to the graphs")
         if 'load_by_dates' in data_object and data_object['load_by_dates']:
             plot_predicted_events(
@@ -211,7 +297,8 @@ def plot_anomalies_and_events(figure, data_object, selected_values_dict, subplot
                     color=color
                 )
     if draw_labeled_events:
-        filtered_labeled_events = data_object["events"]['labeled'][machine_id]['filtered']
+        filtered_labeled_events = get_machine_events_index(data_object, 1, machine_id, False) \
+            .get_events_in_range(start_date, end_date)
         mask = filtered_labeled_events['label_name'].isin(selected_labeled_events_types)
         filtered_labeled_events = filtered_labeled_events[mask]
         plot_events(
@@ -226,7 +313,7 @@ def plot_anomalies_and_events(figure, data_object, selected_values_dict, subplot
 
     if draw_manual_events:
         print("  Adding manual events to the graphs")
-        manual_events = get_manual_events_per_machine(data_object["events"]['manual'], machine_id)
+        manual_events = get_machine_events_index(data_object, 3, machine_id).get_events_in_range(start_date, end_date)
 
         # Retrieve rows where 'int_list' is equal to 'target_list'
         data_source_ids = [
@@ -271,11 +358,13 @@ def plot_events_per_datasource(figure, data_object, selected_values_dict, subplo
     if draw_labeled_events:
         labeled_event_per_datasource = data_object["events"]['labeled'][machine_id]['per_data_source']
         if len(labeled_event_per_datasource) != 0:
-            mask = labeled_event_per_datasource['label_name'].isin(selected_labeled_events_types)
-            labeled_events_per_datasource = labeled_event_per_datasource[mask]
+            labeled_events_index = get_labeled_events_per_data_source_index(data_object, machine_id)
             for data_source_id in data_source_ids:
-                curr_labeled_events_per_datasource = labeled_events_per_datasource[
-                    labeled_events_per_datasource['data_source_id'] == data_source_id]
+                curr_labeled_events_per_datasource = labeled_events_index.get_events_in_range(start_date,
+                                                                                              end_date,
+                                                                                              key=data_source_id)
+                mask = curr_labeled_events_per_datasource['label_name'].isin(selected_labeled_events_types)
+                curr_labeled_events_per_datasource = curr_labeled_events_per_datasource[mask]
                 curr_subplot_names = [plot_name for plot_name in subplot_names if str(data_source_id) in plot_name]
                 if not curr_labeled_events_per_datasource.empty:
                     plot_events_datasource(
@@ -290,6 +379,110 @@ def plot_events_per_datasource(figure, data_object, selected_values_dict, subplo
                     )
 
 
+def get_relayout_x_range(relayout_data):
+    if not relayout_data:
+        return None
+    for key, value in relayout_data.items():
+        if key.startswith("xaxis") and key.endswith(".range[0]"):
+            return pd.Timestamp(value), pd.Timestamp(relayout_data[key.replace("[0]", "[1]")])
+        if key.startswith("xaxis") and key.endswith(".range"):
+            return pd.Timestamp(value[0]), pd.Timestamp(value[1])
+    return None
+
+
+def load_full_resolution_traces(figure, traces_data_sources, start_timestamp, end_timestamp):
+    # Only the zoomed part of the aggregated series is replaced, the rest of it keeps serving the overview
+    full_resolution_data = load_data_cached(list({data_source_id for data_source_id, _ in traces_data_sources}),
+                                            start_timestamp, end_timestamp)
+    start, end = numpy.datetime64(start_timestamp), numpy.datetime64(end_timestamp)
+    for data_source_id, trace_data in traces_data_sources:
+        if data_source_id not in full_resolution_data:
+            continue
+        x = numpy.asarray(trace_data["x"], dtype="datetime64[ns]")
+        y = numpy.asarray(trace_data["y"])
+        data_source_df = full_resolution_data[data_source_id]
+        outside_before, outside_after = x < start, x > end
+        trace_data["x"] = numpy.concatenate(
+            [x[outside_before], data_source_df["timestamp"].to_numpy(dtype="datetime64[ns]"), x[outside_after]])
+        trace_data["y"] = numpy.concatenate(
+            [y[outside_before], data_source_df["value"].to_numpy(dtype=y.dtype), y[outside_after]])
+
+
+def format_event_timestamp(timestamp):
+    return timestamp.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def get_graph_window(data_object, start_timestamp, end_timestamp):
+    start_ts = try_parsing_date(start_timestamp) - timedelta(
+        hours=data_object['configurations']['time_configurations']['show_before_event'])
+    end_ts = try_parsing_date(end_timestamp) + timedelta(
+        hours=data_object['configurations']['time_configurations']['show_after_event'])
+    return start_ts, end_ts
+
+
+def get_event_window(data_object, events_index, internal_event_id):
+    return events_index.get_window(internal_event_id,
+                                   data_object['configurations']['time_configurations']['show_before_event'],
+                                   data_object['configurations']['time_configurations']['show_after_event'])
+
+
+def get_figure_data_key(machine_id, start_timestamp, end_timestamp, analyzed_data_sources,
+                        show_reconstruction_results, is_scaled, load_by_dates):
+    # Everything the subplots and data traces of the figure depend on
+    return (machine_id, start_timestamp, end_timestamp, tuple(analyzed_data_sources), show_reconstruction_results,
+            is_scaled, load_by_dates)
+
+
+def can_reuse_figure(data_object, previous_figure, data_key):
+    previous_values = data_object.get("selected_values")
+    if previous_figure is None or previous_values is None or previous_values.get("data_key") != data_key or \
+            not data_object.get("update_figures_in_place", False):
+        return False
+    # The stored figure must be the one last rendered for this session (e.g. not the one of another browser tab)
+    # and the loaded data must still be of its window
+    # Overlays are only redrawn in place while none of them holds high frequency data, the resampler offers no way
+    # to drop the data of removed traces
+    return previous_figure.layout.meta == previous_values.get("render_id") and \
+        len(previous_figure.hf_data) == previous_values.get("base_num_hf_traces") and \
+        data_object.get("selected_machine") == data_key[0] and \
+        data_object.get("start_time") == data_key[1] and \
+        data_object.get("end_time") == data_key[2]
+
+
+def get_changed_layers(previous_values, plotting_parameters):
+    return [parameter for parameter in OVERLAY_PARAMETERS
+            if previous_values.get(parameter) != plotting_parameters[parameter]]
+
+
+def update_figure_layers(data_object, figure, plotting_parameters):
+    # Redraws only the event and anomaly layers on top of the existing data traces, and returns the patch
+    # applying the same change to the figure in the browser
+    previous_values = data_object["selected_values"]
+    base_num_traces = previous_values["base_num_traces"]
+    num_traces = len(figure.data)
+
+    figure.data = figure.data[:base_num_traces]
+    figure.layout.shapes = figure.layout.shapes[:previous_values["base_num_shapes"]]
+    figure.layout.annotations = figure.layout.annotations[:previous_values["base_num_annotations"]]
+
+    selected_values = dict(previous_values)
+    for parameter in OVERLAY_PARAMETERS:
+        selected_values[parameter] = plotting_parameters[parameter]
+    data_object["selected_values"] = selected_values
+
+    subplot_names = selected_values["subplot_names"]
+    plot_anomalies_and_events(figure, data_object, selected_values, subplot_names)
+    plot_events_per_datasource(figure, data_object, selected_values, subplot_names)
+
+    patch = Patch()
+    patch["layout"]["shapes"] = [shape.to_plotly_json() for shape in figure.layout.shapes]
+    patch["layout"]["annotations"] = [annotation.to_plotly_json() for annotation in figure.layout.annotations]
+    for trace_index in reversed(range(base_num_traces, num_traces)):
+        del patch["data"][trace_index]
+    patch["data"].extend([trace.to_plotly_json() for trace in figure.data[base_num_traces:]])
+    return patch
+
+
 def create_graph_content(data_object,
                          machine_name,
                          start_timestamp,
@@ -301,7 +494,9 @@ def create_graph_content(data_object,
                          draw_predicted_events,
                          draw_manual_events,
                          show_reconstruction_results,
-                         is_scaled=False):
+                         is_scaled=False,
+                         previous_figure=None,
+                         cancellation=None):
     print("Plotting required data:")
     if len(analyzed_data_sources) > 0:
         print(
@@ -309,38 +504,41 @@ def create_graph_content(data_object,
         )
     start = time.time()
     machine_id = get_machine_id_by_name(machine_name)
+    ensure_machine_loaded(data_object, machine_id)
     data_source_ids = [
         int(get_data_source_id_by_name(data_source))
         for data_source in analyzed_data_sources
     ]
 
-    start_ts = try_parsing_date(start_timestamp) - timedelta(
-        hours=data_object['configurations']['time_configurations']['show_before_event'])
-    end_ts = try_parsing_date(end_timestamp) + timedelta(
-        hours=data_object['configurations']['time_configurations']['show_after_event'])
-
-    load_data_sources_data(
-        data_object=data_object,
-        machine_id=machine_id,
-        start_timestamp=start_ts,
-        end_timestamp=end_ts,
-        data_source_ids=data_source_ids,
-    )
-
-    if data_object["data_sources_values"][machine_id] == {}:
+    start_ts, end_ts = get_graph_window(data_object, start_timestamp, end_timestamp)
+    load_by_dates = 'load_by_dates' in data_object and data_object['load_by_dates']
+    aggregated = load_by_dates and is_aggregated_window(start_ts, end_ts)
+    data_key = get_figure_data_key(machine_id, start_ts, end_ts, analyzed_data_sources, show_reconstruction_results,
+                                   is_scaled, load_by_dates)
+    reuse_figure = can_reuse_figure(data_object, previous_figure, data_key)
+
+    graph_data = {}
+    if not reuse_figure:
+        try:
+            graph_data = load_graph_data(data_object,
+                                         machine_id,
+                                         start_ts,
+                                         end_ts,
+                                         data_source_ids,
+                                         aggregated=aggregated,
+                                         show_reconstruction_results=show_reconstruction_results,
+                                         is_scaled=is_scaled,
+                                         fetch_anomalies=load_by_dates and draw_predicted_anomalies,
+                                         cancellation=cancellation)
+        except FetchCancelled:
+            log.debug(f"Loading data for machine {machine_id} between {start_ts} and {end_ts} was superseded")
+            return None, None, None, None, None
+
+    # A reused figure already holds its data, the raw data of its request is not kept in the session state
+    if not reuse_figure and not data_object["data_sources_values"].get(machine_id):
         print(f"      No raw data for machine {machine_id} and {','.join([str(idx) for idx in data_source_ids])} between {start_ts} and {end_ts}")
         return None, None, None, None, None
 
-    if show_reconstruction_results:
-        training_pipe_version = data_object['configurations']['pipeline_versions']['training_pipe_version']
-        if training_pipe_version != 'manual':
-            load_data_sources_predictions(data_object=data_object,
-                                          machine_id=machine_id,
-                                          start_timestamp=start_ts,
-                                          end_timestamp=end_ts,
-                                          is_scaled=is_scaled,
-                                          data_source_ids=data_source_ids)
-
     if 'selected_event_anomalies_models' in data_object:
         selected_algorithms = data_object['selected_event_anomalies_models']
     else:
@@ -353,6 +551,11 @@ def create_graph_content(data_object,
             selected_algorithms = {}
 
     print(f"    Loading data took {str(timedelta(seconds=time.time() - start))}")
+    log.debug(f"DB connection pool stats: {get_connection_pool().get_stats()}")
+    log.debug(f"Raw data cache stats: {raw_data_cache.get_stats()}")
+    log.debug(f"Anomalies cache stats: {anomalies_cache.get_stats()}, "
+              f"reconstruction cache stats: {reconstruction_cache.get_stats()}")
+    log.debug(f"View requests stats: {view_requests.get_stats()}")
     if show_reconstruction_results:
         algo_dict = data_object["algo"]["reconstruction"][machine_id]
         if algo_dict is not None and all(value == {} for value in algo_dict.values()):
@@ -376,125 +579,182 @@ def create_graph_content(data_object,
         "draw_manual_events": draw_manual_events,
         "draw_predicted_anomalies": draw_predicted_anomalies,
         "selected_algorithms": selected_algorithms,
-        "load_by_dates": 'load_by_dates' in data_object and data_object['load_by_dates']
+        "load_by_dates": load_by_dates,
+        "aggregated": aggregated,
+        "data_key": data_key,
     }
 
     # This chunk of code handles showing anomalies when "Load by dates" is activated
-    load_by_dates = plotting_parameters["load_by_dates"]
     pred_events_pipe_version = data_object["configurations"]["pipeline_versions"]["events_pipe_version"]
     if load_by_dates and draw_predicted_anomalies:
-        if pred_events_pipe_version == 'manual':
-            anomalies_df = get_predicted_anomalies_from_csv(machine_id, None, start_ts, end_ts)
+        anomalies_df = get_predicted_anomalies_cached(pred_events_pipe_version, machine_id, None, start_ts, end_ts) \
+            if reuse_figure else graph_data.get("predicted anomalies")
+
+        if anomalies_df is None:
+            # The fetch failed or timed out, the anomalies of the previous view must not be drawn
+            data_object.pop('selected_event_anomalies', None)
         else:
-            anomalies_df = get_predicted_anomalies_from_db(machine_id, pred_events_pipe_version, None, start_ts, end_ts)
+            data_object['selected_event_anomalies'] = anomalies_df
+            selected_event_anomalies_models = {}
+            for data_source in list(anomalies_df['data_source_id'].unique()):
+                selected_event_anomalies_models[data_source] = list(
+                    anomalies_df[anomalies_df['data_source_id'] == data_source]['model_type'].unique())
+            data_object['selected_event_anomalies_models'] = selected_event_anomalies_models
+            plotting_parameters['selected_algorithms'] = data_object['selected_event_anomalies_models']
+
+    if cancellation is not None and cancellation.is_cancelled:
+        log.debug(f"Plotting machine {machine_id} between {start_ts} and {end_ts} was superseded")
+        return None, None, None, None, None
+
+    # Reconstruction traces are drawn per selected algorithm, a change of these needs the data traces redrawn
+    if reuse_figure and (not show_reconstruction_results or
+                         plotting_parameters['selected_algorithms'] ==
+                         data_object["selected_values"]["selected_algorithms"]):
+        changed_layers = get_changed_layers(data_object["selected_values"], plotting_parameters)
+        log.debug(f"Updating figure layers: {','.join(changed_layers) if changed_layers else 'none changed'}")
+        patch = update_figure_layers(data_object, previous_figure, plotting_parameters)
+        log.debug(f"Updating figure layers took {str(timedelta(seconds=time.time() - start_plot))}")
+        return patch, no_update, no_update, no_update, Serverside(previous_figure)
 
-        data_object['selected_event_anomalies'] = anomalies_df
-        selected_event_anomalies_models = {}
-        for data_source in list(anomalies_df['data_source_id'].unique()):
-            selected_event_anomalies_models[data_source] = list(
-                anomalies_df[anomalies_df['data_source_id'] == data_source]['model_type'].unique())
-        data_object['selected_event_anomalies_models'] = selected_event_anomalies_models
-        plotting_parameters['selected_algorithms'] = data_object['selected_event_anomalies_models']
-
-    # TODO: Compare previous fig and current - curr_selected_valuses vs data_object["selected_values"]
-    # TODO: and activate only if relevant
     fig, num_plots, subplot_names = create_figure(data_object, plotting_parameters)
     plotting_parameters['num_plots'] = num_plots
     fill_figure_with_data(data_object, fig, plotting_parameters)
 
-    data_object["selected_values"] = plotting_parameters
     try:
         coarse_fig = fig._create_overview_figure()
     except Exception as e:
         print(f"Error in creating graph overview: {e}")
         coarse_fig = None
 
+    # Everything drawn up to here is the data part of the figure, the event and anomaly layers come on top of it
+    render_id = uuid.uuid4().hex
+    fig.update_layout(meta=render_id)
+    plotting_parameters.update(subplot_names=subplot_names,
+                               render_id=render_id,
+                               base_num_traces=len(fig.data),
+                               base_num_hf_traces=len(fig.hf_data),
+                               base_num_shapes=len(fig.layout.shapes),
+                               base_num_annotations=len(fig.layout.annotations))
+    data_object["selected_values"] = plotting_parameters
+
     plot_anomalies_and_events(fig, data_object, plotting_parameters, subplot_names)
     plot_events_per_datasource(fig, data_object, plotting_parameters, subplot_names)
     print(f"    Plotting data took {str(timedelta(seconds=time.time() - start_plot))}")
+    log.debug(f"Figure store stats: {figure_store.get_stats()}")
     print("Finished drawing...")
     return fig, coarse_fig, {}, {}, Serverside(fig)
 
 
-def get_machine_events(data_object, label_type, machine_id, predicted_filter=True):
-    label_type_str = "labeled" if label_type == 1 else "predicted" if label_type == 2 else 'manual'
+events_indexes = EventIndexCache()
+
+
+def get_machine_events_sources(data_object, label_type, machine_id, predicted_filter):
     if label_type == 1:
-        events_df = data_object["events"][label_type_str][machine_id]['filtered']
+        return data_object["events"]['labeled'][machine_id]['filtered'],
     if label_type == 2:
-        if data_object["algo"]['predicted_events'][machine_id]:
-            events_df = data_object["algo"]['predicted_events'][machine_id]["events"]
-            if events_df.empty:
-                print(f"No predicted events to show for machine {machine_id}")
-                return pd.DataFrame()
-            if predicted_filter:
-                events_df = filter_relevant_predicted_events(events_df,
-                                                             data_object["events"]["labeled"][machine_id]['filtered'])
-        else:
-            print(f"No predicted events to show for machine {machine_id}")
-            return pd.DataFrame()
-    if label_type == 3:
-        events_df = get_manual_events_per_machine(data_object["events"][label_type_str], int(machine_id))
+        if not data_object["algo"]['predicted_events'][machine_id]:
+            return None
+        if predicted_filter:
+            return data_object["algo"]['predicted_events'][machine_id]["events"], \
+                data_object["events"]["labeled"][machine_id]['filtered']
+        return data_object["algo"]['predicted_events'][machine_id]["events"],
+    return data_object["events"]['manual'],
 
-    events_df.sort_values("start_timestamp", ascending=True, inplace=True)
-    events_df['internal_event_id'] = list(range(len(events_df)))
-    return events_df
 
+def build_machine_events_index(label_type, machine_id, predicted_filter, sources):
+    if label_type == 2:
+        events_df = sources[0]
+        if events_df.empty:
+            log.debug(f"No predicted events to show for machine {machine_id}")
+        elif predicted_filter:
+            events_df = filter_relevant_predicted_events(events_df, sources[1])
+    elif label_type == 3:
+        events_df = get_manual_events_per_machine(sources[0], int(machine_id))
+    else:
+        events_df = sources[0]
+    return EventIndex(events_df)
 
-def get_initial_data_sources_to_show(machine_id, data_object, relevant_anomalies_df, filter_by):
+
+def get_machine_events_index(data_object, label_type, machine_id, predicted_filter=True):
+    # The index is built once per events frame and reused until the frame is replaced (e.g. by tagging or reloading)
+    sources = get_machine_events_sources(data_object, label_type, machine_id, predicted_filter)
+    if sources is None:
+        log.debug(f"No predicted events to show for machine {machine_id}")
+        return EventIndex(pd.DataFrame())
+
+    predicted_filter = predicted_filter and label_type == 2
+    return events_indexes.get((label_type, machine_id, predicted_filter),
+                              sources,
+                              partial(build_machine_events_index, label_type, machine_id, predicted_filter, sources))
+
+
+def get_labeled_events_per_data_source_index(data_object, machine_id):
+    labeled_events_per_data_source = data_object["events"]['labeled'][machine_id]['per_data_source']
+    return events_indexes.get(("per_data_source", machine_id),
+                              (labeled_events_per_data_source,),
+                              partial(KeyedEventIndex, labeled_events_per_data_source, "data_source_id"))
+
+
+def select_machine_events(data_object, label_type, machine_id, predicted_filter=True):
+    events_index = get_machine_events_index(data_object, label_type, machine_id, predicted_filter)
+    data_object['selected_events_index'] = events_index
+    data_object['selected_machine_events'] = events_index.events
+    return events_index.events
+
+
+def get_event_data_source_ids(data_object, events, internal_event_id, relevant_anomalies_df, filter_by):
     max_data_sources_to_show = data_object['configurations']['events_configurations']['max_data_sources_to_show']
     if filter_by == 'no_filter':
-        filter_list = data_object["selected_machine_events"]['data_sources_list'].values[
-            data_object['internal_event_id']]
+        filter_list = events['data_sources_list'].values[internal_event_id]
         filter_list = [str(curr_data_source) for curr_data_source in filter_list]
     else:
         filter_list = get_data_sources_contributions_to_events(relevant_anomalies_df, contribution_type=filter_by)
-    filter_list = filter_list[:max_data_sources_to_show]
+    return filter_list[:max_data_sources_to_show]
+
+
+def get_initial_data_sources_to_show(machine_id, data_object, relevant_anomalies_df, filter_by):
+    filter_list = get_event_data_source_ids(data_object,
+                                            data_object["selected_machine_events"],
+                                            data_object['internal_event_id'],
+                                            relevant_anomalies_df,
+                                            filter_by)
 
     data_sources_list = get_data_sources_names(get_data_sources_by_machine(machine_id), filter_list)
     return data_sources_list
 
 
-def update_event_id(labels_type, data_object, machine_id, new_internal_event_id, selected_machine_events):
+def update_event_id(labels_type, data_object, machine_id, new_internal_event_id, events_index, cancellation=None):
     data_object['internal_event_id'] = new_internal_event_id
     data_object['selected_event_internal'] = new_internal_event_id if new_internal_event_id < len(
-        selected_machine_events) else 0
-    data_object['selected_event'] = selected_machine_events["event_id"].values[data_object['selected_event_internal']]
-    start_date_dt, end_date_dt, event_type = get_event_metadata(data_object['selected_event_internal'],
-                                                                selected_machine_events)
-
-    hours_before_event = data_object['configurations']['time_configurations']['show_before_event']
-    hours_after_event = data_object['configurations']['time_configurations']['show_after_event']
-    window_start_date = start_date_dt - timedelta(hours=hours_before_event)
-    window_end_date = end_date_dt + timedelta(hours=hours_after_event)
+        events_index) else 0
+    data_object['selected_event'] = events_index.get_event_id(data_object['selected_event_internal'])
+    window_start_date, window_end_date, event_type = get_event_window(data_object,
+                                                                      events_index,
+                                                                      data_object['selected_event_internal'])
 
     pred_events_pipe_version = data_object["configurations"]["pipeline_versions"]["events_pipe_version"]
     event_id = data_object['selected_event']
     if labels_type == 2:
-        selected_anomalies_ids = selected_machine_events["anomaly_id_list"].values[
-            data_object['selected_event_internal']]
+        selected_anomalies_ids = events_index.get_anomaly_ids(data_object['selected_event_internal'])
         data_object['selected_anomalies_ids'] = selected_anomalies_ids
 
-        if pred_events_pipe_version == 'manual':
-            anomalies_df = get_predicted_anomalies_from_csv(
-                machine_id,
-                selected_anomalies_ids,
-                window_start_date,
-                window_end_date)
-        else:
-            anomalies_df = get_predicted_anomalies_from_db(
-                machine_id,
-                pred_events_pipe_version,
-                selected_anomalies_ids,
-                window_start_date, window_end_date)
+        # The anomalies and the severities of the event are independent, they are fetched in parallel
+        fetches = {"predicted anomalies": partial(get_predicted_anomalies_cached,
+                                                  pred_events_pipe_version,
+                                                  machine_id,
+                                                  selected_anomalies_ids,
+                                                  window_start_date,
+                                                  window_end_date)}
+        if pred_events_pipe_version != 'manual':
+            fetches["severities"] = partial(get_severity_events_from_db, event_id)
+        results = run_fetches(fetches, cancellation=cancellation)
+        anomalies_df = results.get("predicted anomalies", pd.DataFrame())
 
         if not anomalies_df.empty:
             data_object['algo']['predicted_events'][machine_id]['anomalies'][event_id] = anomalies_df
             data_object['selected_event_anomalies'] = anomalies_df
 
-        if pred_events_pipe_version != 'manual':
-            severity_df = get_severity_events_from_db(event_id)
-        else:
-            severity_df = None
+        severity_df = results.get("severities")
         data_object['algo']['predicted_events'][machine_id]['severity_events'] = severity_df
         data_object['selected_event_severities'] = severity_df
 
@@ -505,11 +765,8 @@ def update_event_id(labels_type, data_object, machine_id, new_internal_event_id,
                     anomalies_df[anomalies_df['data_source_id'] == data_source]['model_type'].unique())
             data_object['selected_event_anomalies_models'] = selected_event_anomalies_models
     else:
-        if pred_events_pipe_version == 'manual':
-            anomalies_df = get_predicted_anomalies_from_csv(machine_id, None, window_start_date, window_end_date)
-        else:
-            anomalies_df = get_predicted_anomalies_from_db(machine_id, pred_events_pipe_version, None, window_start_date,
-                                                           window_end_date)
+        anomalies_df = get_predicted_anomalies_cached(pred_events_pipe_version, machine_id, None, window_start_date,
+                                                      window_end_date)
 
         data_object.pop('selected_anomalies_ids', 'No Key found')
         data_object.pop('selected_event_severities', 'No Key found')
@@ -523,6 +780,110 @@ def update_event_id(labels_type, data_object, machine_id, new_internal_event_id,
     return window_start_date, window_end_date
 
 
+def prefetch_event_data(data_object, machine_id, labels_type, events_index, internal_event_id, data_source_ids,
+                        show_reconstruction_results):
+    # Mirrors the loading done by update_event_id and create_graph_content, so the same cache entries are hit
+    window_start_date, window_end_date, _ = get_event_window(data_object, events_index, internal_event_id)
+    pred_events_pipe_version = data_object["configurations"]["pipeline_versions"]["events_pipe_version"]
+    anomaly_ids = events_index.get_anomaly_ids(internal_event_id) if labels_type == 2 else None
+    anomalies_df = get_predicted_anomalies_cached(pred_events_pipe_version,
+                                                  machine_id,
+                                                  anomaly_ids,
+                                                  window_start_date,
+                                                  window_end_date)
+
+    if labels_type == 2:
+        if anomalies_df.empty:
+            return
+        data_source_ids = get_event_data_source_ids(data_object, events_index.events, internal_event_id, anomalies_df,
+                                                    filter_by="start_timestamp")
+    elif labels_type == 3:
+        data_source_ids = get_event_data_source_ids(data_object, events_index.events, internal_event_id, None,
+                                                    filter_by="no_filter")
+    data_source_ids = [int(data_source_id) for data_source_id in data_source_ids]
+    if not data_source_ids:
+        return
+
+    start_ts, end_ts = get_graph_window(data_object,
+                                        format_event_timestamp(window_start_date),
+                                        format_event_timestamp(window_end_date))
+    load_data_cached(data_source_ids + get_nominal_data_source_ids(data_object, machine_id, data_source_ids),
+                     start_ts,
+                     end_ts)
+
+    training_pipe_version = data_object['configurations']['pipeline_versions']['training_pipe_version']
+    if show_reconstruction_results and training_pipe_version != 'manual':
+        load_reconstruction_cached(
+            meta_experiment_slug=get_training_version_from_name(training_pipe_version),
+            reading_files_multi=data_object["configurations"]["reading_files_multi"],
+            data_source_ids=data_source_ids,
+            alg_name='',
+            is_scaled=False,
+            start_timestamp=start_ts,
+            end_timestamp=end_ts,
+        )
+
+
+def prefetch_neighbouring_events(data_object, machine_id, labels_type, analyzed_data_sources,
+                                 show_reconstruction_results):
+    depth = data_object['configurations']['events_configurations']['prefetch_events_depth']
+    events_index = data_object['selected_events_index']
+    current_event = data_object['selected_event_internal']
+    data_source_ids = [int(get_data_source_id_by_name(data_source)) for data_source in analyzed_data_sources]
+
+    prefetch_tasks = {}
+    for distance in range(1, depth + 1):
+        for internal_event_id in (current_event + distance, current_event - distance):
+            if 0 <= internal_event_id < len(events_index):
+                prefetch_tasks[f"event {internal_event_id + 1} of machine {machine_id}"] = partial(
+                    prefetch_event_data, data_object, machine_id, labels_type, events_index, internal_event_id,
+                    data_source_ids, show_reconstruction_results)
+    events_prefetcher.submit(prefetch_tasks)
+
+
+@contextmanager
+def view_request():
+    # A newer view requested by the same session supersedes this one. Only requests handled by the same process are
+    # superseded: with several worker processes, requests of one session on different workers both run to the end and
+    # the session state of the last one to finish is kept, which is why requests that may be superseded stage their
+    # session state changes (StagedSessionView) and commit them together at the end
+    session_id = get_session_id()
+    cancellation = view_requests.start(session_id)
+    try:
+        yield cancellation
+    finally:
+        view_requests.finish(session_id, cancellation)
+
+
+def reset_navigation(data_object):
+    # The navigation buttons are recreated with no clicks
+    data_object.pop('navigation_clicks', None)
+    data_object.pop('navigation_dates', None)
+
+
+def get_navigation_steps(data_object, navigation, forward_clicks, backward_clicks):
+    # Steps are counted from the clicks of the last accepted request, so when the requests in between were
+    # abandoned the latest one still moves by all of the clicks. Returns the steps, None for a request arriving after
+    # a newer one, and the navigation clicks to store once the request is accepted
+    forward_clicks, backward_clicks = forward_clicks or 0, backward_clicks or 0
+    navigation_clicks = dict(data_object.get('navigation_clicks') or {})
+    applied_forward, applied_backward = navigation_clicks.get(navigation, (0, 0))
+    forward_steps, backward_steps = forward_clicks - applied_forward, backward_clicks - applied_backward
+    if forward_steps < 0 or backward_steps < 0 or forward_steps == backward_steps == 0:
+        return None, navigation_clicks
+    navigation_clicks[navigation] = (forward_clicks, backward_clicks)
+    return forward_steps - backward_steps, navigation_clicks
+
+
+def get_navigation_dates_base(data_object, start_date, end_date):
+    # The dates of an abandoned request are never shown, the picker still has the dates that request started from
+    navigation_dates = data_object.get('navigation_dates')
+    if navigation_dates is not None and [start_date, end_date] in (list(navigation_dates['origin']),
+                                                                   list(navigation_dates['target'])):
+        return tuple(navigation_dates['target'])
+    return start_date, end_date
+
+
 def create_predictive_callbacks(app, data_object):
     @app.callback(
         [Output('metadata-div', 'children', allow_duplicate=True),
@@ -564,14 +925,16 @@ def create_predictive_callbacks(app, data_object):
             Input("event-id-input", "value"),
             State("machine-dropdown", "value"),
             State("checklist-labels-type", "value"),
-            State("data-sources-checklist", "value")
+            State("data-sources-checklist", "value"),
+            State("checkbox-show-algo-results", "checked")
         ]
     )
-    def changed_event_id(new_event_id, machine_name, labels_type, analyzed_data_sources):
+    def changed_event_id(new_event_id, machine_name, labels_type, analyzed_data_sources, show_algo_results):
         machine_id = get_machine_id_by_name(machine_name)
+        ensure_machine_loaded(data_object, machine_id)
         selected_machine_events = data_object['selected_machine_events']
         start_date_dt, end_date_dt = update_event_id(labels_type, data_object, machine_id, new_event_id - 1,
-                                                     selected_machine_events)
+                                                     data_object['selected_events_index'])
         selected_machine_metadata = data_object["data_sources_metadata"][machine_id]
 
         filter_by = "no_filter" if labels_type == 3 else "start_timestamp"
@@ -587,6 +950,7 @@ def create_predictive_callbacks(app, data_object):
         data_source_description = get_event_type_str(selected_machine_events, data_object['selected_event_internal'])
         event_id_label = get_event_id_str(selected_machine_events)
 
+        prefetch_neighbouring_events(data_object, machine_id, labels_type, analyzed_data_sources, show_algo_results)
         return start_date_dt, end_date_dt, data_sources_checklist, event_id_label, data_source_description
 
     @app.callback(
@@ -618,17 +982,17 @@ def create_predictive_callbacks(app, data_object):
     def update_predicted_events(filter_predicted_events, labels_type, machine_name):
         if labels_type == 2:
             machine_id = get_machine_id_by_name(machine_name)
-            selected_machine_events = get_machine_events(data_object,
-                                                         labels_type,
-                                                         machine_id,
-                                                         filter_predicted_events)
-            data_object['selected_machine_events'] = selected_machine_events
+            ensure_machine_loaded(data_object, machine_id)
+            selected_machine_events = select_machine_events(data_object,
+                                                            labels_type,
+                                                            machine_id,
+                                                            filter_predicted_events)
 
             start_date_dt, end_date_dt = update_event_id(labels_type,
                                                          data_object,
                                                          machine_id,
                                                          data_object['internal_event_id'],
-                                                         selected_machine_events)
+                                                         data_object['selected_events_index'])
             selected_machine_metadata = data_object["data_sources_metadata"][machine_id]
             filter_by = "start_timestamp"
             relevant_anomalies_df = data_object['selected_event_anomalies'] if labels_type == 2 else None
@@ -657,20 +1021,21 @@ def create_predictive_callbacks(app, data_object):
     def create_sidebar_widget(raw_data_n_clicks, events_data_n_clicks, machine_name):
         if raw_data_n_clicks == 0 and events_data_n_clicks == 0:
             return no_update
+        reset_navigation(data_object)
 
         metadata_div_children = []
         trigger = callback_context.triggered[0]
         machine_id = get_machine_id_by_name(machine_name)
+        ensure_machine_loaded(data_object, machine_id)
         selected_machine_metadata = data_object["data_sources_metadata"][machine_id]
-        selected_machine_events = get_machine_events(data_object, 1, machine_id, False)
-        data_object['selected_machine_events'] = selected_machine_events
+        selected_machine_events = select_machine_events(data_object, 1, machine_id, False)
         pressed_button = trigger["prop_id"].split(".")[0]
         if pressed_button == "load-events-data":
             data_object['selected_event_internal'] = 0
             event_id = selected_machine_events['event_id'].min()
             data_object['selected_event'] = event_id
             start_date_dt, end_date_dt, event_type = \
-                get_event_metadata(data_object['selected_event_internal'], selected_machine_events)
+                get_event_metadata(data_object['selected_event_internal'], data_object['selected_events_index'])
             data_object['selected_event_type'] = event_type
             metadata_div_children = create_sidebar_metadata(machine_id,
                                                             selected_machine_metadata,
@@ -705,6 +1070,7 @@ def create_predictive_callbacks(app, data_object):
          ]
     )
     def on_labels_type_change(labels_type, machine_name):
+        reset_navigation(data_object)
         filter_predicted_style = dict() if labels_type == 2 else dict(display='none')  # labels_type == 2 => Predicted
         manual_events_enable_untagging = data_object["configurations"]["manual_tagging"]["enable_untagging"]
 
@@ -719,16 +1085,16 @@ def create_predictive_callbacks(app, data_object):
         } if show_untag_button else dict(display='none')  # labels_type == 3 => Manual
 
         machine_id = get_machine_id_by_name(machine_name)
+        ensure_machine_loaded(data_object, machine_id)
         selected_machine_metadata = data_object["data_sources_metadata"][machine_id]
-        selected_machine_events = get_machine_events(data_object,
-                                                     labels_type,
-                                                     machine_id,
-                                                     False)
-        data_object['selected_machine_events'] = selected_machine_events
+        selected_machine_events = select_machine_events(data_object,
+                                                        labels_type,
+                                                        machine_id,
+                                                        False)
 
         if not selected_machine_events.empty:
             start_date_dt, end_date_dt = update_event_id(labels_type, data_object, machine_id, 0,
-                                                         selected_machine_events)
+                                                         data_object['selected_events_index'])
 
             filter_by = "no_filter" if not labels_type == 2 else "start_timestamp"
             relevant_anomalies_df = data_object['selected_event_anomalies'] \
@@ -823,61 +1189,72 @@ def create_predictive_callbacks(app, data_object):
 
         if next_event_n_clicks or previous_event_n_clicks:
             machine_id = get_machine_id_by_name(machine_name)
+            ensure_machine_loaded(data_object, machine_id)
             selected_machine_metadata = data_object["data_sources_metadata"][machine_id]
             selected_machine_events = data_object['selected_machine_events']
-            trigger = callback_context.triggered[0]
-            pressed_button = trigger["prop_id"].split(".")[0]
-            if pressed_button == "load-next-event":
-                new_internal_print_id = data_object['selected_event_internal'] + 1
-
-                start_date_dt, end_date_dt = update_event_id(labels_type,
-                                                             data_object,
-                                                             machine_id,
-                                                             new_internal_print_id,
-                                                             selected_machine_events)
-
-            if pressed_button == "load-previous-event":
-                new_internal_print_id = data_object['selected_event_internal'] - 1
-                end_date_dt, start_date_dt = update_event_id(labels_type,
-                                                             data_object,
-                                                             machine_id,
-                                                             new_internal_print_id,
-                                                             selected_machine_events)
-
-            curr_graph_fig = graph_fig
-            curr_overview_fig = overview_fig
-            curr_graph_style = graph_style
-            curr_overview_style = overview_style
-            curr_stored_data = stored_data
-
-            start_ts = start_date_dt.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
-            end_ts = end_date_dt.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
-
-            filter_by = "no_filter" if labels_type == 3 else "start_timestamp"
-            relevant_anomalies_df = data_object['selected_event_anomalies'] if labels_type == 2 else None
-            if labels_type == 1:
-                data_sources_checklist = analyzed_data_sources
-            else:
-                data_sources_checklist = get_initial_data_sources_to_show(machine_id,
-                                                                          data_object,
-                                                                          relevant_anomalies_df,
-                                                                          filter_by=filter_by)
-            if navigate_fast:
-                curr_graph_fig, curr_overview_fig, curr_graph_style, curr_overview_style, curr_stored_data = \
-                    create_graph_content(data_object,
-                                         machine_name,
-                                         start_ts,
-                                         end_ts,
-                                         data_sources_checklist,
-                                         draw_labeled_events,
-                                         selected_labeled_events_types,
-                                         draw_predicted_anomalies,
-                                         draw_predicted_events,
-                                         draw_manual_events,
+            # Clicks of abandoned requests are applied by the latest one, it moves to where all clicks lead
+            steps, navigation_clicks = get_navigation_steps(data_object, "events", next_event_n_clicks,
+                                                            previous_event_n_clicks)
+            if steps is None:
+                raise PreventUpdate("Navigation clicks were already applied")
+
+            with view_request() as cancellation:
+                # The event and the clicks reach the session only when the request is not superseded
+                request_data_object = StagedSessionView(data_object)
+                try:
+                    new_internal_print_id = request_data_object['selected_event_internal'] + steps
+                    start_date_dt, end_date_dt = update_event_id(labels_type,
+                                                                 request_data_object,
+                                                                 machine_id,
+                                                                 new_internal_print_id,
+                                                                 request_data_object['selected_events_index'],
+                                                                 cancellation=cancellation)
+                    cancellation.raise_if_cancelled("showing the event")
+
+                    curr_graph_fig = graph_fig
+                    curr_overview_fig = overview_fig
+                    curr_graph_style = graph_style
+                    curr_overview_style = overview_style
+                    curr_stored_data = stored_data
+
+                    start_ts = format_event_timestamp(start_date_dt)
+                    end_ts = format_event_timestamp(end_date_dt)
+
+                    filter_by = "no_filter" if labels_type == 3 else "start_timestamp"
+                    relevant_anomalies_df = request_data_object['selected_event_anomalies'] \
+                        if labels_type == 2 else None
+                    if labels_type == 1:
+                        data_sources_checklist = analyzed_data_sources
+                    else:
+                        data_sources_checklist = get_initial_data_sources_to_show(machine_id,
+                                                                                  request_data_object,
+                                                                                  relevant_anomalies_df,
+                                                                                  filter_by=filter_by)
+                    if navigate_fast:
+                        curr_graph_fig, curr_overview_fig, curr_graph_style, curr_overview_style, curr_stored_data = \
+                            create_graph_content(request_data_object,
+                                                 machine_name,
+                                                 start_ts,
+                                                 end_ts,
+                                                 data_sources_checklist,
+                                                 draw_labeled_events,
+                                                 selected_labeled_events_types,
+                                                 draw_predicted_anomalies,
+                                                 draw_predicted_events,
+                                                 draw_manual_events,
+                                                 show_algo_results,
+                                                 cancellation=cancellation)
+                        if curr_graph_fig is None:
+                            return no_update
+                    cancellation.raise_if_cancelled("showing the event")
+                except FetchCancelled as e:
+                    log.debug(e)
+                    raise PreventUpdate("Navigation was superseded")
+                request_data_object['navigation_clicks'] = navigation_clicks
+                request_data_object.commit()
+
+            prefetch_neighbouring_events(data_object, machine_id, labels_type, data_sources_checklist,
                                          show_algo_results)
-                if curr_graph_fig is None:
-                    return no_update
-
             return get_event_id_str(selected_machine_events), \
                 get_event_type_str(selected_machine_events, data_object['selected_event_internal']), \
                 start_ts, end_ts, analyzed_data_sources, data_object['selected_event_internal'] + 1, False, \
@@ -905,7 +1282,8 @@ def create_predictive_callbacks(app, data_object):
             State("checkbox-show-pred-anomalies", "checked"),
             State("checkbox-show-pred-events", "checked"),
             State("checkbox-show-manual-events", "checked"),
-            State("checkbox-show-algo-results", "checked")
+            State("checkbox-show-algo-results", "checked"),
+            State(STORE_ID, "data"),
         ],
         prevent_initial_call=True,
     )
@@ -921,6 +1299,7 @@ def create_predictive_callbacks(app, data_object):
             draw_predicted_events,
             draw_manual_events,
             show_algo_results,
+            stored_figure,
     ):
         if show_raw_data_n_clicks:
             curr_graph_fig, curr_overview_fig, curr_graph_style, curr_overview_style, curr_stored_data = \
@@ -934,7 +1313,8 @@ def create_predictive_callbacks(app, data_object):
                                      draw_predicted_anomalies,
                                      draw_predicted_events,
                                      draw_manual_events,
-                                     show_algo_results)
+                                     show_algo_results,
+                                     previous_figure=stored_figure)
             if curr_graph_fig is None:
                 return no_update
             return [False, curr_graph_fig, curr_overview_fig, curr_graph_style, curr_overview_style, curr_stored_data]
@@ -985,21 +1365,21 @@ def create_predictive_callbacks(app, data_object):
                             ):
 
         if next_dates_n_clicks or previous_dates_n_clicks:
-
-            current_start_date = try_parsing_date(start_timestamp)
-            current_end_date = try_parsing_date(end_timestamp)
+            # Clicks of abandoned requests are applied by the latest one, it moves to where all clicks lead
+            steps, navigation_clicks = get_navigation_steps(data_object, "dates", next_dates_n_clicks,
+                                                            previous_dates_n_clicks)
+            if steps is None:
+                raise PreventUpdate("Navigation clicks were already applied")
+
+            picker_start_date = try_parsing_date(start_timestamp)
+            picker_end_date = try_parsing_date(end_timestamp)
+            current_start_date, current_end_date = get_navigation_dates_base(data_object,
+                                                                             picker_start_date,
+                                                                             picker_end_date)
             delta = current_end_date - current_start_date
 
-            trigger = callback_context.triggered[0]
-            pressed_button = trigger["prop_id"].split(".")[0]
-
-            if pressed_button == "load-next-dates":
-                new_start_date = current_end_date
-                new_end_date = current_end_date + delta
-
-            if pressed_button == "load-previous-dates":
-                new_start_date = current_start_date - delta
-                new_end_date = current_start_date
+            new_start_date = current_start_date + steps * delta
+            new_end_date = current_end_date + steps * delta
 
             curr_graph_fig = graph_fig
             curr_overview_fig = overview_fig
@@ -1010,22 +1390,30 @@ def create_predictive_callbacks(app, data_object):
             new_start_ts = new_start_date.strftime("%Y-%m-%dT%H:%M:%S")
             new_end_ts = new_end_date.strftime("%Y-%m-%dT%H:%M:%S")
 
+            # The dates and the clicks reach the session only when the request is not superseded
+            request_data_object = StagedSessionView(data_object)
             if navigate_fast:
-                curr_graph_fig, curr_overview_fig, curr_graph_style, curr_overview_style, curr_stored_data = \
-                    create_graph_content(data_object,
-                                         machine_name,
-                                         new_start_ts,
-                                         new_end_ts,
-                                         analyzed_data_sources,
-                                         draw_labeled_events,
-                                         selected_labeled_events_types,
-                                         draw_predicted_anomalies,
-                                         draw_predicted_events,
-                                         draw_manual_events,
-                                         show_algo_results)
+                with view_request() as cancellation:
+                    curr_graph_fig, curr_overview_fig, curr_graph_style, curr_overview_style, curr_stored_data = \
+                        create_graph_content(request_data_object,
+                                             machine_name,
+                                             new_start_ts,
+                                             new_end_ts,
+                                             analyzed_data_sources,
+                                             draw_labeled_events,
+                                             selected_labeled_events_types,
+                                             draw_predicted_anomalies,
+                                             draw_predicted_events,
+                                             draw_manual_events,
+                                             show_algo_results,
+                                             cancellation=cancellation)
                 if curr_graph_fig is None:
                     return no_update
 
+            request_data_object['navigation_clicks'] = navigation_clicks
+            request_data_object['navigation_dates'] = {"origin": [picker_start_date, picker_end_date],
+                                                       "target": [new_start_date, new_end_date]}
+            request_data_object.commit()
             return new_start_ts, new_end_ts, False, \
                 curr_graph_fig, curr_overview_fig, curr_graph_style, curr_overview_style, curr_stored_data
 
@@ -1051,7 +1439,8 @@ def create_predictive_callbacks(app, data_object):
             State("checkbox-show-pred-anomalies", "checked"),
             State("checkbox-show-pred-events", "checked"),
             State("checkbox-show-manual-events", "checked"),
-            State("checkbox-show-algo-results", "checked")
+            State("checkbox-show-algo-results", "checked"),
+            State(STORE_ID, "data"),
         ],
     )
     def update_output_raw(
@@ -1066,6 +1455,7 @@ def create_predictive_callbacks(app, data_object):
             draw_predicted_events,
             draw_manual_events,
             show_algo_results,
+            stored_figure,
     ):
         if show_raw_data_n_clicks:
             curr_graph_fig, curr_overview_fig, curr_graph_style, curr_overview_style, curr_stored_data = \
@@ -1079,7 +1469,8 @@ def create_predictive_callbacks(app, data_object):
                                      draw_predicted_anomalies,
                                      draw_predicted_events,
                                      draw_manual_events,
-                                     show_algo_results)
+                                     show_algo_results,
+                                     previous_figure=stored_figure)
             if curr_graph_fig is None:
                 return no_update
             return [False, curr_graph_fig, curr_overview_fig, curr_graph_style, curr_overview_style, curr_stored_data]
@@ -1148,6 +1539,8 @@ def create_predictive_callbacks(app, data_object):
                 before_hours=data_object["configurations"]["time_configurations"]["show_before_event"],
                 after_hours=data_object["configurations"]["time_configurations"]["show_after_event"],
                 load_deprecated=data_object["configurations"]["manual_tagging"]["show_deprecated"])
+            # The manual events index of the tagged machine is rebuilt now, the ones of other machines when next used
+            get_machine_events_index(data_object, 3, machine_id)
 
             return n_clicks
         return no_update
@@ -1191,14 +1584,13 @@ def create_predictive_callbacks(app, data_object):
                 after_hours=data_object["configurations"]["time_configurations"]["show_after_event"],
                 load_deprecated=data_object["configurations"]["manual_tagging"]["show_deprecated"])
 
-            selected_machine_events = get_machine_events(data_object, labels_type, machine_id, False)
-            data_object['selected_machine_events'] = selected_machine_events
+            selected_machine_events = select_machine_events(data_object, labels_type, machine_id, False)
 
             start_date_dt, end_date_dt = update_event_id(labels_type,
                                                          data_object,
                                                          machine_id,
                                                          data_object['internal_event_id'],
-                                                         selected_machine_events)
+                                                         data_object['selected_events_index'])
             data_sources_checklist = get_initial_data_sources_to_show(machine_id,
                                                                       data_object,
                                                                       None,
@@ -1232,6 +1624,36 @@ def create_predictive_callbacks(app, data_object):
             return not is_open
         return is_open
 
+    # --- metadata tables paging logic ---
+    @app.callback(
+        Output("data-sources-metadata-table", "data"),
+        Output("data-sources-metadata-table", "page_count"),
+        Input("data-sources-metadata-table", "page_current"),
+        Input("data-sources-metadata-table", "page_size"),
+        Input("data-sources-metadata-table", "filter_query"),
+        Input("data-sources-metadata-table", "sort_by"),
+        State("machine-dropdown", "value"),
+        prevent_initial_call=True
+    )
+    def update_data_sources_metadata_page(page_current, page_size, filter_query, sort_by, machine_name):
+        machine_id = get_machine_id_by_name(machine_name)
+        ensure_machine_loaded(data_object, machine_id)
+        metadata_table = get_data_sources_metadata_table(machine_id, data_object["data_sources_metadata"][machine_id])
+        return metadata_table.get_page(page_current, page_size, filter_query, sort_by)
+
+    @app.callback(
+        Output("machines-metadata-table", "data"),
+        Output("machines-metadata-table", "page_count"),
+        Input("machines-metadata-table", "page_current"),
+        Input("machines-metadata-table", "page_size"),
+        Input("machines-metadata-table", "filter_query"),
+        Input("machines-metadata-table", "sort_by"),
+        prevent_initial_call=True
+    )
+    def update_machines_metadata_page(page_current, page_size, filter_query, sort_by):
+        metadata_table = get_machines_metadata_table(data_object.get("only_manual_mode", False))
+        return metadata_table.get_page(page_current, page_size, filter_query, sort_by)
+
     # --- FigureResampler update logic ---
     @app.callback(
         Output(TRACEUPDATER_ID, "updateData"),
@@ -1242,6 +1664,13 @@ def create_predictive_callbacks(app, data_object):
     def update_fig(relayoutdata, fig):
         if fig is None:
             return no_update
+        # The stored figure keeps its aggregated data, the full resolution data of a zoomed in window is added to
+        # this copy only. Zooming again fetches it again, from the raw data cache, instead of writing the whole
+        # figure back to the store on every zoom
+        traces_data_sources = get_traces_data_sources(fig) if data_object.get("update_figures_in_place", False) else []
+        x_range = get_relayout_x_range(relayoutdata)
+        if traces_data_sources and x_range is not None and not is_aggregated_window(*x_range):
+            load_full_resolution_traces(fig, traces_data_sources, *x_range)
         return fig.construct_update_data(relayoutdata)
 
     # --- Clientside callbacks used to bidirectionally link the overview and main graph ---
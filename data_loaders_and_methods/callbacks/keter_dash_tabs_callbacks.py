@@ -1,5 +1,6 @@
 from dash import Input, Output, no_update
 
+from src.data_loaders.keter_data_loader import ensure_machine_loaded
 from src.data_loaders.keter_raw_data import get_machine_id_by_name
 from src.widgets.data_sources_widgets_creation import (
     create_data_sources_analysis_tab_content,
@@ -19,6 +20,7 @@ def create_tabs_callbacks(app, data):
     def update_tab(active_tab, machine_name):
         print(active_tab)
         machine_id = get_machine_id_by_name(machine_name)
+        ensure_machine_loaded(data, machine_id)
         if active_tab == 'tab-predictive-analytics-data-sources':
             return create_data_sources_analysis_tab_content(), create_full_load_data_widget_children(), []
         if active_tab == 'tab-machine-health':
@@ -0,0 +1,52 @@
+import os
+
+from src.data_loaders.algo.keter_algorithmic_events_data import (
+    get_predicted_anomalies_from_db,
+    get_predicted_anomalies_from_csv
+)
+from src.data_loaders.algo.keter_algorithmic_reconstruction_data import (
+    load_algorithmic_results_data,
+    load_algorithmic_results_data_multi
+)
+from src.logic.results_cache import ResultsCache
+
+anomalies_cache = ResultsCache(max_entries=int(os.environ.get("ANOMALIES_CACHE_MAX_ENTRIES", 256)))
+reconstruction_cache = ResultsCache(max_entries=int(os.environ.get("RECONSTRUCTION_CACHE_MAX_ENTRIES", 32)))
+
+
+def to_ids_key(ids):
+    return None if ids is None else tuple(int(curr_id) for curr_id in ids)
+
+
+def get_predicted_anomalies_cached(pred_events_pipe_version, machine_id, anomaly_ids, start_timestamp, end_timestamp):
+    key = (pred_events_pipe_version, str(machine_id), to_ids_key(anomaly_ids), start_timestamp, end_timestamp)
+
+    def load():
+        if pred_events_pipe_version == 'manual':
+            return get_predicted_anomalies_from_csv(machine_id, anomaly_ids, start_timestamp, end_timestamp)
+        return get_predicted_anomalies_from_db(machine_id, pred_events_pipe_version, anomaly_ids,
+                                               start_timestamp, end_timestamp)
+
+    return anomalies_cache.get_or_load(key, load)
+
+
+def load_reconstruction_cached(meta_experiment_slug, reading_files_multi, data_source_ids, alg_name, is_scaled,
+                               start_timestamp, end_timestamp):
+    key = (meta_experiment_slug, reading_files_multi, to_ids_key(data_source_ids), alg_name, is_scaled,
+           start_timestamp, end_timestamp)
+    load_reconstruction_func = load_algorithmic_results_data_multi \
+        if reading_files_multi else load_algorithmic_results_data
+
+    return reconstruction_cache.get_or_load(key, lambda: load_reconstruction_func(
+        meta_experiment_slug=meta_experiment_slug,
+        data_source_ids=data_source_ids,
+        alg_name=alg_name,
+        is_scaled=is_scaled,
+        start_timestamp=start_timestamp,
+        end_timestamp=end_timestamp,
+    ))
+
+
+def clear_algorithmic_caches():
+    anomalies_cache.clear()
+    reconstruction_cache.clear()
@@ -1,3 +1,8 @@
+import os
+import threading
+import time
+from functools import partial
+
 import pandas as pd
 
 import pytz as pytz
@@ -6,60 +11,251 @@ from src.data_loaders.algo.keter_algorithmic_events_data import load_predicted_e
 from src.data_loaders.keter_labeled_events import load_labeled_categories
 from src.data_loaders.keter_manual_events import load_manual_events_from_db, load_manual_events_from_csv
 from src.data_loaders.keter_pipelines_versions_loader import get_pipeline_versions
-from src.data_loaders.keter_raw_data import get_ingestion_rates, load_data_sources_connections
+from src.data_loaders.keter_raw_data import (
+    get_ingestion_rates,
+    load_data_sources_connections,
+    get_machine_id_by_name,
+    get_data_sources_connections_lookup,
+)
 from src.data_loaders.keter_statistical_data import load_metadata
 from src.keter_globals import *
+from src.logic.concurrency import run_concurrently
+from src.logic.shared_store import get_shared_store
 
 from loguru import logger as log
 
 target_tz = 'Asia/Jerusalem'
+# Machine sections loaded by another worker process are reused for this long
+shared_sections_ttl_seconds = float(os.environ.get("SHARED_SECTIONS_TTL_SECONDS", 60 * 60))
+configurations_sync_lock = threading.Lock()
+# Configuration changes published by another worker process are looked for at most this often
+configurations_sync_interval_seconds = float(os.environ.get("CONFIGURATIONS_SYNC_INTERVAL_SECONDS", 5))
 
 
-def initialize_data_object(data_object, machines, only_manual_mode):
-    if only_manual_mode:
-        log.warning('Only manual mode is set')
-        return
+class MachinesLoadState:
+    def __init__(self, machines):
+        self.machine_names = {get_machine_id_by_name(machine_name): machine_name for machine_name in machines}
+        self.loaded_machines = set()
+        self.__lock = threading.Lock()
+        self.__machine_locks = {}
 
-    data_object["data_sources_metadata"] = load_metadata(
-        machines,
-        data_object["configurations"]["pipeline_versions"]["stats_pipe_version"]
-    )
+    def get_machine_lock(self, machine_id):
+        with self.__lock:
+            return self.__machine_locks.setdefault(machine_id, threading.Lock())
 
-    data_object["ingestion_rates"] = get_ingestion_rates(machines)
 
-    is_db_used = data_object['configurations']['manual_tagging']['use_db']
-    reading_manual_events_function = load_manual_events_from_db if is_db_used else load_manual_events_from_csv
+def get_machine_sections_loaders(data_object, machines):
+    pipeline_versions = data_object["configurations"]["pipeline_versions"]
+    time_configurations = data_object["configurations"]["time_configurations"]
 
-    labeled_events_pipe_version = data_object["configurations"]["pipeline_versions"]["labeled_events_pipe_version"]
+    loaders = {
+        "data_sources_metadata": partial(load_metadata, machines, pipeline_versions["stats_pipe_version"]),
+        "ingestion_rates": partial(get_ingestion_rates, machines),
+    }
+
+    labeled_events_pipe_version = pipeline_versions["labeled_events_pipe_version"]
     if labeled_events_pipe_version != 'manual':
-        data_object["events"]['labeled'] = load_labeled_categories(
+        loaders["labeled_events"] = partial(
+            load_labeled_categories,
             machines=machines,
             labeled_events_pipe_version=labeled_events_pipe_version,
-            before_hours=
-            data_object["configurations"]["time_configurations"]["show_before_event"],
-            after_hours=data_object["configurations"]["time_configurations"]["show_after_event"],
+            before_hours=time_configurations["show_before_event"],
+            after_hours=time_configurations["show_after_event"],
         )
 
-    data_object["events"]['manual'] = reading_manual_events_function(
-        before_hours=data_object["configurations"]["time_configurations"]["show_before_event"],
-        after_hours=data_object["configurations"]["time_configurations"]["show_after_event"],
-        load_deprecated=data_object["configurations"]["manual_tagging"]["show_deprecated"])
-
-    predicted_events_pipe_version = data_object["configurations"]["pipeline_versions"]["events_pipe_version"]
+    predicted_events_pipe_version = pipeline_versions["events_pipe_version"]
     if predicted_events_pipe_version != 'manual':
-        data_object['algo']['predicted_events'] = load_predicted_events(
+        loaders["predicted_events"] = partial(
+            load_predicted_events,
             machines=machines,
-            pred_events_pipe_version=
-            data_object["configurations"][
-                "pipeline_versions"]["events_pipe_version"],
-            before_hours=data_object["configurations"][
-                "time_configurations"]["show_before_event"],
-            after_hours=data_object["configurations"][
-                "time_configurations"]["show_after_event"]
+            pred_events_pipe_version=predicted_events_pipe_version,
+            before_hours=time_configurations["show_before_event"],
+            after_hours=time_configurations["show_after_event"]
         )
+    return loaders
+
+
+def get_global_sections_loaders(data_object, machines):
+    time_configurations = data_object["configurations"]["time_configurations"]
+
+    is_db_used = data_object['configurations']['manual_tagging']['use_db']
+    reading_manual_events_function = load_manual_events_from_db if is_db_used else load_manual_events_from_csv
+
+    return {
+        "manual_events": partial(
+            reading_manual_events_function,
+            before_hours=time_configurations["show_before_event"],
+            after_hours=time_configurations["show_after_event"],
+            load_deprecated=data_object["configurations"]["manual_tagging"]["show_deprecated"]),
+        "data_sources_connections": partial(load_data_sources_connections, machines=machines),
+    }
+
+
+def store_machine_sections(data_object, results):
+    sections = {
+        "data_sources_metadata": ["data_sources_metadata"],
+        "ingestion_rates": ["ingestion_rates"],
+        "labeled_events": ["events", "labeled"],
+        "predicted_events": ["algo", "predicted_events"],
+    }
+    for result_name, section_path in sections.items():
+        if result_name not in results:
+            continue
+        parent = data_object
+        for key in section_path[:-1]:
+            parent = parent[key]
+        if parent.get(section_path[-1]) is None:
+            parent[section_path[-1]] = dict()
+        parent[section_path[-1]].update(results[result_name])
+
+
+def initialize_data_object(data_object, machines, only_manual_mode):
+    # Returns the names of the sections that failed loading, so the user can be told about them
+    if only_manual_mode:
+        log.warning('Only manual mode is set')
+        return []
+
+    loading_configurations = data_object["configurations"]["loading_configurations"]
+    # Workers sharing a store load the per-machine sections on first use, from the sections shared by the worker that
+    # loaded them. A configuration change synced by a worker then only reloads the global sections
+    is_lazy = loading_configurations["lazy"] or get_shared_store() is not None
+
+    load_state = MachinesLoadState(machines)
+    data_object["machines_load_state"] = load_state
+
+    # None of the loaders depends on another, so they are fetched concurrently.
+    # In lazy mode the per-machine sections are fetched on first use by ensure_machine_loaded
+    loaders = get_global_sections_loaders(data_object, machines)
+    machine_loaders = {} if is_lazy else get_machine_sections_loaders(data_object, machines)
+    loaders.update(machine_loaders)
+
+    results = run_concurrently(loaders)
+    failed_sections = [name for name in loaders if name not in results]
+
+    # Sections of the previous configuration must not stay in place when their reload failed
+    reset_machine_sections(data_object, machines)
+    store_machine_sections(data_object, results)
+    # Machines whose sections failed are loaded again on first use by ensure_machine_loaded
+    if machine_loaders and not any(name in machine_loaders for name in failed_sections):
+        load_state.loaded_machines.update(load_state.machine_names.keys())
+    data_object["events"]['manual'] = results.get("manual_events", pd.DataFrame(columns=manual_events_columns))
 
     data_object['preprocessed_raw_data'] = dict()
-    data_object['preprocessed_raw_data']['data_sources_connections_v'] = load_data_sources_connections(machines=machines)
+    data_object['preprocessed_raw_data']['data_sources_connections_v'] = results.get("data_sources_connections",
+                                                                                     pd.DataFrame())
+    data_object['preprocessed_raw_data']['data_sources_connections_lookup'] = get_data_sources_connections_lookup(
+        data_object['preprocessed_raw_data']['data_sources_connections_v'])
+
+    if is_lazy and loading_configurations["prefetch_machines"]:
+        threading.Thread(target=prefetch_machines, args=(data_object, load_state), daemon=True,
+                         name="machines-prefetch").start()
+
+    if failed_sections:
+        log.error(f"Loading {', '.join(failed_sections)} failed")
+    return failed_sections
+
+
+def reset_machine_sections(data_object, machines):
+    machine_ids = [get_machine_id_by_name(machine_name) for machine_name in machines]
+    pipeline_versions = data_object["configurations"]["pipeline_versions"]
+    data_object["data_sources_metadata"] = dict.fromkeys(machine_ids)
+    data_object["ingestion_rates"] = dict.fromkeys(machine_ids)
+    # Manually uploaded sections are kept, they are not reloaded from the DB
+    if pipeline_versions["labeled_events_pipe_version"] != 'manual':
+        data_object["events"]['labeled'] = dict.fromkeys(machine_ids)
+    if pipeline_versions["events_pipe_version"] != 'manual':
+        data_object['algo']['predicted_events'] = dict.fromkeys(machine_ids)
+
+
+def get_machine_sections_key(data_object, machine_id):
+    pipeline_versions = data_object["configurations"]["pipeline_versions"]
+    time_configurations = data_object["configurations"]["time_configurations"]
+    versions = ",".join(f"{key}={pipeline_versions[key]}" for key in sorted(pipeline_versions.keys()))
+    return f"machine_sections:{versions}:{time_configurations['show_before_event']}:" \
+           f"{time_configurations['show_after_event']}:{machine_id}"
+
+
+def load_machine_sections(data_object, machine_id, machine_name):
+    loaders = get_machine_sections_loaders(data_object, [machine_name])
+    shared_store = get_shared_store()
+    if shared_store is None:
+        return loaders, run_concurrently(loaders)
+
+    key = get_machine_sections_key(data_object, machine_id)
+    shared_sections = shared_store.get(key)
+    if shared_sections is not None and time.time() - shared_sections[0] <= shared_sections_ttl_seconds:
+        return loaders, shared_sections[1]
+
+    results = run_concurrently(loaders)
+    if len(results) == len(loaders):
+        shared_store.put(key, (time.time(), results))
+    return loaders, results
+
+
+def ensure_machine_loaded(data_object, machine_id):
+    load_state = data_object.get("machines_load_state")
+    if load_state is None or machine_id in load_state.loaded_machines:
+        return
+    if machine_id not in load_state.machine_names:
+        log.warning(f"Machine {machine_id} is unknown, its data will not be loaded")
+        return
+
+    with load_state.get_machine_lock(machine_id):
+        if machine_id in load_state.loaded_machines:
+            return
+        log.debug(f"Loading data of machine {machine_id} on first use")
+        loaders, results = load_machine_sections(data_object, machine_id, load_state.machine_names[machine_id])
+        # The configuration may have been reset while loading, the results then belong to old versions
+        if data_object.get("machines_load_state") is not load_state:
+            return
+        store_machine_sections(data_object, results)
+        # Failed sections are retried the next time the machine is used
+        if len(results) == len(loaders):
+            load_state.loaded_machines.add(machine_id)
+
+
+def prefetch_machines(data_object, load_state):
+    for machine_id in load_state.machine_names.keys():
+        if data_object.get("machines_load_state") is not load_state:
+            return
+        try:
+            ensure_machine_loaded(data_object, machine_id)
+        except Exception as e:
+            log.error(f"Prefetching machine {machine_id} failed: {e}")
+
+
+def publish_configurations(data_object):
+    # Lets the other worker processes pick up a configuration changed by this one
+    shared_store = get_shared_store()
+    if shared_store is None:
+        return
+    version = time.time_ns()
+    shared_store.put("configurations", (version, data_object["configurations"]))
+    data_object["configurations_version"] = version
+
+
+def sync_configurations(data_object, machines, clear_configuration_caches):
+    # clear_configuration_caches drops what this process derived from the previous configuration, the same way as
+    # in the process that changed it
+    shared_store = get_shared_store()
+    if shared_store is None:
+        return
+    now = time.monotonic()
+    if now - data_object.get("configurations_checked_at", float("-inf")) < configurations_sync_interval_seconds:
+        return
+    data_object["configurations_checked_at"] = now
+    published = shared_store.get("configurations")
+    if published is None or published[0] == data_object.get("configurations_version"):
+        return
+
+    with configurations_sync_lock:
+        if published[0] == data_object.get("configurations_version"):
+            return
+        log.debug("Configuration was changed by another worker, reloading data")
+        data_object["configurations"] = published[1]
+        data_object["configurations_version"] = published[0]
+        clear_configuration_caches()
+        initialize_data_object(data_object, machines, only_manual_mode=False)
 
 
 def try_parsing_date(text):
@@ -85,13 +281,8 @@ def make_timestamp_tz_naive(dt):
     return dt
 
 
-def get_event_metadata(internal_event_id, events_df):
-    relevant_print_row = events_df[events_df["internal_event_id"] == internal_event_id]
-    event_start_time = pd.Timestamp(relevant_print_row["start_timestamp"].values[0])
-    event_end_time = pd.Timestamp(relevant_print_row["end_timestamp"].values[0])
-
-    event_type = relevant_print_row["label_name"].values[0] if 'label_name' in events_df.columns else "Predicted"
-    return event_start_time, event_end_time, event_type
+def get_event_metadata(internal_event_id, events_index):
+    return events_index.get_event(internal_event_id)
 
 
 def get_event_id_str(machine_events):
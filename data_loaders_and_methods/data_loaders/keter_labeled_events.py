@@ -8,29 +8,24 @@ import pandas as pd
 
 import dcdal
 
-from src.data_loaders.keter_raw_data import get_machine_id_by_name
+from src.data_loaders.keter_raw_data import get_machine_id_by_name, get_machines_condition
 
 from src.keter_globals import *
+from src.logic.connection_pool import pooled_connection
 import src.logic.utilities as utils
 
 
 def get_event_types_df():
-    conn = dcdal.DALConnection(
-        host=os.environ["DB_HOST"],
-        db=os.environ["DB_NAME"],
-        user=os.environ["DB_USER"],
-        password=os.environ["DB_PASSWORD"],
-    )
-    reader = dcdal.DALReader(connection=conn)
-    events_labels_df = reader.read_table_to_dataframe(
-        schema="events",
-        table="labeled_event_types",
-        columns=[
-            "event_type_id",
-            "event_type_name"
-        ],
-    )
-    conn.close()
+    with pooled_connection() as conn:
+        reader = dcdal.DALReader(connection=conn)
+        events_labels_df = reader.read_table_to_dataframe(
+            schema="events",
+            table="labeled_event_types",
+            columns=[
+                "event_type_id",
+                "event_type_name"
+            ],
+        )
     return events_labels_df
 
 
@@ -100,67 +95,101 @@ def get_labeled_category_from_df(labeled_events_df, before_hours, after_hours, m
     return data_obj, machines_with_data
 
 
-def get_labeled_category_from_db(machine_id, labeled_events_pipe_version):
-    conn = dcdal.DALConnection(
-        host=os.environ["DB_HOST"],
-        db=os.environ["DB_NAME"],
-        user=os.environ["DB_USER"],
-        password=os.environ["DB_PASSWORD"],
-    )
-    reader = dcdal.DALReader(connection=conn)
-    labeled_events_df = reader.read_table_to_dataframe(
-        schema="events",
-        table="merged_calculated_labeled_events",
-        columns=[
-            "event_id",
-            "start_timestamp",
-            "end_timestamp",
-            "event_type_id"
-        ],
-        conditions=[f"machine_id = {machine_id}", f"run_id = {labeled_events_pipe_version}"],
-    )
-    conn.close()
-    if not labeled_events_df.empty:
-        labeled_events_df["event_type"] = labeled_events_df["event_type_id"]
-        labeled_events_df['label_name'] = labeled_events_df['event_type'].map(
-            get_event_types_df().set_index('event_type_id')['event_type_name'])
-    return labeled_events_df
-
-
-def get_labeled_events_per_datasource_from_db(machine_id, labeled_events_pipe_version):
-    conn = dcdal.DALConnection(
-        host=os.environ["DB_HOST"],
-        db=os.environ["DB_NAME"],
-        user=os.environ["DB_USER"],
-        password=os.environ["DB_PASSWORD"],
-    )
-    reader = dcdal.DALReader(connection=conn)
-    labeled_events_per_datasource_df = reader.read_table_to_dataframe(
-        schema="events",
-        table="calculated_labeled_events_per_data_source",
-        columns=[
-            "event_id",
-            "start_timestamp",
-            "end_timestamp",
-            "event_type_id",
-            "data_source_id"
-        ],
-        conditions=[f"machine_id = {machine_id}", f"run_id = {labeled_events_pipe_version}"],
-    )
-    conn.close()
-    if not labeled_events_per_datasource_df.empty:
-        labeled_events_per_datasource_df["event_type"] = labeled_events_per_datasource_df["event_type_id"]
-        labeled_events_per_datasource_df['label_name'] = labeled_events_per_datasource_df['event_type'].map(
-            get_event_types_df().set_index('event_type_id')['event_type_name'])
-    return labeled_events_per_datasource_df
+def add_event_type_names(events_df, event_types_df):
+    if not events_df.empty:
+        events_df["event_type"] = events_df["event_type_id"]
+        events_df['label_name'] = events_df['event_type'].map(
+            event_types_df.set_index('event_type_id')['event_type_name'])
+    return events_df
+
+
+def normalize_event_timestamps(events_df):
+    # Timestamps read from the DB end up like the ones parsed from files: naive and in UTC
+    events_df["start_timestamp"] = utils.to_pd_datetime(events_df["start_timestamp"])
+    events_df["end_timestamp"] = utils.to_pd_datetime(events_df["end_timestamp"])
+    return events_df
+
+
+def split_events_by_machine(events_df, machine_ids):
+    empty_events_df = events_df.iloc[0:0].drop(columns=['machine_id'], errors='ignore')
+    events_per_machine = {str(machine_id): empty_events_df.copy() for machine_id in machine_ids}
+    if events_df.empty:
+        return events_per_machine
+    for machine_id, machine_events_df in events_df.groupby('machine_id', sort=False):
+        events_per_machine[str(machine_id)] = machine_events_df.drop(columns=['machine_id']).reset_index(drop=True)
+    return events_per_machine
+
+
+def get_labeled_category_from_db_multi(machine_ids, labeled_events_pipe_version, event_types_df=None):
+    with pooled_connection() as conn:
+        reader = dcdal.DALReader(connection=conn)
+        labeled_events_df = reader.read_table_to_dataframe(
+            schema="events",
+            table="merged_calculated_labeled_events",
+            columns=[
+                "machine_id",
+                "event_id",
+                "start_timestamp",
+                "end_timestamp",
+                "event_type_id"
+            ],
+            conditions=[get_machines_condition(machine_ids), f"run_id = {labeled_events_pipe_version}"],
+        )
+    labeled_events_df = normalize_event_timestamps(labeled_events_df)
+    if event_types_df is None and not labeled_events_df.empty:
+        event_types_df = get_event_types_df()
+    return add_event_type_names(labeled_events_df, event_types_df)
+
+
+def get_labeled_events_per_datasource_from_db_multi(machine_ids, labeled_events_pipe_version, event_types_df=None):
+    with pooled_connection() as conn:
+        reader = dcdal.DALReader(connection=conn)
+        labeled_events_per_datasource_df = reader.read_table_to_dataframe(
+            schema="events",
+            table="calculated_labeled_events_per_data_source",
+            columns=[
+                "machine_id",
+                "event_id",
+                "start_timestamp",
+                "end_timestamp",
+                "event_type_id",
+                "data_source_id"
+            ],
+            conditions=[get_machines_condition(machine_ids), f"run_id = {labeled_events_pipe_version}"],
+        )
+    labeled_events_per_datasource_df = normalize_event_timestamps(labeled_events_per_datasource_df)
+    if event_types_df is None and not labeled_events_per_datasource_df.empty:
+        event_types_df = get_event_types_df()
+    return add_event_type_names(labeled_events_per_datasource_df, event_types_df)
+
+
+def get_labeled_category_from_db(machine_id, labeled_events_pipe_version, event_types_df=None):
+    labeled_events_df = get_labeled_category_from_db_multi([machine_id], labeled_events_pipe_version, event_types_df)
+    return labeled_events_df.drop(columns=['machine_id'], errors='ignore')
+
+
+def get_labeled_events_per_datasource_from_db(machine_id, labeled_events_pipe_version, event_types_df=None):
+    labeled_events_per_datasource_df = get_labeled_events_per_datasource_from_db_multi(
+        [machine_id], labeled_events_pipe_version, event_types_df)
+    return labeled_events_per_datasource_df.drop(columns=['machine_id'], errors='ignore')
 
 
 def load_labeled_categories(machines, labeled_events_pipe_version, before_hours, after_hours):
+    machine_ids = [get_machine_id_by_name(machine_name) for machine_name in machines]
+
+    # One query per table for all machines, split in memory afterwards
+    event_types_df = get_event_types_df()
+    events_per_machine = split_events_by_machine(
+        get_labeled_category_from_db_multi(machine_ids, labeled_events_pipe_version, event_types_df),
+        machine_ids)
+    events_per_datasource_per_machine = split_events_by_machine(
+        get_labeled_events_per_datasource_from_db_multi(machine_ids, labeled_events_pipe_version, event_types_df),
+        machine_ids)
+
     curr_data_object = {}
-    for machine_name in machines:
-        machine_id = get_machine_id_by_name(machine_name)
-        events_df = get_labeled_category_from_db(machine_id, labeled_events_pipe_version)
-        events_per_datasource_df = get_labeled_events_per_datasource_from_db(machine_id, labeled_events_pipe_version)
+    for machine_name, machine_id in zip(machines, machine_ids):
+        events_df = events_per_machine[machine_id]
+        events_per_datasource_df = events_per_datasource_per_machine[machine_id]
         if events_df.empty:
             print(f"Warning: Machine {machine_name} has no data, generating one 'no data' event")
             events_df = generate_no_data_events_df()
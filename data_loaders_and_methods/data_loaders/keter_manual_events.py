@@ -6,17 +6,20 @@ import pandas as pd
 import dcdal
 
 from src.keter_globals import *
+from src.logic.connection_pool import pooled_connection
 import src.logic.utilities as utils
 
+from loguru import logger as log
+
 
 def load_manual_events_from_csv(before_hours, after_hours, load_deprecated=False):
     manual_events_file = os.path.join("temporary_data", "manual_events.csv")
     if os.path.exists(manual_events_file):
         manual_events_df = pd.read_csv(manual_events_file)
-        manual_events_df['start_timestamp'] = pd.to_datetime(manual_events_df['start_timestamp'],
-                                                             format="%Y-%m-%d %H:%M:%S.%f")
-        manual_events_df['end_timestamp'] = pd.to_datetime(manual_events_df['end_timestamp'],
-                                                           format="%Y-%m-%d %H:%M:%S.%f")
+        manual_events_df['start_timestamp'] = utils.to_pd_datetime(manual_events_df['start_timestamp'],
+                                                                   dt_format="%Y-%m-%d %H:%M:%S.%f", utc=False)
+        manual_events_df['end_timestamp'] = utils.to_pd_datetime(manual_events_df['end_timestamp'],
+                                                                 dt_format="%Y-%m-%d %H:%M:%S.%f", utc=False)
         manual_events_df["before_event_timestamp"] = manual_events_df["start_timestamp"] - timedelta(hours=before_hours)
         manual_events_df["after_event_timestamp"] = manual_events_df["end_timestamp"] + timedelta(hours=after_hours)
         manual_events_df["label_name"] = "Manual"
@@ -28,20 +31,14 @@ def load_manual_events_from_csv(before_hours, after_hours, load_deprecated=False
 
 
 def load_manual_events_from_db(before_hours, after_hours, load_deprecated=False):
-    conn = dcdal.DALConnection(
-        host=os.environ["DB_HOST"],
-        db=os.environ["DB_NAME"],
-        user=os.environ["DB_USER"],
-        password=os.environ["DB_PASSWORD"],
-    )
-    reader = dcdal.DALReader(connection=conn)
-
-    manual_events_df = reader.read_table_to_dataframe(
-        schema="algo",
-        table=f"manually_tagged_events",
-        columns=['event_id'] + manual_events_columns,
-    )
-    conn.close()
+    with pooled_connection() as conn:
+        reader = dcdal.DALReader(connection=conn)
+
+        manual_events_df = reader.read_table_to_dataframe(
+            schema="algo",
+            table=f"manually_tagged_events",
+            columns=['event_id'] + manual_events_columns,
+        )
 
     if not manual_events_df.empty:
         if not load_deprecated:
@@ -113,49 +110,34 @@ def add_manual_event_to_db(machine_id, data_source_ids, start_timestamp, end_tim
                            False]
     row = dict(zip(manual_events_columns, manual_event_values))
 
-    conn = dcdal.DALConnection(
-        host=os.environ["DB_HOST"],
-        db=os.environ["DB_NAME"],
-        user=os.environ["DB_USER"],
-        password=os.environ["DB_PASSWORD"],
-    )
-    writer = dcdal.DALWriter(connection=conn)
-
-    writer.add_row_to_table(schema="algo",
-                            table=f"manually_tagged_events",
-                            data=row)
+    with pooled_connection() as conn:
+        writer = dcdal.DALWriter(connection=conn)
 
-    conn.close()
+        writer.add_row_to_table(schema="algo",
+                                table=f"manually_tagged_events",
+                                data=row)
 
 
 def remove_manual_event_from_db(machine_id, start_timestamp, end_timestamp, username, event_id):
     print(f"Manually tagged event {event_id} will be marked as deprecated")
 
-    conn = dcdal.DALConnection(
-        host=os.environ["DB_HOST"],
-        db=os.environ["DB_NAME"],
-        user=os.environ["DB_USER"],
-        password=os.environ["DB_PASSWORD"],
-    )
-
-    reader = dcdal.DALReader(connection=conn)
-    relevant_manual_labels_df = reader.read_table_to_dataframe(schema="algo",
-                                                               table=f"manually_tagged_events",
-                                                               conditions=[f"machine_id ={int(machine_id)}",
-                                                                           f"start_timestamp = '{start_timestamp}'",
-                                                                           f"end_timestamp = '{end_timestamp}'",
-                                                                           f"username = '{username}'"]
-                                                               )
-    if len(relevant_manual_labels_df) == 1:
-        writer = dcdal.DALWriter(connection=conn)
-        writer.update_rows(schema="algo",
-                           table=f"manually_tagged_events",
-                           data=dict(zip(['is_deprecated'], [True])),
-                           conditions=[f"machine_id ={int(machine_id)}",
-                                       f"start_timestamp = '{start_timestamp}'",
-                                       f"end_timestamp = '{end_timestamp}'",
-                                       f"username = '{username}'"])
-    else:
-        print(f"Too much data is fitting the conditions, aborting untagging of event {event_id}")
-
-    conn.close()
+    with pooled_connection() as conn:
+        reader = dcdal.DALReader(connection=conn)
+        relevant_manual_labels_df = reader.read_table_to_dataframe(schema="algo",
+                                                                   table=f"manually_tagged_events",
+                                                                   conditions=[f"machine_id ={int(machine_id)}",
+                                                                               f"start_timestamp = '{start_timestamp}'",
+                                                                               f"end_timestamp = '{end_timestamp}'",
+                                                                               f"username = '{username}'"]
+                                                                   )
+        if len(relevant_manual_labels_df) == 1:
+            writer = dcdal.DALWriter(connection=conn)
+            writer.update_rows(schema="algo",
+                               table=f"manually_tagged_events",
+                               data=dict(zip(['is_deprecated'], [True])),
+                               conditions=[f"machine_id ={int(machine_id)}",
+                                           f"start_timestamp = '{start_timestamp}'",
+                                           f"end_timestamp = '{end_timestamp}'",
+                                           f"username = '{username}'"])
+        else:
+            log.warning(f"Too much data is fitting the conditions, aborting untagging of event {event_id}")
@@ -1,103 +1,124 @@
-from src.logic.data_access import df_from_db
-
-
-def get_events_pipe_options(training_pipe_version):
-    meta_experiment_slug = get_training_version_from_name(training_pipe_version)
-
-    predicted_events_versions_df = df_from_db(
-        schema="events",
-        table="events_detection_metadata_view",
-        columns=["run_id"],
-        conditions=[f"meta_experiment_slug = '{meta_experiment_slug}'"]
-        #             "is_deprecated=False"]
+import os
+from typing import Dict, List
+
+import pandas as pd
+import psycopg
+
+from src.logic.data_access import df_from_query
+from src.logic.results_cache import ResultsCache
+
+# Versions are discovered once and reused until the refresh button or the TTL, so changing a dropdown never
+# goes to the DB
+versions_catalog_cache = ResultsCache(max_entries=1,
+                                      ttl=float(os.environ.get("PIPELINE_VERSIONS_TTL_SECONDS", 10 * 60)))
+
+STATS_VERSIONS_QUERY = psycopg.sql.SQL(
+    "select distinct run_id from statistics_calculation.data_sources_statistics_mv order by run_id desc")
+LABELED_EVENTS_VERSIONS_QUERY = psycopg.sql.SQL(
+    "select distinct run_id from events.merged_calculated_labeled_events order by run_id desc")
+PIPE4_SLUGS_QUERY = psycopg.sql.SQL(
+    "select distinct arguments ->> 'cnvrg_main_exp_slug' from pipelines_runs.runs where pipeline_id = 4")
+# Only the pipeline 2 hash is read out of the configuration, not the whole json
+TRAINING_VERSIONS_QUERY = psycopg.sql.SQL(
+    "select main_experiment_slug, "
+    "       configuration_json -> 'param_grid' -> 0 -> 'pipeline_2_hash' ->> 0 as pipeline_2_hash, "
+    "       start_timestamp "
+    "from algo.metadata_pipeline_3 "
+    "where pipeline_3_type = 'TRAIN' "
+    "order by start_timestamp desc")
+EVENTS_VERSIONS_QUERY = psycopg.sql.SQL(
+    "select distinct meta_experiment_slug, run_id from events.events_detection_metadata_view")
+
+
+class VersionsCatalog:
+    # All pipeline versions and how they depend on each other:
+    # statistics + labeled events (pipeline 2) -> training (pipeline 3 with a pipeline 4 run) -> predicted events
+    def __init__(self, stats_versions: List, labeled_events_versions: List,
+                 training_options_by_labeled_version: Dict[int, List[str]],
+                 events_options_by_slug: Dict[str, List]):
+        self.stats_versions = stats_versions
+        self.labeled_events_versions = labeled_events_versions
+        self.training_options_by_labeled_version = training_options_by_labeled_version
+        self.events_options_by_slug = events_options_by_slug
+
+    def get_training_pipe_options(self, stats_events_pipe_version, labeled_events_pipe_version) -> List[str]:
+        # TODO: Remove after training supports different meta for statistics and labeled events
+        if stats_events_pipe_version != labeled_events_pipe_version:
+            return ['manual']
+        return self.training_options_by_labeled_version.get(labeled_events_pipe_version, []) + ['manual']
+
+    def get_events_pipe_options(self, training_pipe_version) -> List:
+        meta_experiment_slug = get_training_version_from_name(training_pipe_version)
+        return self.events_options_by_slug.get(meta_experiment_slug, []) + ['manual']
+
+
+def get_training_options_by_labeled_version() -> Dict[int, List[str]]:
+    pipe4_slugs_df = df_from_query(PIPE4_SLUGS_QUERY, columns=["main_exp_slug"])
+    training_versions_df = df_from_query(TRAINING_VERSIONS_QUERY,
+                                         columns=["main_experiment_slug", "pipeline_2_hash", "start_timestamp"])
+
+    training_versions_df = training_versions_df[
+        training_versions_df["main_experiment_slug"].isin(pipe4_slugs_df["main_exp_slug"]) &
+        training_versions_df["pipeline_2_hash"].notna()]
+    if training_versions_df.empty:
+        return {}
+
+    training_versions_df = training_versions_df.assign(
+        pipe2_version=training_versions_df["pipeline_2_hash"].str.split("_").str[1].astype(int),
+        version_name=training_versions_df["main_experiment_slug"] + ": " +
+                     pd.to_datetime(training_versions_df["start_timestamp"]).dt.strftime("%Y-%m-%d"))
+    # Rows are already ordered from the newest training
+    return {int(pipe2_version): list(version_names.unique())
+            for pipe2_version, version_names in training_versions_df.groupby("pipe2_version", sort=False)["version_name"]}
+
+
+def get_events_options_by_slug() -> Dict[str, List]:
+    events_versions_df = df_from_query(EVENTS_VERSIONS_QUERY, columns=["meta_experiment_slug", "run_id"])
+    return {meta_experiment_slug: sorted(run_ids, reverse=True)
+            for meta_experiment_slug, run_ids in events_versions_df.groupby("meta_experiment_slug")["run_id"]}
+
+
+def load_versions_catalog() -> VersionsCatalog:
+    return VersionsCatalog(
+        stats_versions=list(df_from_query(STATS_VERSIONS_QUERY, columns=["run_id"])["run_id"]),
+        labeled_events_versions=list(df_from_query(LABELED_EVENTS_VERSIONS_QUERY, columns=["run_id"])["run_id"]),
+        training_options_by_labeled_version=get_training_options_by_labeled_version(),
+        events_options_by_slug=get_events_options_by_slug(),
     )
 
-    if predicted_events_versions_df.empty:
-        return ['manual']
-
-    versions_list = list(predicted_events_versions_df['run_id'].unique())
-    versions_list.sort(reverse=True)
-    return versions_list + ['manual']
-
 
-def get_training_version_from_name(training_version_name):
-    return training_version_name.split(': ')[0]
+def get_versions_catalog() -> VersionsCatalog:
+    return versions_catalog_cache.get_or_load("catalog", load_versions_catalog)
 
 
-def get_training_pipe_options(stats_events_pipe_version, labeled_events_pipe_version):
-    # TODO: Remove after training supports different meta for statistics and labeled events
-    if stats_events_pipe_version != labeled_events_pipe_version:
-        return ['manual']
-
-    pipe4_versions_df = df_from_db(
-        schema="pipelines_runs",
-        table="runs",
-        columns=["arguments"],
-        conditions=[f"pipeline_id = 4"]
-    )
+def invalidate_versions_catalog():
+    versions_catalog_cache.clear()
 
-    training_versions_df = df_from_db(
-        schema="algo",
-        table="metadata_pipeline_3",
-        columns=["main_experiment_slug", 'configuration_json', 'start_timestamp'],
-        conditions=[f"pipeline_3_type = 'TRAIN'"]
-    )
 
-    def get_pipe2_version_from_pipe3(configuration):
-        return int(configuration['param_grid'][0]['pipeline_2_hash'][0].split('_')[1])
+def get_events_pipe_options(training_pipe_version):
+    return get_versions_catalog().get_events_pipe_options(training_pipe_version)
 
-    def create_presented_name(row):
-        return f"{row['main_experiment_slug']}: {row['start_timestamp'].date()}"
 
-    def get_slug_from_pipe4_arguments(arguments):
-        return arguments['cnvrg_main_exp_slug']
+def get_training_version_from_name(training_version_name):
+    return training_version_name.split(': ')[0]
 
-    training_versions_df['pipe2_version'] = training_versions_df['configuration_json'].apply(get_pipe2_version_from_pipe3)
-    training_versions_df = training_versions_df[training_versions_df['pipe2_version'] == labeled_events_pipe_version]
-    pipe4_versions_df['main_exp_slug'] = pipe4_versions_df['arguments'].apply(get_slug_from_pipe4_arguments)
 
-    if not training_versions_df.empty:
-        slugs_with_pipe4 = list(pipe4_versions_df['main_exp_slug'].unique())
-        training_versions_df = training_versions_df[training_versions_df['main_experiment_slug'].isin(slugs_with_pipe4)]
-        if not training_versions_df.empty:
-            training_versions_df['version_name'] = training_versions_df.apply(create_presented_name, axis=1)
-            training_versions_df.sort_values('start_timestamp', inplace=True, ascending=False)
-            training_versions_list = list(training_versions_df["version_name"].unique()) + ['manual']
-        else:
-            training_versions_list = ['manual']
-    else:
-        training_versions_list = ['manual']
-    return training_versions_list
+def get_training_pipe_options(stats_events_pipe_version, labeled_events_pipe_version):
+    return get_versions_catalog().get_training_pipe_options(stats_events_pipe_version, labeled_events_pipe_version)
 
 
 def get_pipeline_versions():
+    versions_catalog = get_versions_catalog()
     versions_object = {}
 
-    data_sources_statistics_df = df_from_db(
-        schema="statistics_calculation",
-        table="data_sources_statistics_mv",
-        columns=["run_id"]
-    )
-
-    statistics_versions_list = list(data_sources_statistics_df["run_id"].unique())
-    statistics_versions_list.sort(reverse=True)
     # TODO: Add ['manual'] if we ever want to upload stats manually
-    versions_object["stats_pipe_options"] = statistics_versions_list
-
-    labeled_events_df = df_from_db(
-        schema="events",
-        table="merged_calculated_labeled_events",
-        columns=["run_id"]
-    )
-
-    calculated_labeled_versions_list = list(labeled_events_df["run_id"].unique())
-    calculated_labeled_versions_list.sort(reverse=True)
-    versions_object["labeled_events_pipe_options"] = calculated_labeled_versions_list + ['manual']
+    versions_object["stats_pipe_options"] = list(versions_catalog.stats_versions)
+    versions_object["labeled_events_pipe_options"] = versions_catalog.labeled_events_versions + ['manual']
 
-    training_versions_list = get_training_pipe_options(versions_object["stats_pipe_options"][0],
-                                                       versions_object["labeled_events_pipe_options"][0])
+    training_versions_list = versions_catalog.get_training_pipe_options(
+        versions_object["stats_pipe_options"][0], versions_object["labeled_events_pipe_options"][0])
     versions_object["training_pipe_options"] = training_versions_list
 
-    versions_object["events_pipe_options"] = get_events_pipe_options(training_versions_list[0])
+    versions_object["events_pipe_options"] = versions_catalog.get_events_pipe_options(training_versions_list[0])
 
     return versions_object
@@ -1,13 +1,31 @@
 import os
+import threading
+from collections import defaultdict
+from datetime import timedelta
 from typing import List, Dict
 
+import numpy as np
 import pandas as pd
 import psycopg
 
-import dcdal
-
 from src.keter_globals import *
+from src.logic.columnar_data import ColumnarRawData
+from src.logic.connection_pool import pooled_connection
 from src.logic.data_access import df_from_db
+from src.logic.raw_data_cache import RawDataCache, SQLiteRawDataCache, merge_frames
+from src.logic.results_cache import ResultsCache
+from src.logic.shared_store import DEFAULT_SHARED_STATE_PATH, get_shared_store
+
+# Recent data may still be ingested, so the newest part of a window is never kept in the cache
+raw_data_cache_live_margin = timedelta(hours=float(os.environ.get("RAW_DATA_CACHE_LIVE_MARGIN_HOURS", 24)))
+# In the multi-process deployment all workers share the cached segments
+raw_data_cache = SQLiteRawDataCache(os.path.join(DEFAULT_SHARED_STATE_PATH, "raw_data_cache.sqlite")) \
+    if get_shared_store() is not None else RawDataCache()
+# Windows longer than this are fetched aggregated per time bucket, zooming below it fetches full resolution
+raw_data_aggregation_min_window = timedelta(hours=float(os.environ.get("RAW_DATA_AGGREGATION_MIN_HOURS", 72)))
+raw_data_aggregation_target_points = int(os.environ.get("RAW_DATA_AGGREGATION_TARGET_POINTS", 2000))
+# The ingestion plot only needs the number of data sources per hour, the list of their ids is much heavier
+ingestion_with_data_sources_list = os.environ.get("INGESTION_WITH_DATA_SOURCES_LIST", "false").lower() == "true"
 
 
 # TODO: Concat with function get_machines_metadata_df (this function is just the subversion of it)
@@ -32,21 +50,62 @@ def get_machine_id_by_name(machine_name):
     return machine_name.split("-")[0]
 
 
-def get_data_sources_by_machine(machine_id):
-    data_sources_df = df_from_db(
+def get_machines_condition(machine_ids):
+    return f"machine_id = any(array{[int(machine_id) for machine_id in machine_ids]}::bigint[])"
+
+
+class DataSourcesCatalog:
+    # The data sources with values of all machines, read in a single query. The mappings are shared and must not
+    # be changed by their users
+    def __init__(self, data_sources_df: pd.DataFrame):
+        self.data_sources_df = data_sources_df
+        short_names = data_sources_df["short_name"].to_numpy(dtype=object)
+        display_names = np.where(np.isin(short_names, ['', 'None']),
+                                 data_sources_df["customer_data_source_id"].to_numpy(dtype=object), short_names)
+        data_source_ids = data_sources_df["data_source_id"].to_numpy(dtype=np.int64)
+        self.__data_sources_by_machine = {
+            str(machine_id): dict(zip(data_source_ids[positions].tolist(), display_names[positions]))
+            for machine_id, positions in data_sources_df.groupby("machine_id").indices.items()
+        }
+        self.__options_by_machine = {
+            machine_id: get_data_sources_names(data_sources)
+            for machine_id, data_sources in self.__data_sources_by_machine.items()
+        }
+
+    def get_data_sources(self, machine_id) -> Dict[int, str]:
+        return self.__data_sources_by_machine.get(str(machine_id), {})
+
+    def get_options(self, machine_id) -> List[str]:
+        return self.__options_by_machine.get(str(machine_id), [])
+
+
+data_sources_catalog_cache = ResultsCache(max_entries=1)
+
+
+def load_data_sources_catalog():
+    return DataSourcesCatalog(df_from_db(
         schema="preprocessed_raw_data",
         table="data_sources",
-        conditions=[f"machine_id = {machine_id}", "has_value = True"],
-        columns=['data_source_id', 'short_name', 'customer_data_source_id', 'data_source_name']
-    )
+        conditions=["has_value = True"],
+        columns=['machine_id', 'data_source_id', 'short_name', 'customer_data_source_id', 'data_source_name']
+    ))
 
-    if data_sources_df.empty:
-        return {}
-    return {
-        node["data_source_id"]: node["customer_data_source_id"]
-        if (node["short_name"] == '') or node["short_name"] == 'None' else node["short_name"]
-        for i, node in data_sources_df.iterrows()
-    }
+
+def get_data_sources_catalog() -> DataSourcesCatalog:
+    return data_sources_catalog_cache.get_or_load("catalog", load_data_sources_catalog)
+
+
+def invalidate_data_sources_catalog():
+    data_sources_catalog_cache.clear()
+    clear_value_tables_metadata()
+
+
+def get_data_sources_by_machine(machine_id):
+    return get_data_sources_catalog().get_data_sources(machine_id)
+
+
+def get_data_sources_options(machine_id):
+    return get_data_sources_catalog().get_options(machine_id)
 
 
 def get_data_sources_names(data_sources_object, filter_list=None):
@@ -80,87 +139,331 @@ def get_machines_metadata_from_csv():
     return pd.DataFrame()
 
 
+NUMERIC_VALUE_TYPES = {"smallint", "integer", "bigint", "real", "double precision", "numeric", "boolean"}
+# Values of these types are held exactly by doubles and read into shared arrays, the other types keep their own
+DOUBLE_VALUE_TYPES = {"smallint", "integer", "real", "double precision"}
+VALUE_TABLES_METADATA_COLUMNS = ["data_source_id", "value_type_id", "table_name", "column_name", "data_type"]
+
+# The value table of a data source does not change, so its metadata is read from the database once
+value_tables_metadata = {}
+value_tables_metadata_lock = threading.Lock()
+
+
+def get_value_tables_metadata(conn, data_source_id_list):
+    data_source_id_list = [int(data_source_id) for data_source_id in data_source_id_list]
+    with value_tables_metadata_lock:
+        missing_ids = [data_source_id for data_source_id in data_source_id_list
+                       if data_source_id not in value_tables_metadata]
+    if missing_ids:
+        metadata_query = psycopg.sql.SQL(
+            "select n.data_source_id, nvt.value_type_id, nvt.table_name, nvt.column_name, c.data_type "
+            "from preprocessed_raw_data.data_sources n "
+            "join preprocessed_raw_data.data_source_value_types nvt on n.value_type_id = "
+            "nvt.value_type_id "
+            "left join information_schema.columns c on c.table_schema = 'preprocessed_raw_data' "
+            "  and c.table_name = nvt.table_name and c.column_name = nvt.column_name "
+            "where n.has_value = True "
+            "  and n.data_source_id = any(%(data_source_id_list)s) "
+        )
+        missing_df = pd.DataFrame(
+            data=conn.execute(
+                metadata_query,
+                query_parameters={"data_source_id_list": missing_ids},
+                fetchable=True,
+            ),
+            columns=VALUE_TABLES_METADATA_COLUMNS,
+        )
+        with value_tables_metadata_lock:
+            for row in missing_df.to_dict("records"):
+                value_tables_metadata[int(row["data_source_id"])] = row
+
+    with value_tables_metadata_lock:
+        rows = [value_tables_metadata[data_source_id] for data_source_id in data_source_id_list
+                if data_source_id in value_tables_metadata]
+    return pd.DataFrame(rows, columns=VALUE_TABLES_METADATA_COLUMNS)
+
+
+def clear_value_tables_metadata():
+    with value_tables_metadata_lock:
+        value_tables_metadata.clear()
+
+
+def get_value_expression(column_name, data_type):
+    if data_type == "boolean":
+        return psycopg.sql.SQL("{}::int::double precision").format(psycopg.sql.Identifier(column_name))
+    return psycopg.sql.SQL("{}::double precision").format(psycopg.sql.Identifier(column_name))
+
+
+def is_numeric_value_type(metadata_df):
+    return metadata_df["data_type"].isin(NUMERIC_VALUE_TYPES)
+
+
+def get_value_tables(metadata_df):
+    # The data type is null when the column is not found in information_schema, such tables are still read
+    return metadata_df.groupby(by=["table_name", "column_name", "data_type"], dropna=False)["data_source_id"] \
+        .agg(list).reset_index()
+
+
+def read_columnar_data(conn, value_tables_df, start_time, end_time) -> ColumnarRawData:
+    # All value tables are read in a single round trip, ordered so every data source is one contiguous block
+    table_queries = []
+    query_parameters = {"start_time": start_time, "end_time": end_time}
+    for i, data_type in enumerate(value_tables_df.itertuples(index=False)):
+        table_queries.append(psycopg.sql.SQL(
+            "select data_source_id, timestamp, {value} as value "
+            "from preprocessed_raw_data.{table} "
+            "where data_source_id = any({data_source_ids}) "
+            "  and timestamp between {start_time}::timestamp and {end_time}::timestamp"
+        ).format(
+            value=get_value_expression(data_type.column_name, data_type.data_type),
+            table=psycopg.sql.Identifier(data_type.table_name),
+            data_source_ids=psycopg.sql.Placeholder(f"data_source_ids_{i}"),
+            start_time=psycopg.sql.Placeholder("start_time"),
+            end_time=psycopg.sql.Placeholder("end_time"),
+        ))
+        query_parameters[f"data_source_ids_{i}"] = [int(data_source_id) for data_source_id in data_type.data_source_id]
+    if not table_queries:
+        return ColumnarRawData.empty()
+
+    query = psycopg.sql.SQL(" union all ").join(table_queries) + psycopg.sql.SQL(" order by data_source_id, timestamp")
+    rows_df = pd.DataFrame(
+        data=conn.execute(query, query_parameters=query_parameters, fetchable=True),
+        columns=["data_source_id", "timestamp", "value"],
+    )
+    return ColumnarRawData.from_sorted_arrays(
+        rows_df["data_source_id"].to_numpy(dtype=np.int64),
+        pd.to_datetime(rows_df["timestamp"]).to_numpy(dtype="datetime64[ns]"),
+        rows_df["value"].to_numpy(dtype=np.float64, na_value=np.nan),
+    )
+
+
+def read_typed_data(conn, value_tables_df, start_time, end_time) -> Dict[int, pd.DataFrame]:
+    # Tables of the same value type are read in one round trip and their values keep the type of the column, so
+    # bigint and numeric values keep their precision and booleans stay booleans. Null samples are skipped, otherwise
+    # the integer and boolean columns would turn into floats or objects. Values of tables of an unknown data type keep
+    # the type they are read with
+    data_sources_frames = {}
+    for data_type, data_type_tables_df in value_tables_df.groupby("data_type", dropna=False):
+        table_queries = []
+        query_parameters = {"start_time": start_time, "end_time": end_time}
+        for i, value_table in enumerate(data_type_tables_df.itertuples(index=False)):
+            table_queries.append(psycopg.sql.SQL(
+                "select data_source_id, timestamp, {column} as value "
+                "from preprocessed_raw_data.{table} "
+                "where data_source_id = any({data_source_ids}) "
+                "  and timestamp between {start_time}::timestamp and {end_time}::timestamp "
+                "  and {column} is not null"
+            ).format(
+                column=psycopg.sql.Identifier(value_table.column_name),
+                table=psycopg.sql.Identifier(value_table.table_name),
+                data_source_ids=psycopg.sql.Placeholder(f"data_source_ids_{i}"),
+                start_time=psycopg.sql.Placeholder("start_time"),
+                end_time=psycopg.sql.Placeholder("end_time"),
+            ))
+            query_parameters[f"data_source_ids_{i}"] = [int(data_source_id)
+                                                        for data_source_id in value_table.data_source_id]
+
+        query = psycopg.sql.SQL(" union all ").join(table_queries) + \
+            psycopg.sql.SQL(" order by data_source_id, timestamp")
+        rows_df = pd.DataFrame(
+            data=conn.execute(query, query_parameters=query_parameters, fetchable=True),
+            columns=["data_source_id", "timestamp", "value"],
+        )
+        rows_df["timestamp"] = pd.to_datetime(rows_df["timestamp"])
+        for data_source_id, data_source_df in rows_df.groupby("data_source_id", sort=False):
+            data_sources_frames[int(data_source_id)] = data_source_df[["timestamp", "value"]].reset_index(drop=True)
+    return data_sources_frames
+
+
 def load_data(
         data_source_id_list: List[int],
         start_time: datetime = None,
         end_time: datetime = None,
-) -> Dict[int, Dict[int, pd.DataFrame]]:
-    conn = dcdal.DALConnection(
-        host=os.environ["DB_HOST"],
-        db=os.environ["DB_NAME"],
-        user=os.environ["DB_USER"],
-        password=os.environ["DB_PASSWORD"],
+) -> ColumnarRawData:
+    start_time = to_query_timestamp(start_time)
+    end_time = to_query_timestamp(end_time)
+    with pooled_connection() as conn:
+        metadata_df = get_value_tables_metadata(conn, data_source_id_list)
+        if metadata_df.empty:
+            return ColumnarRawData.empty()
+
+        value_tables_df = get_value_tables(metadata_df)
+        is_double_value_table = value_tables_df["data_type"].isin(DOUBLE_VALUE_TYPES)
+        data_sources_object = read_columnar_data(conn, value_tables_df[is_double_value_table], start_time, end_time)
+        data_sources_object.frames.update(
+            read_typed_data(conn, value_tables_df[~is_double_value_table], start_time, end_time))
+    return data_sources_object
+
+
+def is_aggregated_window(start_time, end_time) -> bool:
+    return to_query_timestamp(end_time) - to_query_timestamp(start_time) > raw_data_aggregation_min_window
+
+
+def get_aggregation_bucket_seconds(start_time, end_time, target_points=None) -> int:
+    target_points = target_points or raw_data_aggregation_target_points
+    window_seconds = (to_query_timestamp(end_time) - to_query_timestamp(start_time)).total_seconds()
+    return max(1, int(np.ceil(window_seconds / target_points)))
+
+
+def read_aggregated_data(conn, value_tables_df, start_time, end_time, bucket_seconds) -> ColumnarRawData:
+    # Every bucket is reduced to its first, min, max and last samples, which keeps the visual envelope of the series.
+    # Values are compared as doubles, bigint and numeric values of the overview are rounded to the nearest double,
+    # zooming in below the aggregation window reads them with their own type
+    table_queries = []
+    query_parameters = {"start_time": start_time, "end_time": end_time, "bucket_seconds": bucket_seconds}
+    for i, data_type in enumerate(value_tables_df.itertuples(index=False)):
+        table_queries.append(psycopg.sql.SQL(
+            "select data_source_id, "
+            "  min(timestamp) as first_timestamp, (array_agg(value order by timestamp))[1] as first_value, "
+            "  (array_agg(timestamp order by value, timestamp))[1] as min_timestamp, min(value) as min_value, "
+            "  (array_agg(timestamp order by value desc, timestamp))[1] as max_timestamp, max(value) as max_value, "
+            "  max(timestamp) as last_timestamp, (array_agg(value order by timestamp desc))[1] as last_value "
+            "from (select data_source_id, timestamp, {value} as value, "
+            "        floor(extract(epoch from timestamp - {start_time}::timestamp) / {bucket_seconds}) as bucket "
+            "      from preprocessed_raw_data.{table} "
+            "      where data_source_id = any({data_source_ids}) "
+            "        and timestamp between {start_time}::timestamp and {end_time}::timestamp "
+            "        and {column} is not null) samples "
+            "group by data_source_id, bucket"
+        ).format(
+            value=get_value_expression(data_type.column_name, data_type.data_type),
+            column=psycopg.sql.Identifier(data_type.column_name),
+            table=psycopg.sql.Identifier(data_type.table_name),
+            data_source_ids=psycopg.sql.Placeholder(f"data_source_ids_{i}"),
+            start_time=psycopg.sql.Placeholder("start_time"),
+            end_time=psycopg.sql.Placeholder("end_time"),
+            bucket_seconds=psycopg.sql.Placeholder("bucket_seconds"),
+        ))
+        query_parameters[f"data_source_ids_{i}"] = [int(data_source_id) for data_source_id in data_type.data_source_id]
+    if not table_queries:
+        return ColumnarRawData.empty()
+
+    buckets_df = pd.DataFrame(
+        data=conn.execute(psycopg.sql.SQL(" union all ").join(table_queries),
+                          query_parameters=query_parameters,
+                          fetchable=True),
+        columns=["data_source_id",
+                 "first_timestamp", "first_value",
+                 "min_timestamp", "min_value",
+                 "max_timestamp", "max_value",
+                 "last_timestamp", "last_value"],
     )
-    reader = dcdal.DALReader(connection=conn)
-    metadata_query = psycopg.sql.SQL(
-        "select n.data_source_id, nvt.value_type_id, nvt.table_name, nvt.column_name "
-        "from preprocessed_raw_data.data_sources n "
-        "join preprocessed_raw_data.data_source_value_types nvt on n.value_type_id = "
-        "nvt.value_type_id "
-        "where n.has_value = True "
-        "  and n.data_source_id = any(%(data_source_id_list)s) "
+    points_df = pd.concat(
+        [buckets_df[["data_source_id", f"{point}_timestamp", f"{point}_value"]]
+         .set_axis(["data_source_id", "timestamp", "value"], axis=1)
+         for point in ("first", "min", "max", "last")],
+        ignore_index=True,
     )
-    metadata_df = pd.DataFrame(
-        data=conn.execute(
-            metadata_query,
-            query_parameters={"data_source_id_list": data_source_id_list},
-            fetchable=True,
-        )
+    points_df["timestamp"] = pd.to_datetime(points_df["timestamp"])
+    points_df = points_df.drop_duplicates(["data_source_id", "timestamp"]) \
+        .sort_values(["data_source_id", "timestamp"], kind="stable")
+
+    # Booleans are aggregated as 0 and 1, the points are turned back into booleans
+    boolean_ids = [int(data_source_id)
+                   for data_source_ids in value_tables_df.loc[value_tables_df["data_type"] == "boolean", "data_source_id"]
+                   for data_source_id in data_source_ids]
+    is_boolean_point = points_df["data_source_id"].isin(boolean_ids)
+    boolean_frames = {
+        int(data_source_id): data_source_df[["timestamp", "value"]].astype({"value": bool}).reset_index(drop=True)
+        for data_source_id, data_source_df in points_df[is_boolean_point].groupby("data_source_id", sort=False)
+    }
+    points_df = points_df[~is_boolean_point]
+    return ColumnarRawData.from_sorted_arrays(
+        points_df["data_source_id"].to_numpy(dtype=np.int64),
+        points_df["timestamp"].to_numpy(dtype="datetime64[ns]"),
+        points_df["value"].to_numpy(dtype=np.float64, na_value=np.nan),
+        boolean_frames,
     )
-    if metadata_df.empty:
-        return {}
 
-    intermediate_data = {}
-    try:
-        for i, data_type in (
-                metadata_df.groupby(
-                    by=["value_type_id", "table_name", "column_name"])["data_source_id"].agg(list).reset_index().iterrows()):
-            intermediate_data[data_type["value_type_id"]] = reader.read_table_to_dataframe(
-                schema="preprocessed_raw_data",
-                table=data_type["table_name"],
-                conditions=[
-                    f"data_source_id = any(array{data_type['data_source_id']}::bigint[])",
-                    f"timestamp between '{start_time}'::timestamp and '{end_time}'::timestamp",
-                ],
-                columns=["data_source_id", "timestamp", data_type["column_name"]],
-            ).groupby("data_source_id")
-
-    except KeyError as e:
-        print(f"Key error: {e}")
-        return {}
 
-    data_sources_object = {}
-    for i, metadata_row in metadata_df.iterrows():
-        data_sources_object[metadata_row["data_source_id"]] = (
-            intermediate_data[metadata_row["value_type_id"]]
-            .get_group(metadata_row["data_source_id"])
-            .loc[:, ["timestamp", "value"]]
-        )
+def load_data_aggregated(
+        data_source_id_list: List[int],
+        start_time: datetime = None,
+        end_time: datetime = None,
+        target_points: int = None,
+) -> ColumnarRawData:
+    start_time = to_query_timestamp(start_time)
+    end_time = to_query_timestamp(end_time)
+    bucket_seconds = get_aggregation_bucket_seconds(start_time, end_time, target_points)
+    with pooled_connection() as conn:
+        metadata_df = get_value_tables_metadata(conn, data_source_id_list)
+        if metadata_df.empty:
+            return ColumnarRawData.empty()
+        numeric_value_tables_df = get_value_tables(metadata_df[is_numeric_value_type(metadata_df)])
+        data_sources_object = read_aggregated_data(conn, numeric_value_tables_df, start_time, end_time, bucket_seconds)
+
+    # Value types that cannot be aggregated are fetched at full resolution
+    non_numeric_ids = metadata_df.loc[~is_numeric_value_type(metadata_df), "data_source_id"].tolist()
+    if non_numeric_ids:
+        data_sources_object.frames.update(load_data_cached(non_numeric_ids, start_time, end_time))
+    return data_sources_object
+
 
+def to_query_timestamp(timestamp):
+    # Windows are compared with the naive 'timestamp' column, an aware timestamp keeps its wall time
+    timestamp = pd.Timestamp(timestamp)
+    return timestamp.tz_localize(None) if timestamp.tzinfo is not None else timestamp
+
+
+def load_data_cached(
+        data_source_id_list: List[int],
+        start_time: datetime = None,
+        end_time: datetime = None,
+) -> Dict[int, pd.DataFrame]:
+    start_time = to_query_timestamp(start_time)
+    end_time = to_query_timestamp(end_time)
+    cacheable_end_time = pd.Timestamp.now(tz="UTC").tz_localize(None) - raw_data_cache_live_margin
+
+    # The result is built from the cached parts read here and the fetched frames, never by reading the cache again,
+    # since storing the fetched ranges may evict parts of the window
+    data_sources_parts = {}
+    # Data sources missing the same sub-range are fetched together
+    data_sources_per_missing_range = defaultdict(list)
+    for data_source_id in data_source_id_list:
+        cached_df, missing_ranges = raw_data_cache.lookup(data_source_id, start_time, end_time)
+        data_sources_parts[data_source_id] = [cached_df]
+        for missing_range in missing_ranges:
+            data_sources_per_missing_range[missing_range].append(data_source_id)
+
+    for (range_start, range_end), data_source_ids in data_sources_per_missing_range.items():
+        range_data = load_data(data_source_ids, range_start, range_end)
+        for data_source_id in data_source_ids:
+            data_source_df = range_data.get(data_source_id, pd.DataFrame(columns=["timestamp", "value"]))
+            if range_start < cacheable_end_time:
+                raw_data_cache.put(data_source_id, range_start, min(range_end, cacheable_end_time),
+                                   data_source_df[data_source_df["timestamp"] <= cacheable_end_time])
+            data_sources_parts[data_source_id].append(data_source_df)
+
+    data_sources_object = {}
+    for data_source_id, parts in data_sources_parts.items():
+        parts = [part for part in parts if not part.empty]
+        if parts:
+            data_sources_object[data_source_id] = parts[0] if len(parts) == 1 else merge_frames(parts)
     return data_sources_object
 
 
-def read_ingestion_data_from_db(machine_id):
-    datasources_over_time_df = df_from_db(
+def read_ingestion_data_from_db(machine_ids, with_data_sources_list=ingestion_with_data_sources_list):
+    columns = ["timestamp", "num_data_sources"]
+    if with_data_sources_list:
+        columns.append("list_of_data_sources")
+    return df_from_db(
         schema='dashboards',
         table='data_sources_with_data_per_hour',
-        columns=[
-            "timestamp",
-            "num_data_sources",
-            "list_of_data_sources"
-        ],
-        conditions=[f"machine_id = {int(machine_id)}"]
+        columns=["machine_id"] + columns,
+        conditions=[get_machines_condition(machine_ids)]
     )
 
-    return datasources_over_time_df
-
 
 def get_ingestion_rates(machines_names):
-    ingestion_object = {}
-    for machine in machines_names:
-        machine_id = get_machine_id_by_name(machine)
-        ingestion_object[machine_id] = read_ingestion_data_from_db(machine_id)
-    return ingestion_object
+    # A single query for all machines, split per machine afterwards
+    machine_ids = [get_machine_id_by_name(machine) for machine in machines_names]
+    ingestion_df = read_ingestion_data_from_db(machine_ids)
+    machines_ingestion = {
+        str(machine_id): machine_ingestion_df.drop(columns=["machine_id"]).reset_index(drop=True)
+        for machine_id, machine_ingestion_df in ingestion_df.groupby("machine_id", sort=False)
+    }
+    empty_ingestion_df = ingestion_df.drop(columns=["machine_id"])
+    return {machine_id: machines_ingestion.get(machine_id, empty_ingestion_df.copy()) for machine_id in machine_ids}
 
 
 def load_data_sources_connections(machines):
@@ -176,3 +479,19 @@ def load_data_sources_connections(machines):
     )
 
     return data_sources_connections_df
+
+
+def get_data_sources_connections_lookup(data_sources_connections_df):
+    # (machine_id, actual data source id) -> (nominal id, standby id), the first connection row wins
+    if data_sources_connections_df.empty:
+        return {}
+    connections_df = data_sources_connections_df.drop_duplicates(subset=["machine_id", "data_source_actual_value"],
+                                                                 keep="first")
+    return {
+        (int(machine_id), int(actual_id)): (None if pd.isna(nominal_id) else int(nominal_id),
+                                            None if pd.isna(standby_id) else int(standby_id))
+        for machine_id, actual_id, nominal_id, standby_id in zip(connections_df["machine_id"],
+                                                                 connections_df["data_source_actual_value"],
+                                                                 connections_df["data_source_nominal_value"],
+                                                                 connections_df["data_source_standby_value"])
+    }
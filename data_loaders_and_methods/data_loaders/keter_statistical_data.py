@@ -1,62 +1,68 @@
-import os
-
 import pandas as pd
 
 import dcdal
 
-from src.data_loaders.keter_raw_data import get_machine_id_by_name
+from src.data_loaders.keter_raw_data import get_data_sources_catalog, get_machine_id_by_name
+from src.logic.connection_pool import pooled_connection
+
+data_sources_columns = ['data_source_id', 'short_name', 'customer_data_source_id', 'data_source_name']
+
+statistics_columns = ["data_source_id", "is_periodic",
+                      "has_modes_separation",
+                      "mode_count", "count_val",
+                      "mean_val", "std_val",
+                      "cov_val", "entropy",
+                      "overall_rank"]
+
+returned_columns = ["data_source_id",
+                    'short_name',
+                    "overall_rank",
+                    "is_periodic",
+                    "has_modes_separation",
+                    "mode_count",
+                    "count_val",
+                    "mean_val", "std_val",
+                    "cov_val", "entropy",
+                    'customer_data_source_id']
 
 
 def load_metadata(machines, stats_pipe_version):
-    conn = dcdal.DALConnection(
-        host=os.environ["DB_HOST"],
-        db=os.environ["DB_NAME"],
-        user=os.environ["DB_USER"],
-        password=os.environ["DB_PASSWORD"],
-    )
-    reader = dcdal.DALReader(connection=conn)
-
-    curr_data_object = {}
-    for machine_name in machines:
-        machine_id = get_machine_id_by_name(machine_name)
-
-        data_sources_df = reader.read_table_to_dataframe(
-            schema="preprocessed_raw_data",
-            table="data_sources",
-            conditions=[f"machine_id = {machine_id}", "has_value = True"],
-            columns=['data_source_id', 'short_name',
-                     'customer_data_source_id', 'data_source_name'],
+    machine_ids = [get_machine_id_by_name(machine_name) for machine_name in machines]
+
+    # The data sources of all machines are already read once for the data sources catalog
+    all_data_sources_df = get_data_sources_catalog().data_sources_df
+    data_sources_df = all_data_sources_df[
+        all_data_sources_df['machine_id'].isin([int(machine_id) for machine_id in machine_ids])]
+    if data_sources_df.empty:
+        return {machine_id: pd.DataFrame(columns=data_sources_columns) for machine_id in machine_ids}
+
+    with pooled_connection() as conn:
+        reader = dcdal.DALReader(connection=conn)
+
+        data_source_ids = [int(data_source_id) for data_source_id in data_sources_df['data_source_id'].unique()]
+        data_sources_statistics_df = reader.read_table_to_dataframe(
+            schema="statistics_calculation",
+            table="data_sources_statistics_mv",
+            columns=statistics_columns,
+            conditions=[f"run_id = {stats_pipe_version}",
+                        f"data_source_id = any(array{data_source_ids}::bigint[])"],
         )
-        if not data_sources_df.empty:
-            data_sources_statistics_df = reader.read_table_to_dataframe(
-                schema="statistics_calculation",
-                table="data_sources_statistics_mv",
-                columns=["data_source_id", "is_periodic",
-                         "has_modes_separation",
-                         "mode_count", "count_val",
-                         "mean_val", "std_val",
-                         "cov_val", "entropy",
-                         "overall_rank"],
-                conditions=[f"run_id = {stats_pipe_version}"],
-            )
-            merged_data_sources_df = pd.merge(data_sources_df, data_sources_statistics_df,
-                                              left_on='data_source_id',
-                                              right_on='data_source_id')
-
-            returned_columns = ["data_source_id",
-                                'short_name',
-                                "overall_rank",
-                                "is_periodic",
-                                "has_modes_separation",
-                                "mode_count",
-                                "count_val",
-                                "mean_val", "std_val",
-                                "cov_val", "entropy", 
-                                'customer_data_source_id']
-            merged_data_sources_df = merged_data_sources_df[returned_columns]
-            merged_data_sources_df = merged_data_sources_df.round(2).sort_values(['cov_val', 'std_val', 'entropy'],
-                                                                                 ascending=[False, False, False])
-
-        curr_data_object[machine_id] = data_sources_df if data_sources_df.empty else merged_data_sources_df
-        curr_data_object[machine_id] = curr_data_object[machine_id].astype(str)
+
+    merged_data_sources_df = pd.merge(data_sources_df, data_sources_statistics_df,
+                                      left_on='data_source_id',
+                                      right_on='data_source_id')
+    merged_data_sources_df = merged_data_sources_df[['machine_id'] + returned_columns]
+    merged_data_sources_df = merged_data_sources_df.round(2).sort_values(['cov_val', 'std_val', 'entropy'],
+                                                                         ascending=[False, False, False])
+
+    # Machines that have data sources but no statistics keep an empty frame with the merged columns,
+    # machines without any data sources keep the (empty) data sources frame - same as loading one by one
+    machines_with_data_sources = {str(machine_id) for machine_id in data_sources_df['machine_id'].unique()}
+    curr_data_object = {
+        machine_id: pd.DataFrame(columns=returned_columns if machine_id in machines_with_data_sources
+                                 else data_sources_columns)
+        for machine_id in machine_ids
+    }
+    for machine_id, machine_metadata_df in merged_data_sources_df.groupby('machine_id', sort=False):
+        curr_data_object[str(machine_id)] = machine_metadata_df.drop(columns=['machine_id'])
     return curr_data_object
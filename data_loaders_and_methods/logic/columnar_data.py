@@ -0,0 +1,75 @@
+from collections.abc import Mapping
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.logic.event_index import to_read_only
+
+
+class ColumnarRawData(Mapping):
+    # Samples of all data sources in contiguous arrays, ordered by data source and timestamp.
+    # The samples of data_source_ids[i] are timestamps[offsets[i]:offsets[i + 1]]. Data sources whose values cannot be
+    # held exactly as doubles are kept in frames of their own value type.
+    # Read as a mapping of data source id to frame, the frames of the arrays are views built on access. The arrays are
+    # shared with the raw data cache and every frame built from them, so they are made read-only
+    def __init__(self, data_source_ids: np.ndarray, offsets: np.ndarray, timestamps: np.ndarray, values: np.ndarray,
+                 frames: Optional[Dict[int, pd.DataFrame]] = None):
+        self.data_source_ids = to_read_only(data_source_ids)
+        self.offsets = to_read_only(offsets)
+        self.timestamps = to_read_only(timestamps)
+        self.values = to_read_only(values)
+        self.frames = frames if frames is not None else {}
+        self.__positions = {int(data_source_id): position for position, data_source_id in enumerate(data_source_ids)}
+
+    @classmethod
+    def empty(cls, frames: Optional[Dict[int, pd.DataFrame]] = None):
+        return cls(np.empty(0, dtype=np.int64),
+                   np.zeros(1, dtype=np.int64),
+                   np.empty(0, dtype="datetime64[ns]"),
+                   np.empty(0, dtype=np.float64),
+                   frames)
+
+    @classmethod
+    def from_sorted_arrays(cls, row_data_source_ids: np.ndarray, timestamps: np.ndarray, values: np.ndarray,
+                           frames: Optional[Dict[int, pd.DataFrame]] = None):
+        if len(row_data_source_ids) == 0:
+            return cls.empty(frames)
+        row_data_source_ids = np.ascontiguousarray(row_data_source_ids, dtype=np.int64)
+        starts = np.flatnonzero(np.diff(row_data_source_ids)) + 1
+        offsets = np.concatenate(([0], starts, [len(row_data_source_ids)])).astype(np.int64)
+        return cls(row_data_source_ids[offsets[:-1]],
+                   offsets,
+                   np.ascontiguousarray(timestamps, dtype="datetime64[ns]"),
+                   np.ascontiguousarray(values, dtype=np.float64),
+                   frames)
+
+    def __contains__(self, data_source_id) -> bool:
+        return int(data_source_id) in self.__positions or int(data_source_id) in self.frames
+
+    def __getitem__(self, data_source_id) -> pd.DataFrame:
+        if int(data_source_id) in self.frames:
+            return self.frames[int(data_source_id)]
+        return self.to_frame(data_source_id)
+
+    def __iter__(self):
+        yield from self.__positions
+        yield from self.frames
+
+    def __len__(self) -> int:
+        return len(self.data_source_ids) + len(self.frames)
+
+    @property
+    def nbytes(self) -> int:
+        return self.data_source_ids.nbytes + self.offsets.nbytes + self.timestamps.nbytes + self.values.nbytes + \
+            sum(int(frame.memory_usage(deep=True).sum()) for frame in self.frames.values())
+
+    def get_arrays(self, data_source_id) -> Tuple[np.ndarray, np.ndarray]:
+        # Views into the shared arrays, nothing is copied
+        position = self.__positions[int(data_source_id)]
+        start, end = self.offsets[position], self.offsets[position + 1]
+        return self.timestamps[start:end], self.values[start:end]
+
+    def to_frame(self, data_source_id) -> pd.DataFrame:
+        timestamps, values = self.get_arrays(data_source_id)
+        return pd.DataFrame({"timestamp": timestamps, "value": values}, copy=False)
@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Callable, Dict, Optional
+
+from loguru import logger as log
+
+from src.logic.exceptions import AppException
+
+DEFAULT_MAX_WORKERS = int(os.environ.get("LOADERS_MAX_WORKERS", 4))
+DEFAULT_FETCH_MAX_WORKERS = int(os.environ.get("FETCH_MAX_WORKERS", 8))
+DEFAULT_FETCH_TIMEOUT_SECONDS = float(os.environ.get("FETCH_TIMEOUT_SECONDS", 120))
+CANCELLATION_POLL_SECONDS = 0.1
+
+
+def run_timed(name: str, loader: Callable):
+    start = time.perf_counter()
+    try:
+        return loader()
+    finally:
+        log.debug(f"Loading {name} took {time.perf_counter() - start:.2f}s")
+
+
+def run_concurrently(loaders: Dict[str, Callable], max_workers: int = DEFAULT_MAX_WORKERS) -> Dict:
+    results = {}
+    if not loaders:
+        return results
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(loaders)), thread_name_prefix="loader") as executor:
+        futures = {executor.submit(run_timed, name, loader): name for name, loader in loaders.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                # A failing loader must not prevent the others from being used
+                log.error(f"Loading {name} failed: {e}")
+    log.debug(f"Loading {', '.join(loaders.keys())} took {time.perf_counter() - start:.2f}s in total")
+    return results
+
+
+class FetchCancelled(AppException):
+    pass
+
+
+class Cancellation:
+    def __init__(self, generation: int = 0):
+        self.generation = generation
+        self.__event = threading.Event()
+
+    def cancel(self):
+        self.__event.set()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self.__event.is_set()
+
+    def raise_if_cancelled(self, stage: str):
+        if self.is_cancelled:
+            raise FetchCancelled(f"Request {self.generation} was superseded before {stage}")
+
+
+class LatestRequests:
+    # Every request of a key (e.g. a session) gets the next generation of the key.
+    # Starting a request cancels the request of an older generation still running for the same key
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__requests = {}
+        self.__generations = {}
+        self.__stats = {"started": 0, "superseded": 0}
+
+    def start(self, key) -> Cancellation:
+        with self.__lock:
+            generation = self.__generations.get(key, 0) + 1
+            self.__generations[key] = generation
+            cancellation = Cancellation(generation)
+            previous = self.__requests.get(key)
+            self.__requests[key] = cancellation
+            self.__stats["started"] += 1
+            if previous is not None:
+                previous.cancel()
+                self.__stats["superseded"] += 1
+        return cancellation
+
+    def finish(self, key, cancellation: Cancellation):
+        with self.__lock:
+            if self.__requests.get(key) is cancellation:
+                del self.__requests[key]
+                del self.__generations[key]
+
+    def get_stats(self) -> Dict:
+        with self.__lock:
+            return dict(self.__stats)
+
+
+# Fetches are not waited for when they time out or are cancelled, so they run on a pool that outlives the request
+fetch_executor = ThreadPoolExecutor(max_workers=DEFAULT_FETCH_MAX_WORKERS, thread_name_prefix="fetch")
+
+
+def run_fetches(fetches: Dict[str, Callable],
+                timeouts: Optional[Dict[str, float]] = None,
+                cancellation: Optional[Cancellation] = None,
+                default_timeout: float = DEFAULT_FETCH_TIMEOUT_SECONDS) -> Dict:
+    # Runs independent fetches in parallel. A fetch that fails or exceeds its timeout is left out of the results,
+    # a fetch that is still running keeps going and fills the caches for the next request
+    results = {}
+    if not fetches:
+        return results
+
+    start = time.perf_counter()
+    timeouts = timeouts or {}
+    futures = {fetch_executor.submit(run_timed, name, fetch): name for name, fetch in fetches.items()}
+    deadlines = {future: start + timeouts.get(name, default_timeout) for future, name in futures.items()}
+    pending = set(futures)
+    while pending:
+        if cancellation is not None and cancellation.is_cancelled:
+            for future in pending:
+                future.cancel()
+            raise FetchCancelled(f"Fetching {', '.join(fetches.keys())} was cancelled")
+
+        now = time.perf_counter()
+        for future in [future for future in pending if deadlines[future] <= now]:
+            future.cancel()
+            pending.remove(future)
+            log.warning(f"Fetching {futures[future]} timed out after {timeouts.get(futures[future], default_timeout)}s")
+        if not pending:
+            break
+
+        timeout = min(deadlines[future] for future in pending) - now
+        if cancellation is not None:
+            timeout = min(timeout, CANCELLATION_POLL_SECONDS)
+        done, pending = wait(pending, timeout=max(timeout, 0), return_when=FIRST_COMPLETED)
+        for future in done:
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                log.error(f"Fetching {name} failed: {e}")
+    log.debug(f"Fetching {', '.join(fetches.keys())} took {time.perf_counter() - start:.2f}s in total")
+    return results
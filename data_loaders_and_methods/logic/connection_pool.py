@@ -0,0 +1,175 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+import dcdal
+import psycopg
+from loguru import logger as log
+
+from src.logic.exceptions import AppException
+
+DEFAULT_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 8))
+DEFAULT_IDLE_TIMEOUT_SECONDS = float(os.environ.get("DB_POOL_IDLE_TIMEOUT", 300))
+DEFAULT_HEALTH_CHECK_INTERVAL_SECONDS = float(os.environ.get("DB_POOL_HEALTH_CHECK_INTERVAL", 30))
+DEFAULT_ACQUIRE_TIMEOUT_SECONDS = float(os.environ.get("DB_POOL_ACQUIRE_TIMEOUT", 60))
+
+HEALTH_CHECK_QUERY = psycopg.sql.SQL("select 1")
+
+
+def create_dal_connection():
+    return dcdal.DALConnection(
+        host=os.environ["DB_HOST"],
+        db=os.environ["DB_NAME"],
+        user=os.environ["DB_USER"],
+        password=os.environ["DB_PASSWORD"],
+    )
+
+
+class ConnectionPool:
+    def __init__(self,
+                 connection_factory: Callable = create_dal_connection,
+                 max_size: int = DEFAULT_POOL_SIZE,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT_SECONDS,
+                 health_check_interval: float = DEFAULT_HEALTH_CHECK_INTERVAL_SECONDS,
+                 acquire_timeout: float = DEFAULT_ACQUIRE_TIMEOUT_SECONDS):
+        self.__connection_factory = connection_factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+
+        self.__lock = threading.Lock()
+        self.__slots = threading.BoundedSemaphore(max_size)
+        # Idle connections as (connection, released_at) - most recently released at the right
+        self.__idle = deque()
+        self.__stats = {
+            "hits": 0,
+            "misses": 0,
+            "wait_time": 0.0,
+            "connect_time": 0.0,
+            "health_check_failures": 0,
+            "evicted": 0,
+            "discarded": 0,
+        }
+
+    def acquire(self):
+        start_wait = time.perf_counter()
+        if not self.__slots.acquire(timeout=self.acquire_timeout):
+            raise AppException(f"Timed out after {self.acquire_timeout}s waiting for a DB connection "
+                               f"(pool size {self.max_size})")
+        waited = time.perf_counter() - start_wait
+
+        try:
+            self.evict_idle()
+            connection = self.__pop_healthy_idle_connection()
+            with self.__lock:
+                self.__stats["wait_time"] += waited
+                self.__stats["hits" if connection is not None else "misses"] += 1
+
+            if connection is None:
+                start_connect = time.perf_counter()
+                connection = self.__connection_factory()
+                with self.__lock:
+                    self.__stats["connect_time"] += time.perf_counter() - start_connect
+            return connection
+        except Exception:
+            self.__slots.release()
+            raise
+
+    def release(self, connection, discard=False):
+        try:
+            if discard:
+                self.__close(connection)
+                with self.__lock:
+                    self.__stats["discarded"] += 1
+            else:
+                with self.__lock:
+                    self.__idle.append((connection, time.monotonic()))
+        finally:
+            self.__slots.release()
+
+    @contextmanager
+    def connection(self):
+        connection = self.acquire()
+        try:
+            yield connection
+        except Exception:
+            # The connection may be in a broken or aborted-transaction state, do not hand it out again
+            self.release(connection, discard=True)
+            raise
+        else:
+            self.release(connection)
+
+    def evict_idle(self):
+        now = time.monotonic()
+        expired = []
+        with self.__lock:
+            while self.__idle and now - self.__idle[0][1] > self.idle_timeout:
+                expired.append(self.__idle.popleft()[0])
+            self.__stats["evicted"] += len(expired)
+        for connection in expired:
+            self.__close(connection)
+
+    def close_all(self):
+        with self.__lock:
+            idle_connections = [connection for connection, _ in self.__idle]
+            self.__idle.clear()
+        for connection in idle_connections:
+            self.__close(connection)
+
+    def get_stats(self) -> Dict:
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats["idle"] = len(self.__idle)
+        stats["max_size"] = self.max_size
+        return stats
+
+    def __pop_healthy_idle_connection(self):
+        while True:
+            with self.__lock:
+                if not self.__idle:
+                    return None
+                connection, released_at = self.__idle.pop()
+
+            if time.monotonic() - released_at < self.health_check_interval or self.__is_healthy(connection):
+                return connection
+
+            with self.__lock:
+                self.__stats["health_check_failures"] += 1
+            self.__close(connection)
+
+    @staticmethod
+    def __is_healthy(connection) -> bool:
+        try:
+            connection.execute(HEALTH_CHECK_QUERY, query_parameters={}, fetchable=True)
+            return True
+        except Exception as e:
+            log.warning(f"Dropping unhealthy DB connection: {e}")
+            return False
+
+    @staticmethod
+    def __close(connection):
+        try:
+            connection.close()
+        except Exception as e:
+            log.debug(f"Failed closing DB connection: {e}")
+
+
+_connection_pool: Optional[ConnectionPool] = None
+_connection_pool_lock = threading.Lock()
+
+
+def get_connection_pool() -> ConnectionPool:
+    global _connection_pool
+    if _connection_pool is None:
+        with _connection_pool_lock:
+            if _connection_pool is None:
+                _connection_pool = ConnectionPool()
+    return _connection_pool
+
+
+def pooled_connection():
+    return get_connection_pool().connection()
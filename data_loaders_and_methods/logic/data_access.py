@@ -1,32 +1,40 @@
-import os
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from loguru import logger as log
 
 import dcdal
+import psycopg
 from pandas import DataFrame
 
+from src.logic.connection_pool import pooled_connection
 from src.logic.exceptions import AppException
 
 
 def df_from_db(schema: str, table: str, columns: List[str], conditions: Optional[List] = None) -> DataFrame:
     try:
-        conn = dcdal.DALConnection(
-            host=os.environ["DB_HOST"],
-            db=os.environ["DB_NAME"],
-            user=os.environ["DB_USER"],
-            password=os.environ["DB_PASSWORD"],
-        )
-        reader = dcdal.DALReader(connection=conn)
-        df = reader.read_table_to_dataframe(
-            schema=schema,
-            table=table,
-            columns=columns,
-            conditions=conditions
-        )
-        conn.close()
+        with pooled_connection() as conn:
+            reader = dcdal.DALReader(connection=conn)
+            df = reader.read_table_to_dataframe(
+                schema=schema,
+                table=table,
+                columns=columns,
+                conditions=conditions
+            )
         return df
     except Exception as e:
         error_message = f'Failed fetching from {schema}.{table} columns [{columns}] due to: {e}'
         log.error(error_message)
         raise AppException(error_message)
+
+
+def df_from_query(query: psycopg.sql.Composable, columns: List[str], query_parameters: Optional[Dict] = None) \
+        -> DataFrame:
+    # For reads the table reader cannot express, e.g. distinct values or parts of json columns
+    try:
+        with pooled_connection() as conn:
+            data = conn.execute(query, query_parameters=query_parameters or {}, fetchable=True)
+        return DataFrame(data=data, columns=columns)
+    except Exception as e:
+        error_message = f'Failed running query [{query!r}] due to: {e}'
+        log.error(error_message)
+        raise AppException(error_message)
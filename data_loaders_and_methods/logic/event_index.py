@@ -0,0 +1,136 @@
+from datetime import timedelta
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.logic.results_cache import DerivedResultsCache
+
+PREDICTED_EVENT_TYPE = "Predicted"
+
+
+def to_read_only(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+class EventIndex:
+    # Immutable index of the events of one machine, sorted by start time. Position i is the internal event id,
+    # so every lookup by internal event id is positional. The events frame must not be changed after indexing
+    def __init__(self, events: pd.DataFrame):
+        if events.empty or "start_timestamp" not in events.columns:
+            events = events.copy()
+            events["internal_event_id"] = pd.Series(dtype=np.int64)
+            self.events = events
+            self.is_tz_aware = False
+            self.event_ids = to_read_only(np.empty(0, dtype=object))
+            self.starts = to_read_only(np.empty(0, dtype="datetime64[ns]"))
+            self.ends = to_read_only(np.empty(0, dtype="datetime64[ns]"))
+            self.max_ends = self.ends
+            self.type_codes = to_read_only(np.empty(0, dtype=np.int64))
+            self.type_names = to_read_only(np.array([PREDICTED_EVENT_TYPE], dtype=object))
+            self.anomaly_ids = None
+            self.anomaly_offsets = None
+            return
+
+        events = events.sort_values("start_timestamp", ascending=True, kind="stable")
+        events["internal_event_id"] = np.arange(len(events))
+        self.events = events
+        self.is_tz_aware = isinstance(events["start_timestamp"].dtype, pd.DatetimeTZDtype)
+
+        self.event_ids = to_read_only(events["event_id"].to_numpy()) if "event_id" in events.columns \
+            else to_read_only(np.full(len(events), None, dtype=object))
+        # Same values as the .values of the columns - UTC for timezone aware columns, wall time otherwise
+        self.starts = to_read_only(np.asarray(events["start_timestamp"].values, dtype="datetime64[ns]"))
+        self.ends = to_read_only(np.asarray(events["end_timestamp"].values, dtype="datetime64[ns]"))
+        # Events are sorted by start only, the running maximum of the ends is sorted and bounds the range queries
+        self.max_ends = to_read_only(np.maximum.accumulate(self.ends))
+
+        if "label_name" in events.columns:
+            type_codes, type_names = pd.factorize(events["label_name"])
+            self.type_codes = to_read_only(type_codes.astype(np.int64))
+            self.type_names = to_read_only(np.asarray(type_names, dtype=object))
+        else:
+            self.type_codes = to_read_only(np.zeros(len(events), dtype=np.int64))
+            self.type_names = to_read_only(np.array([PREDICTED_EVENT_TYPE], dtype=object))
+
+        if "anomaly_id_list" in events.columns:
+            anomaly_id_lists = events["anomaly_id_list"].to_numpy()
+            lengths = np.fromiter((len(anomaly_id_list) for anomaly_id_list in anomaly_id_lists),
+                                  dtype=np.int64, count=len(anomaly_id_lists))
+            self.anomaly_offsets = to_read_only(np.concatenate(([0], np.cumsum(lengths))).astype(np.int64))
+            self.anomaly_ids = to_read_only(
+                np.fromiter((int(anomaly_id) for anomaly_id_list in anomaly_id_lists for anomaly_id in anomaly_id_list),
+                            dtype=np.int64, count=int(self.anomaly_offsets[-1])))
+        else:
+            self.anomaly_ids = None
+            self.anomaly_offsets = None
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    def get_event(self, internal_event_id: int) -> Tuple[pd.Timestamp, pd.Timestamp, str]:
+        return pd.Timestamp(self.starts[internal_event_id]), \
+            pd.Timestamp(self.ends[internal_event_id]), \
+            self.type_names[self.type_codes[internal_event_id]]
+
+    def get_window(self, internal_event_id: int, hours_before: float, hours_after: float) \
+            -> Tuple[pd.Timestamp, pd.Timestamp, str]:
+        start, end, event_type = self.get_event(internal_event_id)
+        return start - timedelta(hours=hours_before), end + timedelta(hours=hours_after), event_type
+
+    def get_event_id(self, internal_event_id: int):
+        return self.event_ids[internal_event_id]
+
+    def get_anomaly_ids(self, internal_event_id: int) -> List[int]:
+        if self.anomaly_ids is None:
+            return []
+        start, end = self.anomaly_offsets[internal_event_id], self.anomaly_offsets[internal_event_id + 1]
+        return self.anomaly_ids[start:end].tolist()
+
+    def get_positions_in_range(self, start_timestamp, end_timestamp) -> np.ndarray:
+        # Internal ids of the events overlapping [start_timestamp, end_timestamp], found with two binary searches
+        start, end = self.to_index_time(start_timestamp), self.to_index_time(end_timestamp)
+        first = np.searchsorted(self.max_ends, start, side="left")
+        last = np.searchsorted(self.starts, end, side="right")
+        if first >= last:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.arange(first, last)
+        # Between the bounds, events ending before the range are still possible when a longer event precedes them
+        return candidates[self.ends[first:last] >= start]
+
+    def get_events_in_range(self, start_timestamp, end_timestamp) -> pd.DataFrame:
+        return self.events.iloc[self.get_positions_in_range(start_timestamp, end_timestamp)]
+
+    def to_index_time(self, timestamp) -> np.datetime64:
+        timestamp = pd.Timestamp(timestamp)
+        if timestamp.tz is not None:
+            timestamp = timestamp.tz_convert("UTC") if self.is_tz_aware else timestamp
+            timestamp = timestamp.tz_localize(None)
+        return np.datetime64(timestamp.to_datetime64(), "ns")
+
+
+class KeyedEventIndex:
+    # One event index per value of the key column, e.g. the events of every data source
+    def __init__(self, events: pd.DataFrame, key_column: str):
+        self.key_column = key_column
+        self.all = EventIndex(events)
+        self.indexes = {} if self.all.empty else \
+            {key: EventIndex(key_events) for key, key_events in events.groupby(key_column, sort=False)}
+
+    def get_events_in_range(self, start_timestamp, end_timestamp, key=None) -> pd.DataFrame:
+        if key is None:
+            return self.all.get_events_in_range(start_timestamp, end_timestamp)
+        if key not in self.indexes:
+            return self.all.events.iloc[:0]
+        return self.indexes[key].get_events_in_range(start_timestamp, end_timestamp)
+
+
+class EventIndexCache(DerivedResultsCache):
+    # Indexes are reused while the events frames they were built from are the same objects, replacing a frame
+    # (e.g. reloading the manual events after tagging) rebuilds its indexes on their next use
+    pass
@@ -15,6 +15,11 @@ def create_data_object(all_machines, machine_ids_str, args, pipeline_versions_op
         "configurations":
             {
                 "reading_files_multi": args.read_files_multi,
+                "loading_configurations":
+                    {
+                        "lazy": not args.eager_loading,
+                        "prefetch_machines": args.prefetch_machines
+                    },
                 "pipeline_versions_options": pipeline_versions_options,
                 "pipeline_versions":
                     {
@@ -30,7 +35,8 @@ def create_data_object(all_machines, machine_ids_str, args, pipeline_versions_op
                     },
                 "events_configurations":
                     {
-                        "max_data_sources_to_show": 5
+                        "max_data_sources_to_show": 5,
+                        "prefetch_events_depth": args.prefetch_events_depth
                     },
                 "manual_tagging":
                     {
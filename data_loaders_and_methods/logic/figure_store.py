@@ -0,0 +1,207 @@
+import os
+import pickle
+import shutil
+import struct
+import threading
+import time
+import uuid
+from typing import Dict, List, Tuple
+
+from dash_extensions.enrich import ServersideBackend
+from loguru import logger as log
+
+from src.logic.session_state import get_session_id
+
+DEFAULT_FIGURE_STORE_PATH = os.environ.get("FIGURE_STORE_PATH", "file_system_backend")
+DEFAULT_FIGURE_STORE_MAX_BYTES = int(os.environ.get("FIGURE_STORE_MAX_BYTES", 4 * 1024 ** 3))
+DEFAULT_FIGURE_STORE_SESSION_MAX_BYTES = int(os.environ.get("FIGURE_STORE_SESSION_MAX_BYTES", 512 * 1024 ** 2))
+DEFAULT_FIGURE_STORE_TTL_SECONDS = float(os.environ.get("FIGURE_STORE_TTL_SECONDS", 2 * 60 * 60))
+DEFAULT_FIGURE_STORE_EVICTION_INTERVAL_SECONDS = float(os.environ.get("FIGURE_STORE_EVICTION_INTERVAL_SECONDS", 60))
+
+HEADER_SIZE_FORMAT = "<Q"
+
+
+def dump_value(value, path: str) -> int:
+    # The value is pickled as a whole, figures included. Pickle protocol 5 hands the NumPy arrays out of band, so the
+    # high frequency trace arrays are written as raw bytes and not copied into the pickle. Returns the bytes written
+    buffers = []
+    data = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+    raw_buffers = [buffer.raw() for buffer in buffers]
+    header = pickle.dumps([len(data)] + [raw_buffer.nbytes for raw_buffer in raw_buffers])
+
+    temporary_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(struct.pack(HEADER_SIZE_FORMAT, len(header)))
+        file.write(header)
+        file.write(data)
+        for raw_buffer in raw_buffers:
+            file.write(raw_buffer)
+    # Readers never see a partially written file
+    os.replace(temporary_path, path)
+    return struct.calcsize(HEADER_SIZE_FORMAT) + len(header) + len(data) + \
+        sum(raw_buffer.nbytes for raw_buffer in raw_buffers)
+
+
+def load_value(path: str):
+    with open(path, "rb") as file:
+        header_size = struct.unpack(HEADER_SIZE_FORMAT, file.read(struct.calcsize(HEADER_SIZE_FORMAT)))[0]
+        sizes = pickle.loads(file.read(header_size))
+        data = file.read(sizes[0])
+        buffers = [bytearray(file.read(size)) for size in sizes[1:]]
+    return pickle.loads(data, buffers=buffers)
+
+
+class FigureStore(ServersideBackend):
+    # Serverside backend for figures. Entries are files grouped by session, bounded by a TTL, a per-session quota
+    # and a total size, evicting the least recently used first. File times are the shared index, so all worker
+    # processes using the same directory see the same store.
+    # Eviction lists every entry, so a process runs it at most once per interval, or earlier once it wrote an eighth
+    # of a session quota since the last run. The limits can be exceeded by that much in the meantime
+    def __init__(self,
+                 path: str = DEFAULT_FIGURE_STORE_PATH,
+                 max_bytes: int = DEFAULT_FIGURE_STORE_MAX_BYTES,
+                 session_max_bytes: int = DEFAULT_FIGURE_STORE_SESSION_MAX_BYTES,
+                 ttl: float = DEFAULT_FIGURE_STORE_TTL_SECONDS,
+                 eviction_interval: float = DEFAULT_FIGURE_STORE_EVICTION_INTERVAL_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.session_max_bytes = session_max_bytes
+        self.ttl = ttl
+        self.eviction_interval = eviction_interval
+        self.__lock = threading.Lock()
+        self.__stats = {"hits": 0, "misses": 0, "writes": 0, "expired": 0, "evicted": 0,
+                        "read_time": 0.0, "write_time": 0.0}
+        self.__last_eviction = 0.0
+        self.__written_bytes = 0
+        # Entries, bytes and sessions found by the last eviction
+        self.__usage = {"entries": 0, "bytes": 0, "sessions": 0}
+        os.makedirs(self.path, exist_ok=True)
+
+    def get(self, key, ignore_expired=False):
+        start = time.perf_counter()
+        entry_path = self.__find_entry(key)
+        if entry_path is not None and not ignore_expired and time.time() - os.path.getmtime(entry_path) > self.ttl:
+            self.__remove(entry_path)
+            self.__count("expired")
+            entry_path = None
+        if entry_path is None:
+            self.__count("misses")
+            return None
+
+        try:
+            value = load_value(entry_path)
+            # The modification time is the last access used for TTL and LRU eviction
+            os.utime(entry_path)
+        except FileNotFoundError:
+            # Evicted by another request in the meantime
+            self.__count("misses")
+            return None
+        with self.__lock:
+            self.__stats["hits"] += 1
+            self.__stats["read_time"] += time.perf_counter() - start
+        return value
+
+    def set(self, key, value):
+        start = time.perf_counter()
+        session_path = os.path.join(self.path, get_session_id())
+        os.makedirs(session_path, exist_ok=True)
+        written_bytes = dump_value(value, os.path.join(session_path, str(key)))
+        with self.__lock:
+            self.__stats["writes"] += 1
+            self.__stats["write_time"] += time.perf_counter() - start
+            self.__written_bytes += written_bytes
+            evict = self.__written_bytes >= min(self.max_bytes, self.session_max_bytes) // 8 or \
+                time.monotonic() - self.__last_eviction >= self.eviction_interval
+            if evict:
+                self.__written_bytes = 0
+                self.__last_eviction = time.monotonic()
+        if evict:
+            self.evict()
+
+    def has(self, key):
+        return self.__find_entry(key) is not None
+
+    def evict(self):
+        now = time.time()
+        entries = self.__list_entries()
+        kept_entries = []
+        for entry in entries:
+            if now - entry[2] > self.ttl:
+                self.__remove(entry[0])
+                self.__count("expired")
+            else:
+                kept_entries.append(entry)
+
+        session_bytes = {}
+        for _, session_id, _, size in kept_entries:
+            session_bytes[session_id] = session_bytes.get(session_id, 0) + size
+        total_bytes = sum(session_bytes.values())
+        session_entries = {session_id: 0 for session_id in session_bytes}
+        for _, session_id, _, _ in kept_entries:
+            session_entries[session_id] += 1
+        # Least recently used first
+        for entry_path, session_id, _, size in sorted(kept_entries, key=lambda entry: entry[2]):
+            if total_bytes <= self.max_bytes and session_bytes[session_id] <= self.session_max_bytes:
+                continue
+            self.__remove(entry_path)
+            self.__count("evicted")
+            total_bytes -= size
+            session_bytes[session_id] -= size
+            session_entries[session_id] -= 1
+
+        with self.__lock:
+            self.__usage = {"entries": sum(session_entries.values()),
+                            "bytes": total_bytes,
+                            "sessions": sum(1 for entries_count in session_entries.values() if entries_count)}
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.makedirs(self.path, exist_ok=True)
+        with self.__lock:
+            self.__usage = {"entries": 0, "bytes": 0, "sessions": 0}
+
+    def get_stats(self) -> Dict:
+        # The usage is the one found by the last eviction, listing the entries again would cost as much
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats.update(self.__usage)
+        requests = stats["hits"] + stats["misses"]
+        stats.update(hit_rate=stats["hits"] / requests if requests else None,
+                     max_bytes=self.max_bytes)
+        return stats
+
+    def __find_entry(self, key):
+        # Only the entries of the requesting session are looked up. The session id is assigned by the first request
+        # and sent back in its cookie, so entries written before the cookie was set are already under that id
+        entry_path = os.path.join(self.path, get_session_id(), str(key))
+        return entry_path if os.path.isfile(entry_path) else None
+
+    def __list_entries(self) -> List[Tuple[str, str, float, int]]:
+        entries = []
+        for session_entry in os.scandir(self.path):
+            if not session_entry.is_dir():
+                continue
+            for entry in os.scandir(session_entry.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    entry_stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((entry.path, session_entry.name, entry_stat.st_mtime, entry_stat.st_size))
+        return entries
+
+    def __remove(self, entry_path: str):
+        try:
+            os.remove(entry_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            log.warning(f"Failed removing figure store entry {entry_path}: {e}")
+
+    def __count(self, stat: str):
+        with self.__lock:
+            self.__stats[stat] += 1
+
+
+figure_store = FigureStore()
@@ -1,23 +1,51 @@
+import re
+from importlib.metadata import PackageNotFoundError, version
+
 import dash_bootstrap_components as dbc
+import flask
 from dash import html, dcc
 from dash_extensions.enrich import DashProxy, ServersideOutputTransform
 from loguru import logger as log
 
-from src.callbacks.keter_configurations_callbacks import create_configurations_callbacks
+from src.callbacks.keter_configurations_callbacks import clear_configuration_caches, create_configurations_callbacks
 from src.callbacks.keter_dash_predictive_callbacks import create_predictive_callbacks
 from src.callbacks.keter_dash_tabs_callbacks import create_tabs_callbacks
-from src.data_loaders.keter_data_loader import initialize_data_object
+from src.data_loaders.keter_data_loader import initialize_data_object, sync_configurations
+from src.logic.figure_store import figure_store
+from src.logic.session_state import SessionDataObject, register_session_cookie
 from src.widgets.data_sources_widgets_creation import create_header, create_initial_side_bar
 from src.widgets.tabs_creation_utils import create_tabs
 
+# Updating figures in place uses hf_data of the TraceUpdater based plotly-resampler releases, with other releases
+# figures are redrawn and aggregated data is not refined when zooming in
+PLOTLY_RESAMPLER_MIN_VERSION = (0, 8, 3)
+PLOTLY_RESAMPLER_MAX_VERSION = (0, 9, 0)
+
+
+def is_plotly_resampler_supported() -> bool:
+    try:
+        installed_version = version("plotly-resampler")
+    except PackageNotFoundError:
+        log.warning("The plotly-resampler version is unknown, figures will be redrawn instead of updated in place")
+        return False
+    version_parts = tuple(int(part) for part in re.findall(r"\d+", installed_version)[:3])
+    if PLOTLY_RESAMPLER_MIN_VERSION <= version_parts < PLOTLY_RESAMPLER_MAX_VERSION:
+        return True
+    log.warning(f"plotly-resampler {installed_version} is not supported for updating figures in place, a version >= "
+                f"{'.'.join(map(str, PLOTLY_RESAMPLER_MIN_VERSION))} and < "
+                f"{'.'.join(map(str, PLOTLY_RESAMPLER_MAX_VERSION))} is needed. Figures will be redrawn instead")
+    return False
+
 
 def initialize_app(customer_name, machines, selected_machine, data_object, only_manual_mode=False) -> DashProxy:
     log.debug('Application is being initialized')
+    data_object["only_manual_mode"] = only_manual_mode
+    data_object["update_figures_in_place"] = is_plotly_resampler_supported()
     initialize_data_object(data_object, machines, only_manual_mode)
 
     app = DashProxy(
         __name__,
-        transforms=[ServersideOutputTransform()],
+        transforms=[ServersideOutputTransform(backends=[figure_store])],
         external_stylesheets=[dbc.themes.BOOTSTRAP],
         title=f"{customer_name} Dashboard",
     )
@@ -38,7 +66,17 @@ def initialize_app(customer_name, machines, selected_machine, data_object, only_
     tabs = create_tabs()
     app.layout = html.Div([dcc.Location(id="url"), header, sidebar, tabs])
 
-    create_configurations_callbacks(app, data_object)
-    create_tabs_callbacks(app, data_object)
-    create_predictive_callbacks(app, data_object)
+    register_session_cookie(app.server)
+
+    # Configuration changes made through another worker process are applied before handling a callback, the
+    # requests for the page and its assets do not depend on them
+    @app.server.before_request
+    def apply_published_configurations():
+        if flask.request.path.endswith("_dash-update-component"):
+            sync_configurations(data_object, machines, clear_configuration_caches)
+
+    session_data_object = SessionDataObject(data_object)
+    create_configurations_callbacks(app, session_data_object)
+    create_tabs_callbacks(app, session_data_object)
+    create_predictive_callbacks(app, session_data_object)
     return app
@@ -0,0 +1,150 @@
+import math
+import numbers
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+# One clause of a DataTable filter query, e.g. {overall_rank} >= 3 or {short_name} icontains "pump"
+FILTER_CLAUSE_PATTERN = re.compile(
+    r"^\s*\{(?P<column>.+?)\}\s*(?P<case>[is]?)"
+    r"(?P<operator>>=|<=|!=|=|<|>|(?:ge|le|lt|gt|ne|eq|contains|datestartswith)(?=\s))\s*(?P<value>.*?)\s*$")
+OPERATORS_ALIASES = {"ge": ">=", "le": "<=", "lt": "<", "gt": ">", "ne": "!=", "eq": "="}
+COMPARISONS = {
+    ">=": np.greater_equal,
+    "<=": np.less_equal,
+    "<": np.less,
+    ">": np.greater,
+    "!=": np.not_equal,
+    "=": np.equal,
+}
+BOOLEAN_VALUES = {"true": True, "false": False}
+
+
+def parse_filter_value(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in ("'", '"', '`'):
+        return value[1:-1].replace("\\" + value[0], value[0])
+    return value
+
+
+def parse_filter_query(filter_query: Optional[str]) -> List[Tuple[str, str, bool, str]]:
+    # (column, operator, is_case_insensitive, value) per clause, clauses that cannot be parsed are ignored
+    clauses = []
+    for filter_part in (filter_query or "").split(" && "):
+        match = FILTER_CLAUSE_PATTERN.match(filter_part)
+        if match is None:
+            continue
+        operator = OPERATORS_ALIASES.get(match["operator"], match["operator"])
+        clauses.append((match["column"], operator, match["case"] == "i", parse_filter_value(match["value"])))
+    return clauses
+
+
+def get_typed_column(column: pd.Series) -> pd.Series:
+    # Object columns holding only flags or only numbers (e.g. Decimal values read from the DB) with missing values
+    values = column.dropna()
+    if values.empty:
+        return column
+    if values.map(lambda value: isinstance(value, (bool, np.bool_))).all():
+        return column.astype("boolean")
+    if values.map(lambda value: isinstance(value, numbers.Number) and not isinstance(value, (bool, np.bool_))).all():
+        return pd.to_numeric(column, errors="coerce").astype(np.float64)
+    return column
+
+
+def format_metadata_for_display(metadata_df: pd.DataFrame) -> pd.DataFrame:
+    # Flags and numbers stay typed, so the table filters and sorts them by value. They are turned into text only on
+    # the page sent to the browser (MetadataTable.get_page)
+    display_df = metadata_df.copy()
+    for column in display_df.columns:
+        if display_df[column].dtype == object:
+            display_df[column] = get_typed_column(display_df[column])
+    return display_df
+
+
+def format_page_for_display(page_df: pd.DataFrame) -> List[Dict]:
+    # Flags are shown as True and False, missing values as empty cells
+    display_df = page_df.astype(object)
+    for column in page_df.columns:
+        if is_bool_dtype(page_df[column]):
+            display_df[column] = page_df[column].map({True: "True", False: "False"}).astype(object)
+    return display_df.where(display_df.notna(), None).to_dict("records")
+
+
+class MetadataTable:
+    # Metadata frame served page by page to a DataTable with custom paging, filtering and sorting, so only the
+    # visible page is sent to the browser. Sort orders and text columns are computed once per column and reused
+    def __init__(self, df: pd.DataFrame):
+        self.df = df.reset_index(drop=True)
+        self.__lock = threading.Lock()
+        self.__sort_orders = {}
+        self.__text_columns = {}
+
+    def get_page(self, page_current: int, page_size: int, filter_query: Optional[str] = None,
+                 sort_by: Optional[List[Dict]] = None) -> Tuple[List[Dict], int]:
+        positions = self.get_positions(filter_query, sort_by)
+        page_count = max(1, math.ceil(len(positions) / page_size))
+        page_current = min(max(page_current or 0, 0), page_count - 1)
+        page_positions = positions[page_current * page_size:(page_current + 1) * page_size]
+        return format_page_for_display(self.df.iloc[page_positions]), page_count
+
+    def get_positions(self, filter_query: Optional[str] = None, sort_by: Optional[List[Dict]] = None) -> np.ndarray:
+        mask = self.__filter(filter_query)
+        if not sort_by or sort_by[0]["column_id"] not in self.df.columns:
+            return np.flatnonzero(mask)
+        order = self.__get_sort_order(sort_by[0]["column_id"], sort_by[0]["direction"] == "asc")
+        return order[mask[order]]
+
+    def __filter(self, filter_query: Optional[str]) -> np.ndarray:
+        mask = np.ones(len(self.df), dtype=bool)
+        for column, operator, is_case_insensitive, value in parse_filter_query(filter_query):
+            if column not in self.df.columns:
+                continue
+            mask &= self.__filter_clause(column, operator, is_case_insensitive, value)
+        return mask
+
+    def __filter_clause(self, column: str, operator: str, is_case_insensitive: bool, value: str) -> np.ndarray:
+        # Boolean columns are numeric for pandas, they are compared with true and false before the numeric branch
+        if operator in ("=", "!=") and value.lower() in BOOLEAN_VALUES and is_bool_dtype(self.df[column]):
+            matches = (self.df[column] == BOOLEAN_VALUES[value.lower()]).fillna(False).to_numpy(dtype=bool)
+            return matches if operator == "=" else ~matches
+
+        if operator in COMPARISONS and is_numeric_dtype(self.df[column]) and not is_bool_dtype(self.df[column]):
+            try:
+                number = float(value)
+            except ValueError:
+                return np.zeros(len(self.df), dtype=bool)
+            with np.errstate(invalid="ignore"):
+                return COMPARISONS[operator](self.df[column].to_numpy(dtype=np.float64, na_value=np.nan), number)
+
+        text = self.__get_text_column(column, is_case_insensitive)
+        value = value.lower() if is_case_insensitive else value
+        if operator == "contains":
+            matches = text.str.contains(value, regex=False)
+        elif operator == "datestartswith":
+            matches = text.str.startswith(value)
+        elif operator in ("=", "!="):
+            matches = text == value
+            if operator == "!=":
+                return ~matches.fillna(False).to_numpy(dtype=bool)
+        else:
+            matches = COMPARISONS[operator](text, value)
+        return matches.fillna(False).to_numpy(dtype=bool)
+
+    def __get_text_column(self, column: str, is_case_insensitive: bool) -> pd.Series:
+        key = (column, is_case_insensitive)
+        with self.__lock:
+            if key not in self.__text_columns:
+                text = self.df[column].astype("string")
+                self.__text_columns[key] = text.str.lower() if is_case_insensitive else text
+            return self.__text_columns[key]
+
+    def __get_sort_order(self, column: str, ascending: bool) -> np.ndarray:
+        key = (column, ascending)
+        with self.__lock:
+            if key not in self.__sort_orders:
+                self.__sort_orders[key] = self.df[column].sort_values(
+                    ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+            return self.__sort_orders[key]
@@ -0,0 +1,46 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+from loguru import logger as log
+
+from src.logic.concurrency import run_timed
+
+
+class BackgroundPrefetcher:
+    def __init__(self, max_workers: int = 1):
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self.__lock = threading.Lock()
+        self.__generation = 0
+        self.__stats = {"submitted": 0, "completed": 0, "superseded": 0, "failed": 0}
+
+    def submit(self, tasks: Dict[str, Callable]):
+        # A new submission supersedes everything still queued from the previous one
+        with self.__lock:
+            self.__generation += 1
+            generation = self.__generation
+            self.__stats["submitted"] += len(tasks)
+        for name, task in tasks.items():
+            self.__executor.submit(self.__run, generation, name, task)
+
+    def cancel(self):
+        with self.__lock:
+            self.__generation += 1
+
+    def get_stats(self) -> Dict:
+        with self.__lock:
+            return dict(self.__stats)
+
+    def __run(self, generation: int, name: str, task: Callable):
+        with self.__lock:
+            if generation != self.__generation:
+                self.__stats["superseded"] += 1
+                return
+        try:
+            run_timed(f"prefetch of {name}", task)
+            with self.__lock:
+                self.__stats["completed"] += 1
+        except Exception as e:
+            log.warning(f"Prefetch of {name} failed: {e}")
+            with self.__lock:
+                self.__stats["failed"] += 1
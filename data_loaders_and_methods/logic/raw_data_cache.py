@@ -0,0 +1,213 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from src.logic.shared_store import SQLiteConnections
+
+DEFAULT_MAX_BYTES = int(os.environ.get("RAW_DATA_CACHE_MAX_BYTES", 1024 ** 3))
+
+
+def get_frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def slice_by_time(df: pd.DataFrame, start, end) -> pd.DataFrame:
+    # Segments are kept sorted by timestamp, so the window is located by binary search
+    timestamps = df["timestamp"]
+    first = timestamps.searchsorted(start, side="left")
+    last = timestamps.searchsorted(end, side="right")
+    return df.iloc[first:last]
+
+
+def get_uncovered_ranges(segments_bounds, start, end) -> List[Tuple]:
+    # segments_bounds are sorted, non overlapping (segment_start, segment_end) pairs
+    missing_ranges = []
+    range_start = start
+    is_covered_to_end = False
+    for segment_start, segment_end in segments_bounds:
+        if segment_end < range_start:
+            continue
+        if segment_start > end:
+            break
+        if segment_start > range_start:
+            missing_ranges.append((range_start, segment_start))
+        if segment_end >= end:
+            is_covered_to_end = True
+            break
+        range_start = segment_end
+    if not is_covered_to_end:
+        missing_ranges.append((range_start, end))
+    return missing_ranges
+
+
+def concat_parts(parts: List[pd.DataFrame]) -> pd.DataFrame:
+    if not parts:
+        return pd.DataFrame(columns=["timestamp", "value"])
+    if len(parts) == 1:
+        return parts[0]
+    return pd.concat(parts, ignore_index=True).drop_duplicates()
+
+
+def merge_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    if len(frames) == 1:
+        return frames[0].sort_values("timestamp", kind="stable", ignore_index=True)
+    return pd.concat(frames, ignore_index=True).drop_duplicates() \
+        .sort_values("timestamp", kind="stable", ignore_index=True)
+
+
+def count_lookup(stats: Dict, missing_ranges: List[Tuple], start, end):
+    if not missing_ranges:
+        stats["hits"] += 1
+    elif missing_ranges == [(start, end)]:
+        stats["misses"] += 1
+    else:
+        stats["partial_hits"] += 1
+
+
+class RawDataCache:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.__lock = threading.RLock()
+        # data_source_id -> sorted list of non overlapping segments [start, end, df, bytes], least recently used first
+        self.__segments = OrderedDict()
+        self.__bytes = 0
+        self.__stats = {"hits": 0, "partial_hits": 0, "misses": 0, "evicted": 0}
+
+    def lookup(self, data_source_id, start, end) -> Tuple[pd.DataFrame, List[Tuple]]:
+        # The cached part of the window and the ranges still missing from it, read together. Callers build their
+        # result from this part and the missing ranges they fetch, never by reading the cache again after a put,
+        # which may evict what was just read or inserted
+        with self.__lock:
+            segments = [segment for segment in self.__segments.get(data_source_id, [])
+                        if segment[0] <= end and segment[1] >= start]
+            if segments:
+                self.__segments.move_to_end(data_source_id)
+            missing_ranges = get_uncovered_ranges([(segment[0], segment[1]) for segment in segments], start, end)
+            count_lookup(self.__stats, missing_ranges, start, end)
+        return concat_parts([slice_by_time(segment[2], start, end) for segment in segments]), missing_ranges
+
+    def put(self, data_source_id, start, end, df: pd.DataFrame):
+        with self.__lock:
+            segments = self.__segments.setdefault(data_source_id, [])
+            overlapping = [segment for segment in segments if segment[0] <= end and segment[1] >= start]
+            if overlapping:
+                start = min(start, overlapping[0][0])
+                end = max(end, overlapping[-1][1])
+                for segment in overlapping:
+                    segments.remove(segment)
+                    self.__bytes -= segment[3]
+            df = merge_frames([segment[2] for segment in overlapping] + [df])
+
+            segment_bytes = get_frame_bytes(df)
+            segments.append([start, end, df, segment_bytes])
+            segments.sort(key=lambda segment: segment[0])
+            self.__bytes += segment_bytes
+            self.__segments.move_to_end(data_source_id)
+            self.__evict()
+
+    def clear(self):
+        with self.__lock:
+            self.__segments.clear()
+            self.__bytes = 0
+
+    def get_stats(self) -> Dict:
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats["bytes"] = self.__bytes
+            stats["data_sources"] = len(self.__segments)
+        stats["max_bytes"] = self.max_bytes
+        return stats
+
+    def __evict(self):
+        while self.__bytes > self.max_bytes and self.__segments:
+            _, segments = self.__segments.popitem(last=False)
+            self.__bytes -= sum(segment[3] for segment in segments)
+            self.__stats["evicted"] += 1
+
+
+class SQLiteRawDataCache:
+    # Same contract as RawDataCache, but the segments live in a SQLite file shared by all worker processes
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.__connections = SQLiteConnections(path)
+        self.__stats_lock = threading.Lock()
+        self.__stats = {"hits": 0, "partial_hits": 0, "misses": 0, "evicted": 0}
+        self.__connections.get().execute(
+            "create table if not exists raw_data_segments "
+            "(data_source_id integer not null, start_time integer not null, end_time integer not null, "
+            " data blob not null, bytes integer not null, last_access real not null)")
+        self.__connections.get().execute(
+            "create index if not exists raw_data_segments_source on raw_data_segments (data_source_id, start_time)")
+
+    def lookup(self, data_source_id, start, end) -> Tuple[pd.DataFrame, List[Tuple]]:
+        connection = self.__connections.get()
+        rows = connection.execute(
+            "select start_time, end_time, data from raw_data_segments "
+            "where data_source_id = ? and start_time <= ? and end_time >= ? order by start_time",
+            (int(data_source_id), pd.Timestamp(end).value, pd.Timestamp(start).value)).fetchall()
+        if rows:
+            connection.execute("update raw_data_segments set last_access = ? where data_source_id = ?",
+                               (time.time(), int(data_source_id)))
+        missing_ranges = get_uncovered_ranges(
+            [(pd.Timestamp(segment_start), pd.Timestamp(segment_end)) for segment_start, segment_end, _ in rows],
+            start, end)
+        with self.__stats_lock:
+            count_lookup(self.__stats, missing_ranges, start, end)
+        return concat_parts([slice_by_time(pickle.loads(row[2]), start, end) for row in rows]), missing_ranges
+
+    def put(self, data_source_id, start, end, df: pd.DataFrame):
+        connection = self.__connections.get()
+        connection.execute("begin immediate")
+        try:
+            overlapping = connection.execute(
+                "select rowid, start_time, end_time, data from raw_data_segments "
+                "where data_source_id = ? and start_time <= ? and end_time >= ? order by start_time",
+                (int(data_source_id), pd.Timestamp(end).value, pd.Timestamp(start).value)).fetchall()
+            if overlapping:
+                start = min(pd.Timestamp(start), pd.Timestamp(overlapping[0][1]))
+                end = max(pd.Timestamp(end), pd.Timestamp(overlapping[-1][2]))
+                connection.executemany("delete from raw_data_segments where rowid = ?",
+                                       [(segment[0],) for segment in overlapping])
+            df = merge_frames([pickle.loads(segment[3]) for segment in overlapping] + [df])
+            data = pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+            connection.execute("insert into raw_data_segments values (?, ?, ?, ?, ?, ?)",
+                               (int(data_source_id), pd.Timestamp(start).value, pd.Timestamp(end).value, data,
+                                len(data), time.time()))
+            self.__evict(connection)
+            connection.execute("commit")
+        except Exception:
+            connection.execute("rollback")
+            raise
+
+    def clear(self):
+        self.__connections.get().execute("delete from raw_data_segments")
+
+    def get_stats(self) -> Dict:
+        total_bytes, data_sources = self.__connections.get().execute(
+            "select coalesce(sum(bytes), 0), count(distinct data_source_id) from raw_data_segments").fetchone()
+        with self.__stats_lock:
+            stats = dict(self.__stats)
+        stats.update(bytes=total_bytes, data_sources=data_sources, max_bytes=self.max_bytes)
+        return stats
+
+    def __evict(self, connection):
+        # Whole data sources are evicted, least recently used first
+        total_bytes = connection.execute("select coalesce(sum(bytes), 0) from raw_data_segments").fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+        evicted = 0
+        for data_source_id, data_source_bytes in connection.execute(
+                "select data_source_id, sum(bytes) from raw_data_segments "
+                "group by data_source_id order by max(last_access)").fetchall():
+            if total_bytes <= self.max_bytes:
+                break
+            connection.execute("delete from raw_data_segments where data_source_id = ?", (data_source_id,))
+            total_bytes -= data_source_bytes
+            evicted += 1
+        with self.__stats_lock:
+            self.__stats["evicted"] += evicted
@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+
+class ResultsCache:
+    def __init__(self, max_entries: int = 128, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        # Seconds a loaded value is used before it is loaded again, None keeps it until evicted or cleared
+        self.ttl = ttl
+        self.__lock = threading.Lock()
+        # key -> (value, loaded_at)
+        self.__entries = OrderedDict()
+        # Keys being loaded right now, so concurrent callers wait for one load instead of repeating it
+        self.__pending = {}
+        self.__stats = {"hits": 0, "misses": 0, "evicted": 0, "expired": 0}
+
+    def get_or_load(self, key: Hashable, loader: Callable):
+        with self.__lock:
+            self.__expire(key)
+            if key in self.__entries:
+                self.__entries.move_to_end(key)
+                self.__stats["hits"] += 1
+                return self.__entries[key][0]
+            pending = self.__pending.get(key)
+            if pending is None:
+                pending = self.__pending[key] = threading.Event()
+                is_loading = True
+                self.__stats["misses"] += 1
+            else:
+                is_loading = False
+
+        if not is_loading:
+            pending.wait()
+            with self.__lock:
+                if key in self.__entries:
+                    self.__stats["hits"] += 1
+                    return self.__entries[key][0]
+            # The other load failed, try on our own
+            return self.get_or_load(key, loader)
+
+        try:
+            value = loader()
+            with self.__lock:
+                self.__entries[key] = (value, time.monotonic())
+                while len(self.__entries) > self.max_entries:
+                    self.__entries.popitem(last=False)
+                    self.__stats["evicted"] += 1
+            return value
+        finally:
+            with self.__lock:
+                self.__pending.pop(key, None)
+            pending.set()
+
+    def contains(self, key: Hashable) -> bool:
+        with self.__lock:
+            self.__expire(key)
+            return key in self.__entries
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+    def get_stats(self) -> Dict:
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats["entries"] = len(self.__entries)
+        stats["max_entries"] = self.max_entries
+        return stats
+
+    def __expire(self, key: Hashable):
+        entry = self.__entries.get(key)
+        if entry is not None and self.ttl is not None and time.monotonic() - entry[1] > self.ttl:
+            del self.__entries[key]
+            self.__stats["expired"] += 1
+
+
+class DerivedResultsCache:
+    # Values derived from other objects, e.g. an index or a figure of a data frame. A value is built once per key and
+    # reused while the objects it was built from are the same objects. Replacing a source (e.g. reloading a frame)
+    # rebuilds the value on its next use
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__entries = {}
+        self.__stats = {"hits": 0, "builds": 0}
+
+    def get(self, key: Hashable, sources: Tuple, build: Callable):
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and len(entry[0]) == len(sources) and \
+                    all(cached_source is source for cached_source, source in zip(entry[0], sources)):
+                self.__stats["hits"] += 1
+                return entry[1]
+        value = build()
+        with self.__lock:
+            self.__entries[key] = (sources, value)
+            self.__stats["builds"] += 1
+        return value
+
+    def get_cached(self, key: Hashable):
+        # The last value built for the key, without checking its sources
+        with self.__lock:
+            entry = self.__entries.get(key)
+        return None if entry is None else entry[1]
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+    def get_stats(self) -> Dict:
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats["entries"] = len(self.__entries)
+        return stats
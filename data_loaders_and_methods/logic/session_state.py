@@ -0,0 +1,307 @@
+import os
+import pickle
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import MutableMapping
+import time
+import uuid
+from typing import Callable, Dict, Optional, Tuple
+
+import flask
+from benedict import benedict
+
+from src.logic.shared_store import SQLiteStore, get_shared_store
+
+SESSION_COOKIE_NAME = "data_exploration_session"
+DEFAULT_SESSION_TTL_SECONDS = float(os.environ.get("SESSION_STATE_TTL_SECONDS", 8 * 60 * 60))
+# Expired session states kept in the shared store are looked for at most this often
+SESSION_STATE_PURGE_INTERVAL_SECONDS = 10 * 60
+# Used by code running outside of a request, e.g. background loaders
+NO_SESSION_ID = "no-session"
+
+# View state written by the callbacks of one user, everything else in the data object is shared
+SESSION_KEYS = {
+    "selected_machine",
+    "selected_machine_events",
+    "selected_events_index",
+    "selected_event",
+    "selected_event_internal",
+    "selected_event_type",
+    "selected_event_anomalies",
+    "selected_event_anomalies_models",
+    "selected_event_severities",
+    "selected_anomalies_ids",
+    "selected_values",
+    "internal_event_id",
+    "load_by_dates",
+    "start_time",
+    "end_time",
+    "algorithms",
+    "data_sources_values",
+    "data_sources_connections_values",
+    "navigation_clicks",
+    "navigation_dates",
+}
+# Session keys inside shared sections - reconstruction results follow the figure of each session
+NESTED_SESSION_KEYS = {"algo": {"reconstruction"}}
+# Raw data of the view being drawn, only read by the request that fetched it. It is not kept in the shared store,
+# the fetched data stays in the raw data cache
+REQUEST_SESSION_KEYS = {"data_sources_values", "data_sources_connections_values"}
+
+
+def create_session_state() -> benedict:
+    return benedict({
+        "data_sources_values": {},
+        "data_sources_connections_values": {},
+        "algo": {"reconstruction": {}},
+    })
+
+
+class SessionStateStore:
+    def __init__(self, ttl: float = DEFAULT_SESSION_TTL_SECONDS, state_factory: Callable = create_session_state):
+        self.ttl = ttl
+        self.__state_factory = state_factory
+        self.__lock = threading.Lock()
+        # session_id -> [state, last_access]
+        self.__sessions = {}
+        self.__stats = {"created": 0, "expired": 0}
+
+    def get(self, session_id: str) -> benedict:
+        now = time.monotonic()
+        with self.__lock:
+            self.__evict_expired(now)
+            entry = self.__sessions.get(session_id)
+            if entry is None:
+                entry = self.__sessions[session_id] = [self.__state_factory(), now]
+                self.__stats["created"] += 1
+            entry[1] = now
+            return entry[0]
+
+    def save_request_states(self):
+        # States are kept in memory and are already up to date
+        pass
+
+    def clear(self):
+        with self.__lock:
+            self.__sessions.clear()
+
+    def get_stats(self) -> Dict:
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats["sessions"] = len(self.__sessions)
+        return stats
+
+    def __evict_expired(self, now: float):
+        expired = [session_id for session_id, (_, last_access) in self.__sessions.items()
+                   if now - last_access > self.ttl]
+        for session_id in expired:
+            del self.__sessions[session_id]
+        self.__stats["expired"] += len(expired)
+
+
+class SharedSessionStateStore:
+    # Session states kept in the shared store, one value per key, so any worker process can serve any session.
+    # A state is loaded once per request and only the keys changed by the request are written back, so concurrent
+    # requests of one session changing different keys do not overwrite each other
+    def __init__(self, store: SQLiteStore, ttl: float = DEFAULT_SESSION_TTL_SECONDS,
+                 state_factory: Callable = create_session_state):
+        self.ttl = ttl
+        self.__store = store
+        self.__state_factory = state_factory
+        self.__lock = threading.Lock()
+        self.__stats = {"created": 0, "expired": 0}
+        # States of sessions used outside of a request
+        self.__local_states = {}
+        self.__purged_at = time.monotonic()
+
+    def get(self, session_id: str) -> benedict:
+        request_states = flask.g.setdefault("session_states", {}) if flask.has_request_context() \
+            else self.__local_states
+        if session_id not in request_states:
+            request_states[session_id] = self.__load(session_id)
+        return request_states[session_id][0]
+
+    def save_request_states(self):
+        for session_id, (state, loaded_values) in flask.g.get("session_states", {}).items():
+            values = self.__dump_values(state)
+            changed_values = {f"session:{session_id}:{key}": value for key, value in values.items()
+                              if loaded_values.get(key) != value}
+            deleted_keys = [f"session:{session_id}:{key}" for key in loaded_values if key not in values]
+            changed_values[f"session:{session_id}"] = time.time()
+            self.__store.put_many(changed_values, deleted_keys)
+        self.__purge_expired()
+
+    def clear(self):
+        self.__store.clear(prefix="session:")
+        self.__local_states.clear()
+
+    def get_stats(self) -> Dict:
+        with self.__lock:
+            return dict(self.__stats)
+
+    def __purge_expired(self):
+        # Session states are not evicted by the shared store, sessions that are not used anymore are removed here.
+        # Every key of a session is accessed when it is loaded, so none of them is older than the session
+        now = time.monotonic()
+        with self.__lock:
+            if now - self.__purged_at < SESSION_STATE_PURGE_INTERVAL_SECONDS:
+                return
+            self.__purged_at = now
+        self.__store.clear_stale("session:", self.ttl)
+
+    @staticmethod
+    def __dump_values(state: benedict) -> Dict[str, bytes]:
+        # Values are compared pickled, so changes made inside a value are found as well
+        return {key: pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL) for key, value in state.items()
+                if key not in REQUEST_SESSION_KEYS}
+
+    def __load(self, session_id: str) -> Tuple[benedict, Dict[str, bytes]]:
+        state = self.__state_factory()
+        last_access = self.__store.get(f"session:{session_id}")
+        if last_access is None or time.time() - last_access > self.ttl:
+            with self.__lock:
+                self.__stats["expired" if last_access is not None else "created"] += 1
+            if last_access is not None:
+                self.__store.clear(prefix=f"session:{session_id}:")
+            return state, {}
+
+        loaded_values = self.__store.get_prefixed(f"session:{session_id}:")
+        for key, value in loaded_values.items():
+            state[key] = pickle.loads(value)
+        return state, loaded_values
+
+
+sessions_state_store = SharedSessionStateStore(get_shared_store()) if get_shared_store() is not None \
+    else SessionStateStore()
+
+
+def get_session_id() -> Optional[str]:
+    if not flask.has_request_context():
+        return NO_SESSION_ID
+    return flask.g.get("session_id") or flask.request.cookies.get(SESSION_COOKIE_NAME) or NO_SESSION_ID
+
+
+def register_session_cookie(server: flask.Flask):
+    @server.before_request
+    def assign_session_id():
+        flask.g.session_id = flask.request.cookies.get(SESSION_COOKIE_NAME) or uuid.uuid4().hex
+
+    @server.after_request
+    def store_session_id(response):
+        sessions_state_store.save_request_states()
+        if SESSION_COOKIE_NAME not in flask.request.cookies:
+            response.set_cookie(SESSION_COOKIE_NAME, flask.g.session_id, httponly=True, samesite="Lax")
+        return response
+
+
+class SessionView(ABC):
+    # Routes session keys to the state of one session and everything else to the shared object
+    def __init__(self, shared, session_keys, nested_session_keys=None):
+        self.shared = shared
+        self.session_keys = session_keys
+        self.nested_session_keys = nested_session_keys or {}
+
+    @property
+    @abstractmethod
+    def session(self):
+        pass
+
+    def __get_target(self, key):
+        return self.session if str(key).split(".")[0] in self.session_keys else self.shared
+
+    def __getitem__(self, key):
+        if key in self.nested_session_keys:
+            return FixedSessionView(self.shared[key], self.session[key], self.nested_session_keys[key])
+        return self.__get_target(key)[key]
+
+    def __setitem__(self, key, value):
+        self.__get_target(key)[key] = value
+
+    def __delitem__(self, key):
+        del self.__get_target(key)[key]
+
+    def __contains__(self, key):
+        return key in self.__get_target(key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def pop(self, key, *default):
+        return self.__get_target(key).pop(key, *default)
+
+
+class FixedSessionView(SessionView):
+    def __init__(self, shared, session, session_keys):
+        super().__init__(shared, session_keys)
+        self.__session = session
+
+    @property
+    def session(self):
+        return self.__session
+
+
+class SessionDataObject(SessionView):
+    # Callbacks keep using a single data_object, while the view state of every user is kept apart
+    def __init__(self, shared_data_object: benedict, session_states: SessionStateStore = None):
+        super().__init__(shared_data_object, SESSION_KEYS, NESTED_SESSION_KEYS)
+        self.session_states = session_states or sessions_state_store
+
+    @property
+    def session(self) -> benedict:
+        return self.session_states.get(get_session_id())
+
+
+class StagedSessionState(MutableMapping):
+    # Changes to a session state kept aside until they are committed. Values read from the state are the state's own,
+    # changes made inside them are not staged
+    def __init__(self, state):
+        self.state = state
+        self.__changes = {}
+        self.__deleted = set()
+
+    def __getitem__(self, key):
+        if key in self.__changes:
+            return self.__changes[key]
+        if key in self.__deleted:
+            raise KeyError(key)
+        return self.state[key]
+
+    def __setitem__(self, key, value):
+        self.__changes[key] = value
+        self.__deleted.discard(key)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.__changes.pop(key, None)
+        self.__deleted.add(key)
+
+    def __iter__(self):
+        yield from self.__changes
+        yield from (key for key in self.state if key not in self.__changes and key not in self.__deleted)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def commit(self):
+        for key in self.__deleted:
+            self.state.pop(key, None)
+        for key, value in self.__changes.items():
+            self.state[key] = value
+        self.__changes.clear()
+        self.__deleted.clear()
+
+
+class StagedSessionView(SessionView):
+    # The view of a request that may be superseded, its session state changes are applied only by commit so an
+    # abandoned request leaves the session where the previous one put it
+    def __init__(self, view: SessionView):
+        super().__init__(view.shared, view.session_keys, view.nested_session_keys)
+        self.__session = StagedSessionState(view.session)
+
+    @property
+    def session(self) -> StagedSessionState:
+        return self.__session
+
+    def commit(self):
+        self.__session.commit()
@@ -0,0 +1,144 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+DEFAULT_SHARED_STATE_PATH = os.environ.get("SHARED_STATE_PATH")
+DEFAULT_SHARED_STORE_MAX_BYTES = int(os.environ.get("SHARED_STORE_MAX_BYTES", 4 * 1024 ** 3))
+SQLITE_TIMEOUT_SECONDS = 60
+# Session states are removed when they expire instead of being evicted with the cached values
+UNEVICTED_KEY_PREFIXES = ("session:",)
+
+
+class SQLiteConnections:
+    # SQLite connections cannot be shared between threads, every thread of every process opens its own
+    def __init__(self, path: str):
+        self.path = path
+        self.__local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        # A connection inherited through fork (e.g. a preloaded WSGI app) must not be used by the child
+        if getattr(self.__local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=SQLITE_TIMEOUT_SECONDS, isolation_level=None)
+            connection.execute("pragma journal_mode=wal")
+            connection.execute("pragma synchronous=normal")
+            self.__local.connection = connection
+            self.__local.pid = os.getpid()
+        return self.__local.connection
+
+
+class SQLiteStore:
+    # Key-value store shared by all processes using the same file, least recently used values are evicted first.
+    # Keys starting with one of the unevicted prefixes are not evicted and do not count towards max_bytes
+    def __init__(self, path: str, max_bytes: int = DEFAULT_SHARED_STORE_MAX_BYTES,
+                 unevicted_prefixes: Iterable[str] = ()):
+        self.max_bytes = max_bytes
+        self.__evictable_condition = " and ".join(["1"] + ["substr(key, 1, ?) != ?"] * len(unevicted_prefixes))
+        self.__evictable_parameters = tuple(value for prefix in unevicted_prefixes for value in (len(prefix), prefix))
+        self.__connections = SQLiteConnections(path)
+        self.__stats = {"hits": 0, "misses": 0, "evicted": 0}
+        self.__stats_lock = threading.Lock()
+        self.__connections.get().execute(
+            "create table if not exists shared_values "
+            "(key text primary key, value blob not null, bytes integer not null, last_access real not null)")
+
+    def get(self, key: str, default=None):
+        connection = self.__connections.get()
+        row = connection.execute("select value from shared_values where key = ?", (key,)).fetchone()
+        with self.__stats_lock:
+            self.__stats["hits" if row is not None else "misses"] += 1
+        if row is None:
+            return default
+        connection.execute("update shared_values set last_access = ? where key = ?", (time.time(), key))
+        return pickle.loads(row[0])
+
+    def get_prefixed(self, prefix: str) -> Dict:
+        # The values of all keys starting with the prefix, by the rest of their key
+        connection = self.__connections.get()
+        rows = connection.execute("select key, value from shared_values where substr(key, 1, ?) = ?",
+                                  (len(prefix), prefix)).fetchall()
+        with self.__stats_lock:
+            self.__stats["hits"] += len(rows)
+        if rows:
+            connection.execute("update shared_values set last_access = ? where substr(key, 1, ?) = ?",
+                               (time.time(), len(prefix), prefix))
+        return {key[len(prefix):]: pickle.loads(value) for key, value in rows}
+
+    def put(self, key: str, value):
+        self.put_many({key: value})
+
+    def put_many(self, values: Dict, deleted_keys: Iterable[str] = ()):
+        # All values are written and the deleted keys removed in a single transaction
+        rows = []
+        for key, value in values.items():
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            rows.append((key, data, len(data), time.time()))
+        connection = self.__connections.get()
+        connection.execute("begin immediate")
+        try:
+            connection.executemany("insert or replace into shared_values values (?, ?, ?, ?)", rows)
+            connection.executemany("delete from shared_values where key = ?", [(key,) for key in deleted_keys])
+            self.__evict(connection)
+            connection.execute("commit")
+        except Exception:
+            connection.execute("rollback")
+            raise
+
+    def delete(self, key: str):
+        self.__connections.get().execute("delete from shared_values where key = ?", (key,))
+
+    def clear(self, prefix: str = ""):
+        self.__connections.get().execute("delete from shared_values where substr(key, 1, ?) = ?",
+                                         (len(prefix), prefix))
+
+    def clear_stale(self, prefix: str, max_age_seconds: float):
+        # Removes the keys starting with the prefix that were not accessed for max_age_seconds
+        self.__connections.get().execute(
+            "delete from shared_values where substr(key, 1, ?) = ? and last_access < ?",
+            (len(prefix), prefix, time.time() - max_age_seconds))
+
+    def get_stats(self) -> Dict:
+        entries, total_bytes = self.__connections.get().execute(
+            "select count(*), coalesce(sum(bytes), 0) from shared_values").fetchone()
+        with self.__stats_lock:
+            stats = dict(self.__stats)
+        stats.update(entries=entries, bytes=total_bytes, max_bytes=self.max_bytes)
+        return stats
+
+    def __evict(self, connection: sqlite3.Connection):
+        total_bytes = connection.execute(
+            f"select coalesce(sum(bytes), 0) from shared_values where {self.__evictable_condition}",
+            self.__evictable_parameters).fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+        evicted = 0
+        for key, value_bytes in connection.execute(
+                f"select key, bytes from shared_values where {self.__evictable_condition} order by last_access",
+                self.__evictable_parameters).fetchall():
+            if total_bytes <= self.max_bytes:
+                break
+            connection.execute("delete from shared_values where key = ?", (key,))
+            total_bytes -= value_bytes
+            evicted += 1
+        with self.__stats_lock:
+            self.__stats["evicted"] += evicted
+
+
+_shared_store: Optional[SQLiteStore] = None
+_shared_store_lock = threading.Lock()
+
+
+def get_shared_store() -> Optional[SQLiteStore]:
+    # Only set in the multi-process deployment, every process then opens the same SQLite file
+    global _shared_store
+    if DEFAULT_SHARED_STATE_PATH is None:
+        return None
+    if _shared_store is None:
+        with _shared_store_lock:
+            if _shared_store is None:
+                os.makedirs(DEFAULT_SHARED_STATE_PATH, exist_ok=True)
+                _shared_store = SQLiteStore(os.path.join(DEFAULT_SHARED_STATE_PATH, "shared_store.sqlite"),
+                                            unevicted_prefixes=UNEVICTED_KEY_PREFIXES)
+    return _shared_store
@@ -3,6 +3,7 @@ from typing import Union
 import pandas as pd
 from numpy import ndarray
 from pandas import Index, Series
+from pandas.api.types import is_datetime64_any_dtype
 from pandas.core.arrays import ExtensionArray
 from pandas.core.tools.datetimes import DatetimeScalar
 
@@ -13,7 +14,19 @@ settings = Settings()
 date_time_format = settings.get(key='datetime_format')
 
 
+def remove_timezone(timestamps, to_utc=True):
+    # Works on whole columns, indexes and scalars at once
+    accessor = timestamps.dt if isinstance(timestamps, Series) else timestamps
+    if accessor.tz is None:
+        return timestamps
+    # Converting to no timezone keeps the UTC time, localizing to no timezone keeps the wall time
+    return accessor.tz_convert(None) if to_utc else accessor.tz_localize(None)
+
+
 def to_pd_datetime(arg: Union[DatetimeScalar, list, tuple, ExtensionArray, ndarray, Index, Series], dt_format=date_time_format, utc=True):
-    pd_timestamp = pd.to_datetime(arg=arg, utc=utc, format=dt_format)
-    unaware_of_timezone = pd_timestamp.apply(lambda x: x.tz_localize(None))
-    return unaware_of_timezone
+    # Values that are already datetime64 are not parsed again
+    if is_datetime64_any_dtype(getattr(arg, "dtype", None)):
+        pd_timestamp = arg if isinstance(arg, (Series, Index)) else pd.to_datetime(arg)
+    else:
+        pd_timestamp = pd.to_datetime(arg=arg, utc=utc, format=dt_format)
+    return remove_timezone(pd_timestamp, to_utc=utc)
@@ -4,6 +4,7 @@ from dash_bootstrap_templates import ThemeSwitchAIO
 import dash_mantine_components as dmc
 import dash_datetimepicker
 from dash import dash_table
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
 from trace_updater import TraceUpdater
 
 from src.data_loaders.keter_data_loader import (
@@ -12,10 +13,11 @@ from src.data_loaders.keter_data_loader import (
 )
 
 from src.data_loaders.keter_raw_data import (
-    get_data_sources_by_machine,
-    get_data_sources_names,
+    get_data_sources_options,
     get_machines_metadata_from_db, get_machines_metadata_from_csv
 )
+from src.logic.metadata_table import MetadataTable, format_metadata_for_display
+from src.logic.results_cache import DerivedResultsCache
 from src.widgets.configuration_widget_creation import create_configurations_form
 
 from src.widgets.widgets_utils import CustomButton
@@ -23,6 +25,10 @@ from src.widgets.widgets_utils import CustomButton
 from src.keter_globals import *
 from assets.styles import *
 
+METADATA_TABLE_PAGE_SIZE = 30
+# Shared by all sessions, a machine's table is rebuilt only when its metadata is reloaded
+metadata_tables = DerivedResultsCache()
+
 
 def create_mode_switch_button():
     return ThemeSwitchAIO(aio_id="theme", themes=[dbc.themes.COSMO, dbc.themes.CYBORG])
@@ -180,9 +186,8 @@ def create_initial_side_bar(machines, selected_machine, pipeline_versions_option
 
 def create_metadata_filters_widget(machine_id, selected_machine_df):
     selected_machine_metadata = selected_machine_df
-    data_sources_dict = get_data_sources_by_machine(machine_id)
-    offcanvas_metadata = create_off_canvas_data_sources_metadata(selected_machine_metadata)
-    data_sources_names = get_data_sources_names(data_sources_dict)
+    offcanvas_metadata = create_off_canvas_data_sources_metadata(machine_id, selected_machine_metadata)
+    data_sources_names = get_data_sources_options(machine_id)
     labeled_events_types = [event_name for event_name in list(machine_timeslot_data_groups_color_mapping.keys())
                             if event_name != 'Good']
     selected_labeled_events_types = [event_name for event_name in list(machine_timeslot_data_groups_color_mapping.keys())
@@ -380,11 +385,12 @@ def create_show_data_widget(data_type, event_id=None, machine_events=None, event
 def create_sidebar_children(machines, selected_machine,
                             pipeline_versions, pipeline_selected_versions,
                             only_manual_mode):
-    machines_df = get_machines_metadata_from_csv() if only_manual_mode else get_machines_metadata_from_db()
+    machines_df = get_machines_metadata_df(only_manual_mode)
     open_form_button, versions_modal = create_configurations_form(pipeline_versions, pipeline_selected_versions)
     side_bar_children_elements = [
         open_form_button,
         versions_modal,
+        dbc.Alert(id="loading-errors-alert", color="danger", dismissable=True, is_open=False),
         html.Br(),
         html.Br(),
         dbc.Label("Select machine to investigate", size=12, color=main_color),
@@ -436,36 +442,73 @@ def create_sidebar_metadata(machine_id, selected_machine_df, machine_events, sta
     return side_bar_children_elements
 
 
-def create_data_sources_metadata_table(metadata_df):
-    if metadata_df.empty:
-        return dbc.Label("No data sources metadata was stored", size=12, color=main_color)
+def get_metadata_table_columns(metadata_df):
+    # Flags are shown as text, they are filtered by their True and False values
+    return [{"name": i, "id": i,
+             "type": "numeric" if is_numeric_dtype(metadata_df[i]) and not is_bool_dtype(metadata_df[i]) else "text"}
+            for i in metadata_df.columns]
+
+
+def get_data_sources_metadata_table(machine_id, metadata_df):
+    return metadata_tables.get(("data_sources", machine_id), (metadata_df,),
+                               lambda: MetadataTable(format_metadata_for_display(metadata_df)))
+
 
+def get_machines_metadata_df(only_manual_mode):
+    return get_machines_metadata_from_csv() if only_manual_mode else get_machines_metadata_from_db()
+
+
+def get_machines_metadata_table(only_manual_mode=False):
+    # Built with the sidebar. A worker process that did not build the sidebar reads the machines metadata itself
+    metadata_table = metadata_tables.get_cached(("machines",))
+    if metadata_table is None:
+        machines_df = get_machines_metadata_df(only_manual_mode)
+        metadata_table = metadata_tables.get(("machines",), (machines_df,),
+                                             lambda: MetadataTable(format_metadata_for_display(machines_df)))
+    return metadata_table
+
+
+def create_paged_metadata_table(table_id, metadata_table, columns, **table_style):
+    # Rows are paged, filtered and sorted on the server, only the visible page is sent to the browser
+    data, page_count = metadata_table.get_page(0, METADATA_TABLE_PAGE_SIZE)
     return dash_table.DataTable(
-        data=metadata_df.to_dict("records"),
-        columns=[{"name": i, "id": i} for i in metadata_df.columns],
-        # row_selectable=True,
-        filter_action="native",
-        sort_action='native',
-        row_deletable=True,
+        id=table_id,
+        data=data,
+        columns=columns,
+        filter_action="custom",
+        filter_query="",
+        sort_action="custom",
+        sort_mode="single",
+        sort_by=[],
+        page_action="custom",
+        page_current=0,
+        page_size=METADATA_TABLE_PAGE_SIZE,
+        page_count=page_count,
         style_header={"backgroundColor": main_color, "color": "white"},
         style_cell={"textAlign": "left"},
-        page_action='native',
-        page_current=0,
-        page_size=30,
+        **table_style,
     )
 
 
+def create_data_sources_metadata_table(machine_id, metadata_df):
+    if metadata_df.empty:
+        return dbc.Label("No data sources metadata was stored", size=12, color=main_color)
+
+    metadata_table = get_data_sources_metadata_table(machine_id, metadata_df)
+    return create_paged_metadata_table("data-sources-metadata-table", metadata_table,
+                                       get_metadata_table_columns(metadata_table.df),
+                                       # row_selectable=True,
+                                       row_deletable=True)
+
+
 def create_machines_metadata_table(metadata_df):
-    return dash_table.DataTable(
-        data=metadata_df.to_dict("records"),
-        columns=[{"name": i, "id": i} for i in metadata_df.columns],
-        filter_action="native",
-        style_header={"backgroundColor": main_color, "color": "white"},
-        style_cell={"textAlign": "left"},
-    )
+    metadata_table = metadata_tables.get(("machines",), (metadata_df,),
+                                         lambda: MetadataTable(format_metadata_for_display(metadata_df)))
+    return create_paged_metadata_table("machines-metadata-table", metadata_table,
+                                       [{"name": i, "id": i} for i in metadata_df.columns])
 
 
-def create_off_canvas_data_sources_metadata(selected_machine_df):
+def create_off_canvas_data_sources_metadata(machine_id, selected_machine_df):
     return html.Div(
         [
             dbc.Button(
@@ -477,7 +520,7 @@ def create_off_canvas_data_sources_metadata(selected_machine_df):
                 n_clicks=0,
             ),
             dbc.Offcanvas(
-                create_data_sources_metadata_table(selected_machine_df),
+                create_data_sources_metadata_table(machine_id, selected_machine_df),
                 id="offcanvas-data-sources-metadata",
                 title="Data Sources Metadata",
                 is_open=False,
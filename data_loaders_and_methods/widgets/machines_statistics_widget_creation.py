@@ -1,12 +1,41 @@
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-from dash import dcc, html
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+from dash import dash_table, dcc, html
+from loguru import logger as log
 
 from assets.styles import *
+from src.logic.results_cache import DerivedResultsCache
 from src.plotting_utils import plot_timeframes_by_count, plot_timeframes_by_time
 
+# Timeframe figures and aggregates only change with the labeled events, they are shared by all sessions and rebuilt
+# when the labeled events frame of the machine is replaced (e.g. by a labeled events pipeline version change)
+timeframes_figures = DerivedResultsCache()
+timeframes_aggregates = DerivedResultsCache()
+export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
 
-def create_machine_timeframes_widget(machine_id, machine_timeframes_df, group_by='time', export=False):
+
+def aggregate_machine_timeframes(machine_timeframes_df):
+    # Count and total duration of the events of every label, grouped with a single bincount per aggregate
+    label_names = machine_timeframes_df["label_name"].fillna("Unknown").to_numpy()
+    labels, label_codes = np.unique(label_names.astype(str), return_inverse=True)
+    durations = (pd.to_datetime(machine_timeframes_df["end_timestamp"]) -
+                 pd.to_datetime(machine_timeframes_df["start_timestamp"])).dt.total_seconds().to_numpy()
+    counts = np.bincount(label_codes, minlength=len(labels))
+    total_durations = np.bincount(label_codes, weights=np.nan_to_num(durations), minlength=len(labels))
+    return pd.DataFrame({"label_name": labels, "count": counts, "duration_hours": total_durations / 3600})
+
+
+def get_machine_timeframes_aggregates(machine_id, machine_timeframes_df):
+    return timeframes_aggregates.get(machine_id, (machine_timeframes_df,),
+                                     lambda: aggregate_machine_timeframes(machine_timeframes_df))
+
+
+def create_machine_timeframes_figure_json(machine_id, machine_timeframes_df, group_by):
     if group_by == 'count':
         fig = plot_timeframes_by_count(machine_timeframes_df)
 
@@ -14,16 +43,47 @@ def create_machine_timeframes_widget(machine_id, machine_timeframes_df, group_by
         calculate_good = False if machine_id == '4' else True
         fig = plot_timeframes_by_time(machine_timeframes_df, calculate_good=calculate_good)
 
-    if export:
+    # Reopening the statistics tab of the machine hands the stored dict to dcc.Graph, the timeframes distribution of
+    # its labeled events is not computed again
+    return json.loads(fig.to_json())
+
+
+def export_machine_timeframes_figure(machine_id, group_by, figure):
+    try:
         os.makedirs("output", exist_ok=True)
         file_name = os.path.join("output", f"machine_{machine_id}_{group_by}_distribution.html")
-        fig.write_html(file_name)
+        pio.write_html(figure, file_name)
+    except Exception as e:
+        log.warning(f"Exporting the {group_by} distribution of machine {machine_id} failed: {e}")
+
+
+def create_machine_timeframes_widget(machine_id, machine_timeframes_df, group_by='time', export=False):
+    fig = timeframes_figures.get((machine_id, group_by), (machine_timeframes_df,),
+                                 lambda: create_machine_timeframes_figure_json(machine_id, machine_timeframes_df,
+                                                                               group_by))
+
+    if export:
+        # Writing the HTML does not delay showing the figure
+        export_executor.submit(export_machine_timeframes_figure, machine_id, group_by, fig)
 
     return [dcc.Graph(id="pie-graph",
                       figure=fig,
                       style=CONTENT_GRAPH_STYLE)]
 
 
+def create_machine_timeframes_summary(machine_id, machine_timeframes_df):
+    aggregates_df = get_machine_timeframes_aggregates(machine_id, machine_timeframes_df)
+    return dash_table.DataTable(
+        id="machine-timeframes-summary",
+        data=aggregates_df.round({"duration_hours": 2}).to_dict("records"),
+        columns=[{"name": "Label", "id": "label_name"},
+                 {"name": "Events", "id": "count"},
+                 {"name": "Duration [hours]", "id": "duration_hours"}],
+        style_header={"backgroundColor": main_color, "color": "white"},
+        style_cell={"textAlign": "left"},
+    )
+
+
 def create_machine_statistics_tab_content(all_data, machine_id):
     if 'events' in all_data:
         machine_df = all_data["events"]['labeled'][machine_id]['full']
@@ -34,6 +94,7 @@ def create_machine_statistics_tab_content(all_data, machine_id):
                 html.Div(id="machine-plots-element",
                          children=machine_exploration_widget,
                          style=TABS_GRAPH_STYLE),
+                html.Div(create_machine_timeframes_summary(machine_id, machine_df), style=TABS_GRAPH_STYLE),
             ])
         )
     else:
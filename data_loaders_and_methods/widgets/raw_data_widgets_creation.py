@@ -1,10 +1,22 @@
+import json
+
 from dash import dcc, html
 from assets.styles import CONTENT_GRAPH_STYLE, TABS_GRAPH_STYLE, INGESTION_GRAPH_STYLE
+from src.logic.results_cache import DerivedResultsCache
 from src.plotting_utils import create_ingestion_data_plot
 
+# Figures are shared by all sessions and rebuilt only when the ingestion data of the machine is reloaded
+ingestion_figures = DerivedResultsCache()
+
+
+def create_ingestion_figure_json(ingestion_rates_df):
+    # Kept as plain JSON data, so serving it again needs neither plotting nor figure validation
+    return json.loads(create_ingestion_data_plot(ingestion_rates_df).to_json())
+
 
-def create_ingestion_graph_widget(ingestion_rates_df):
-    figure = create_ingestion_data_plot(ingestion_rates_df)
+def create_ingestion_graph_widget(machine_id, ingestion_rates_df):
+    figure = ingestion_figures.get(machine_id, (ingestion_rates_df,),
+                                   lambda: create_ingestion_figure_json(ingestion_rates_df))
 
     return [dcc.Graph(id="ingestion_graph",
                       figure=figure,
@@ -14,7 +26,7 @@ def create_ingestion_graph_widget(ingestion_rates_df):
 def create_data_ingestion_tab_content(all_data, machine_id):
     if 'ingestion_rates' in all_data:
         machine_df = all_data["ingestion_rates"][machine_id]
-        ingestion_widget = create_ingestion_graph_widget(machine_df)
+        ingestion_widget = create_ingestion_graph_widget(machine_id, machine_df)
         content = dcc.Loading(
             html.Div([
                 html.Br(),
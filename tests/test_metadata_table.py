@@ -0,0 +1,53 @@
+from decimal import Decimal
+
+import pandas as pd
+
+from data_loaders_and_methods.logic.metadata_table import MetadataTable, format_metadata_for_display
+
+
+def create_metadata_table():
+    return MetadataTable(pd.DataFrame({
+        "data_source_id": [1, 2, 3, 4],
+        "short_name": ["Pump pressure", "Valve", "pump speed", None],
+        "is_periodic": [True, False, True, False],
+        "overall_rank": [3.0, 1.0, None, 2.0],
+    }))
+
+
+def get_filtered_ids(metadata_table, filter_query):
+    return metadata_table.df["data_source_id"].iloc[metadata_table.get_positions(filter_query)].tolist()
+
+
+def test_boolean_column_filtered_by_value():
+    metadata_table = create_metadata_table()
+    assert get_filtered_ids(metadata_table, "{is_periodic} = True") == [1, 3]
+    assert get_filtered_ids(metadata_table, "{is_periodic} = false") == [2, 4]
+    assert get_filtered_ids(metadata_table, "{is_periodic} != True") == [2, 4]
+
+
+def test_numeric_and_text_columns_filtered():
+    metadata_table = create_metadata_table()
+    assert get_filtered_ids(metadata_table, "{overall_rank} >= 2") == [1, 4]
+    assert get_filtered_ids(metadata_table, '{short_name} icontains "pump"') == [1, 3]
+    assert get_filtered_ids(metadata_table, "{overall_rank} > 1 && {is_periodic} = True") == [1]
+
+
+def test_page_sorted_with_missing_values_last():
+    rows, page_count = create_metadata_table().get_page(0, 3, sort_by=[{"column_id": "overall_rank",
+                                                                         "direction": "asc"}])
+    assert page_count == 2
+    assert [row["data_source_id"] for row in rows] == [2, 4, 1]
+
+
+def test_metadata_read_as_objects_filtered_and_sorted_by_value():
+    metadata_table = MetadataTable(format_metadata_for_display(pd.DataFrame({
+        "data_source_id": [1, 2, 3],
+        "is_periodic": pd.Series([True, None, False], dtype=object),
+        "overall_rank": pd.Series([Decimal("10"), Decimal("9"), None], dtype=object),
+    })))
+    assert get_filtered_ids(metadata_table, "{is_periodic} = True") == [1]
+    assert get_filtered_ids(metadata_table, "{overall_rank} > 9.5") == [1]
+    rows, _ = metadata_table.get_page(0, 3, sort_by=[{"column_id": "overall_rank", "direction": "asc"}])
+    assert [row["data_source_id"] for row in rows] == [2, 1, 3]
+    assert [row["is_periodic"] for row in rows] == [None, "True", "False"]
+    assert rows[2]["overall_rank"] is None
@@ -0,0 +1,13 @@
+# Production entry point for a multi-worker WSGI server, e.g.:
+#   SHARED_STATE_PATH=/var/lib/data_exploration gunicorn --preload --workers 8 --threads 4 wsgi:server
+# Command line options of data_exploration_dash.py are passed through DATA_EXPLORATION_ARGS.
+# With SHARED_STATE_PATH set, sessions, raw data segments, per-machine sections and configuration changes are
+# shared by the workers through SQLite files in that directory. --preload loads the startup data once before forking.
+import os
+import shlex
+
+from data_exploration_dash import create_arguments_parser, create_app
+
+args = create_arguments_parser().parse_args(shlex.split(os.environ.get("DATA_EXPLORATION_ARGS", "")))
+app = create_app(args)
+server = app.server